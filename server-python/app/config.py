@@ -0,0 +1,76 @@
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+
+# Maximum number of scenario results held in the in-process result cache (0 disables caching)
+RESULT_CACHE_SIZE = env_int("MINT_RESULT_CACHE_SIZE", 1024)
+
+# SQLite database on a local volume persisting scenario results across restarts, shared by the processes on a node
+# (empty disables it)
+RESULT_STORE_PATH = os.environ.get("MINT_RESULT_STORE_PATH", "")
+# Maximum number of scenario results kept in the persistent result store
+RESULT_STORE_SIZE = env_int("MINT_RESULT_STORE_SIZE", 100_000)
+
+# Redis shared by all replicas to cache scenario results between them, like redis://redis:6379/1 (empty disables it)
+REDIS_URL = os.environ.get("MINT_REDIS_URL", "")
+# Seconds scenario results are kept in the shared Redis cache
+SHARED_CACHE_TTL = env_int("MINT_SHARED_CACHE_TTL_SECONDS", 86400)
+# Seconds a replica may hold the lock on scenarios it is computing before others take over
+SHARED_CACHE_LOCK_TIMEOUT = env_int("MINT_SHARED_CACHE_LOCK_TIMEOUT_SECONDS", 120)
+
+# Directory of surrogate grids built with `python -m app.services.surrogate`, one per subdirectory, answering
+# approximate mode requests (empty makes approximate mode run the emulator)
+SURROGATE_DIR = os.environ.get("MINT_SURROGATE_DIR", "")
+
+# Empty directory the processes serving the app write their metrics to, so /metrics reports them all together; set it
+# whenever running several server workers. Read by prometheus_client itself as well (empty disables it)
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+
+# Worker processes running the emulator (0 runs it in the request thread instead)
+EMULATOR_WORKERS = env_int("MINT_EMULATOR_WORKERS", 0)
+# Tasks each emulator worker runs before being replaced (0 keeps workers for the lifetime of the pool)
+EMULATOR_MAX_TASKS_PER_WORKER = env_int("MINT_EMULATOR_MAX_TASKS_PER_WORKER", 0)
+# Emulator tasks allowed to wait for a free worker before new ones are rejected
+EMULATOR_MAX_QUEUE = env_int("MINT_EMULATOR_MAX_QUEUE", 32)
+# Start-up warm-up attempts, retried with backoff, before /healthz reports the server as unhealthy
+WARMUP_ATTEMPTS = env_int("MINT_WARMUP_ATTEMPTS", 5)
+
+# Emulator requests (/emulator/run, /emulator/run-batch and /emulator/sweep) handled at the same time (0 disables
+# admission control)
+ADMISSION_CONCURRENCY = env_int("MINT_ADMISSION_CONCURRENCY", 8)
+# Emulator requests allowed to wait for one of those slots before new ones are rejected
+ADMISSION_MAX_QUEUE = env_int("MINT_ADMISSION_MAX_QUEUE", 32)
+# Seconds an emulator request may wait for a slot before it is rejected
+ADMISSION_MAX_WAIT = env_int("MINT_ADMISSION_MAX_WAIT_SECONDS", 30)
+# Seconds an emulator request may take before its remaining work is dropped with a 504 (0 leaves it to clients'
+# X-Request-Timeout headers)
+REQUEST_TIMEOUT = env_int("MINT_REQUEST_TIMEOUT_SECONDS", 0)
+
+# Maximum number of emulator requests accepted in one /emulator/run-batch call
+MAX_BATCH_SIZE = env_int("MINT_MAX_BATCH_SIZE", 100)
+
+# Maximum number of parameter values evaluated in one /emulator/sweep call
+MAX_SWEEP_POINTS = env_int("MINT_MAX_SWEEP_POINTS", 50)
+
+# Window in which concurrent controller calls are coalesced into one (0 disables coalescing)
+COALESCE_WINDOW_MS = env_int("MINT_COALESCE_WINDOW_MS", 0)
+# Scenarios in a coalesced batch that trigger running it before its window closes
+COALESCE_MAX_SCENARIOS = env_int("MINT_COALESCE_MAX_SCENARIOS", 100)
+
+# Cache lifetime in seconds of responses that only change between deploys (/version, /options, ...)
+STATIC_MAX_AGE = env_int("MINT_STATIC_MAX_AGE", 86400)
+
+# Jobs kept in the in-memory job store, including finished ones awaiting eviction
+JOB_MAX_JOBS = env_int("MINT_JOB_MAX_JOBS", 100)
+# Seconds a finished job and its result are kept before being evicted
+JOB_TTL = env_int("MINT_JOB_TTL_SECONDS", 3600)
+# Seconds between sweeps evicting expired jobs
+JOB_EVICTION_INTERVAL = env_int("MINT_JOB_EVICTION_INTERVAL_SECONDS", 60)
+# Jobs running at the same time; the emulator work itself still goes through the emulator worker pool
+JOB_WORKERS = env_int("MINT_JOB_WORKERS", 2)
+# Scenarios a job runs per controller call, so its progress and cancellation are checked in between
+JOB_CHUNK_SCENARIOS = env_int("MINT_JOB_CHUNK_SCENARIOS", 50)
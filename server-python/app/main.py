@@ -1,18 +1,60 @@
+import asyncio
 import logging
-import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Annotated
 
-from estimint import __version__ as estimint_version
-from fastapi import FastAPI, Request
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request, status
+from fastapi import Response as HttpResponse
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from minte import __version__ as minte_version
-from prometheus_client import Counter, Gauge, Histogram, make_asgi_app
+from fastapi.responses import JSONResponse, StreamingResponse
+from minte import MintwebResults
+from prometheus_client import make_asgi_app
 
 from app import __version__
 
-from .models import CompareParametersResponse, EmulatorRequest, EmulatorResponse, Response, Version
-from .services.emulator import run_emulator_model
-from .services.resources import get_compare_parameters, get_dynamic_form_options
+from .config import JOB_EVICTION_INTERVAL, MAX_BATCH_SIZE
+from .metrics import metrics_registry
+from .middleware import MetricsMiddleware
+from .models import (
+    BatchEmulatorItem,
+    BatchEmulatorResult,
+    Bootstrap,
+    ColumnarEmulatorResponse,
+    CompareParametersResponse,
+    EmulationMode,
+    EmulatorRequest,
+    EmulatorResponse,
+    JobInfo,
+    JobRequest,
+    JobResult,
+    JobStatus,
+    Response,
+    ResponseFormat,
+    SweepRequest,
+    SweepResponse,
+    Version,
+)
+from .services.admission import emulator_admission
+from .services.cancellation import current_cancellation, request_cancellation, watch_disconnect
+from .services.emulator import (
+    build_scenarios,
+    format_results,
+    plan_emulator_batch,
+    run_emulator_batch,
+    run_emulator_model,
+    run_scenarios,
+    stream_emulator_model,
+    stream_results,
+)
+from .services.encoding import ResultEncoding, arrow_response, encoded_response, ndjson_response, negotiate_encoding
+from .services.jobs import evict_jobs_periodically, job_events, job_manager
+from .services.pool import emulator_pool
+from .services.resources import get_resources
+from .services.static import get_static_responses
+from .services.surrogate import approximate_plan, approximate_scenario_sets, approximation_headers, get_surrogates
+from .services.sweep import plan_emulator_sweep, run_emulator_sweep
+from .services.warmup import warmup
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -21,30 +63,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="MINT API", version=__version__)
 
-metrics_app = make_asgi_app()
-app.mount("/metrics", metrics_app)
-REQUEST_COUNT = Counter("http_requests_total", "Total HTTP requests", ["method", "endpoint", "status"])
-REQUEST_LATENCY = Histogram("http_requests_duration_seconds", "Request latency", ["method", "endpoint"])
-ACTIVE_REQUESTS = Gauge("http_requests_in_flight", "In-flight requests", ["method", "endpoint"])
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Fail startup rather than requests if a resource doesn't match its schema
+    get_resources()
+    get_static_responses()
+    get_surrogates()
+    emulator_pool.start()
+    job_manager.start()
+    job_eviction = asyncio.create_task(evict_jobs_periodically(job_manager, JOB_EVICTION_INTERVAL))
+    # Warm up in the background so /healthz answers meanwhile, with /readyz reporting when it's done
+    warmup.reset()
+    warming_up = asyncio.create_task(asyncio.to_thread(warmup.run))
+    yield
+    warmup.stop()
+    warming_up.cancel()
+    job_eviction.cancel()
+    job_manager.shutdown()
+    emulator_pool.shutdown()
 
 
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    metric_labels = {"method": request.method, "endpoint": request.url.path}
-    ACTIVE_REQUESTS.labels(**metric_labels).inc()
-    start_time = time.time()
+app = FastAPI(title="MINT API", version=__version__, lifespan=lifespan)
 
-    status_code = 500  # Default to 500 in case of unhandled exceptions
-    try:
-        response = await call_next(request)
-        status_code = response.status_code
-        return response
-    finally:
-        REQUEST_LATENCY.labels(**metric_labels).observe(time.time() - start_time)
-        REQUEST_COUNT.labels(**metric_labels, status=status_code).inc()
-        ACTIVE_REQUESTS.labels(**metric_labels).dec()
+metrics_app = make_asgi_app(metrics_registry())
+app.mount("/metrics", metrics_app)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -62,26 +106,164 @@ async def internal_server_error_handler(_req, exc):
     return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 
-@app.get("/version")
-async def get_version() -> Response[Version]:
-    return Response(data=Version(server=__version__, minte=minte_version, estimint=estimint_version))
+IfNoneMatch = Annotated[str | None, Header()]
+Accept = Annotated[str | None, Header()]
+Format = Annotated[ResponseFormat, Query(alias="format")]
+Mode = Annotated[EmulationMode, Query()]
+
+
+async def admitted(
+    request: Request, x_request_timeout: Annotated[float | None, Header(gt=0)] = None
+) -> AsyncIterator[None]:
+    """Hold an emulator admission slot for the whole request, until a streamed response is sent as well.
+
+    Work for the request is dropped once its deadline, from the X-Request-Timeout header in seconds or the server's
+    request timeout, passes or its client disconnects.
+    """
+    cancellation = request_cancellation(x_request_timeout)
+    token = current_cancellation.set(cancellation)
+    watcher = asyncio.create_task(watch_disconnect(request, cancellation))
+    try:
+        async with emulator_admission.admit(cancellation):
+            yield
+    finally:
+        watcher.cancel()
+        current_cancellation.reset(token)
+
+
+# Emulator endpoints are admitted before FastAPI hands them a threadpool thread
+ADMITTED = [Depends(admitted)]
+
+# Alternatives to JSON offered by emulator endpoints, documented in their OpenAPI responses
+RUN_ENCODINGS = (ResultEncoding.arrow, ResultEncoding.msgpack, ResultEncoding.ndjson)
+RUN_RESPONSES = {200: {"content": {encoding.value: {} for encoding in RUN_ENCODINGS}}}
+MSGPACK_RESPONSES = {200: {"content": {ResultEncoding.msgpack.value: {}}}}
+
+
+@app.get("/version", response_model=Response[Version])
+async def get_version(if_none_match: IfNoneMatch = None):
+    return get_static_responses().version.respond(if_none_match)
 
 
 @app.get("/healthz")
 async def health_check() -> Response[dict]:
+    if warmup.failed:
+        raise HTTPException(status_code=503, detail="Emulator warm-up failed")
     return Response(data={"status": "ok"})
 
 
-@app.get("/options")
-async def dynamic_form_options() -> Response[dict]:
-    return Response(data=get_dynamic_form_options())
+@app.get("/readyz")
+async def readiness_check() -> Response[dict]:
+    if not warmup.done:
+        raise HTTPException(status_code=503, detail="Emulator is warming up")
+    if not emulator_pool.has_capacity or not emulator_admission.has_capacity:
+        raise HTTPException(status_code=503, detail="Emulator workers are at capacity")
+    return Response(data={"status": "ready"})
+
+
+@app.get("/options", response_model=Response[dict])
+async def dynamic_form_options(if_none_match: IfNoneMatch = None):
+    return get_static_responses().options.respond(if_none_match)
+
+
+# Sync endpoint so FastAPI runs the emulator in its threadpool rather than blocking the event loop
+@app.post("/emulator/run", responses=RUN_RESPONSES, dependencies=ADMITTED)
+def run_emulator(
+    emulator_request: EmulatorRequest,
+    response_format: Format = ResponseFormat.rows,
+    mode: Mode = EmulationMode.exact,
+    accept: Accept = None,
+) -> Response[EmulatorResponse | ColumnarEmulatorResponse]:
+    encoding = negotiate_encoding(accept)
+    if mode is EmulationMode.approximate:
+        (results,), error_bound = approximate_scenario_sets([build_scenarios(emulator_request)])
+        response = results_response(results, response_format, encoding)
+        response.headers.update(approximation_headers(error_bound))
+        return response
+    if encoding is ResultEncoding.arrow:
+        return arrow_response(run_scenarios(build_scenarios(emulator_request)))
+    if encoding is ResultEncoding.ndjson:
+        return ndjson_response(stream_emulator_model(emulator_request))
+    return encoded_response(Response(data=run_emulator_model(emulator_request, response_format)), encoding)
+
+
+def results_response(
+    results: MintwebResults, response_format: ResponseFormat, encoding: ResultEncoding
+) -> HttpResponse:
+    """Complete results in the negotiated encoding, the way /emulator/run would send results it ran itself."""
+    if encoding is ResultEncoding.arrow:
+        return arrow_response(results)
+    if encoding is ResultEncoding.ndjson:
+        return ndjson_response(stream_results(results))
+    return encoded_response(Response(data=format_results(results, response_format)), encoding)
+
+
+@app.post("/emulator/run-batch", responses=MSGPACK_RESPONSES, dependencies=ADMITTED)
+def run_emulator_batch_requests(
+    items: Annotated[list[BatchEmulatorItem], Body(min_length=1, max_length=MAX_BATCH_SIZE)],
+    response_format: Format = ResponseFormat.rows,
+    mode: Mode = EmulationMode.exact,
+    accept: Accept = None,
+) -> Response[list[BatchEmulatorResult]]:
+    encoding = negotiate_encoding(accept, supported=(ResultEncoding.msgpack,))
+    if mode is EmulationMode.approximate:
+        batch_results, error_bound = approximate_plan(plan_emulator_batch(items, response_format))
+        response = encoded_response(Response(data=batch_results), encoding)
+        response.headers.update(approximation_headers(error_bound))
+        return response
+    return encoded_response(Response(data=run_emulator_batch(items, response_format)), encoding)
+
+
+@app.post("/emulator/sweep", responses=MSGPACK_RESPONSES, dependencies=ADMITTED)
+def run_emulator_parameter_sweep(
+    sweep_request: SweepRequest, mode: Mode = EmulationMode.exact, accept: Accept = None
+) -> Response[SweepResponse]:
+    encoding = negotiate_encoding(accept, supported=(ResultEncoding.msgpack,))
+    if mode is EmulationMode.approximate:
+        sweep_response, error_bound = approximate_plan(plan_emulator_sweep(sweep_request))
+        response = encoded_response(Response(data=sweep_response), encoding)
+        response.headers.update(approximation_headers(error_bound))
+        return response
+    return encoded_response(Response(data=run_emulator_sweep(sweep_request)), encoding)
+
+
+@app.get("/compare-parameters", response_model=Response[CompareParametersResponse])
+async def compare_parameters(if_none_match: IfNoneMatch = None):
+    return get_static_responses().compare_parameters.respond(if_none_match)
+
+
+@app.get("/bootstrap", response_model=Response[Bootstrap])
+async def bootstrap(if_none_match: IfNoneMatch = None):
+    """Version, form options and compare parameters in one payload."""
+    return get_static_responses().bootstrap.respond(if_none_match)
+
+
+@app.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+def create_job(job_request: Annotated[JobRequest, Body()]) -> Response[JobInfo]:
+    """Queue a single emulator run, batch or sweep to run in the background."""
+    return Response(data=job_manager.submit(job_request).info())
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Response[JobInfo]:
+    return Response(data=job_manager.get(job_id).info())
+
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str) -> StreamingResponse:
+    """Server-sent events reporting the job's progress until it finishes."""
+    job = job_manager.get(job_id)
+    return StreamingResponse(job_events(job), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
-@app.post("/emulator/run")
-async def run_emulator(emulator_request: EmulatorRequest) -> Response[EmulatorResponse]:
-    return Response(data=run_emulator_model(emulator_request))
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> Response[JobResult]:
+    job = job_manager.get(job_id)
+    if job.status is not JobStatus.succeeded:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+    return Response(data=job.result)
 
 
-@app.get("/compare-parameters")
-async def compare_parameters() -> Response[CompareParametersResponse]:
-    return Response(data=get_compare_parameters())
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> Response[JobInfo]:
+    return Response(data=job_manager.cancel(job_id).info())
@@ -0,0 +1,51 @@
+import os
+import re
+
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+
+from .config import PROMETHEUS_MULTIPROC_DIR
+
+# From cached milliseconds up to the tens of seconds a large batch of scenarios takes the emulator
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+# Files holding the values of one process's gauges in a `live*` multiprocess mode, named by the process id
+LIVE_GAUGE_FILE = re.compile(r"gauge_live[a-z]+_(\d+)\.db")
+
+
+class LiveMultiProcessCollector(MultiProcessCollector):
+    """Metrics of every process sharing the multiprocess directory, aggregated.
+
+    Workers killed by the server or the OOM killer never mark themselves dead, so the live gauges of processes that no
+    longer exist are dropped before each collection. Their counters and histograms are kept, so totals never go down.
+    """
+
+    def collect(self):
+        remove_dead_processes(self._path)
+        return super().collect()
+
+
+def metrics_registry() -> CollectorRegistry:
+    """Registry behind /metrics: this process's metrics, or all processes' when running several."""
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    LiveMultiProcessCollector(registry, PROMETHEUS_MULTIPROC_DIR)
+    return registry
+
+
+def remove_dead_processes(directory: str) -> None:
+    pids = {int(match.group(1)) for name in os.listdir(directory) if (match := LIVE_GAUGE_FILE.fullmatch(name))}
+    for pid in pids:
+        if not process_alive(pid):
+            mark_process_dead(pid, directory)
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
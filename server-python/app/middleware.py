@@ -0,0 +1,55 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import LATENCY_BUCKETS
+
+# Label of requests that match no route, so unknown paths don't each create new time series
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+REQUEST_COUNT = Counter("http_requests_total", "Total HTTP requests", ["method", "endpoint", "status"])
+REQUEST_LATENCY = Histogram(
+    "http_requests_duration_seconds", "Request latency", ["method", "endpoint"], buckets=LATENCY_BUCKETS
+)
+# Summed over live processes only, so requests in flight in a worker that died aren't counted forever. Not labelled by
+# route, which is only known once the request has been routed
+ACTIVE_REQUESTS = Gauge("http_requests_in_flight", "In-flight requests", ["method"], multiprocess_mode="livesum")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts and latency by route template, and in-flight requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        active_requests = ACTIVE_REQUESTS.labels(method=scope["method"])
+        active_requests.inc()
+        start_time = time.perf_counter()
+
+        status_code = 500  # Default to 500 in case of unhandled exceptions
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metric_labels = {"method": scope["method"], "endpoint": route_template(scope)}
+            REQUEST_LATENCY.labels(**metric_labels).observe(time.perf_counter() - start_time)
+            REQUEST_COUNT.labels(**metric_labels, status=status_code).inc()
+            active_requests.dec()
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route the router matched the request to, like `/jobs/{job_id}`, once it has handled it."""
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ENDPOINT
@@ -1,7 +1,10 @@
+from dataclasses import dataclass
 from enum import Enum
-from typing import Generic, TypeVar
+from typing import Annotated, Generic, Literal, Self, TypeVar
 
-from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from pydantic import BaseModel, Field, JsonValue, TypeAdapter, field_validator, model_validator
+
+from app.config import MAX_BATCH_SIZE, MAX_SWEEP_POINTS
 
 T = TypeVar("T")
 
@@ -65,7 +68,10 @@ class EmulatorRequest(BaseModel):
         return float(value)
 
 
-class EmulatorScenario(BaseModel):
+# Internal only and built from an already validated request, so a plain slotted dataclass: variants are cheap to
+# copy with `dataclasses.replace` and fields are read straight into controller columns without dumping a model
+@dataclass(frozen=True, slots=True, kw_only=True)
+class EmulatorScenario:
     scenario_tag: str = "no_intervention"
     res_use: float
     py_only: float
@@ -108,6 +114,136 @@ class EmulatorResponse(BaseModel):
     eirValid: bool
 
 
+class ResponseFormat(Enum):
+    rows = "rows"
+    columnar = "columnar"
+
+
+class EmulationMode(Enum):
+    exact = "exact"
+    # Interpolated from a precomputed surrogate grid where one covers the request, otherwise exact
+    approximate = "approximate"
+
+
+class ScenarioSeries(BaseModel):
+    scenario: str
+    prevalence: list[float]
+    casesPer1000: list[float]
+
+
+class ColumnarEmulatorResponse(BaseModel):
+    """Emulator results as one series per scenario, indexed by the shared `days` and `year` axes."""
+
+    days: list[int]
+    year: list[int]
+    scenarios: list[ScenarioSeries]
+    eirValid: bool
+
+
+class ScenarioChunk(ScenarioSeries):
+    """One scenario's results in a streamed emulator response, with its own axes."""
+
+    days: list[int]
+    year: list[int]
+
+
+class StreamEnd(BaseModel):
+    """Last line of a streamed emulator response."""
+
+    eirValid: bool
+
+
+class BatchEmulatorItem(BaseModel):
+    # Both validated per item so one invalid item doesn't fail the whole batch
+    id: JsonValue = None
+    request: JsonValue = None
+
+
+class BatchEmulatorResult(BaseModel):
+    # Not set for items without a valid id
+    id: str | None
+    data: EmulatorResponse | ColumnarEmulatorResponse | None = None
+    error: str | None = None
+
+
+class SweepRequest(BaseModel):
+    request: EmulatorRequest
+    parameter_name: str = Field(alias="parameterName")
+    # Bounded here so oversized sweeps are rejected before any values are generated
+    points: int | None = Field(default=None, ge=2, le=MAX_SWEEP_POINTS)
+    values: list[float] | None = Field(default=None, min_length=1, max_length=MAX_SWEEP_POINTS)
+
+    @model_validator(mode="after")
+    def check_points_or_values(self) -> Self:
+        if (self.points is None) == (self.values is None):
+            raise ValueError("Exactly one of points or values must be provided")
+        return self
+
+
+class SweepScenarioSummary(BaseModel):
+    scenario: str
+    casesPer1000: list[float]
+    meanPrevalence: float
+    finalPrevalence: float
+
+
+class SweepPoint(BaseModel):
+    value: float
+    eirValid: bool
+    scenarios: list[SweepScenarioSummary]
+
+
+class SweepResponse(BaseModel):
+    parameterName: str
+    points: list[SweepPoint]
+
+
+class JobKind(Enum):
+    run = "run"
+    batch = "batch"
+    sweep = "sweep"
+
+
+class JobStatus(Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class RunJobRequest(BaseModel):
+    kind: Literal["run"]
+    request: EmulatorRequest
+    response_format: ResponseFormat = Field(default=ResponseFormat.rows, alias="format")
+
+
+class BatchJobRequest(BaseModel):
+    kind: Literal["batch"]
+    request: list[BatchEmulatorItem] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+    response_format: ResponseFormat = Field(default=ResponseFormat.rows, alias="format")
+
+
+class SweepJobRequest(BaseModel):
+    kind: Literal["sweep"]
+    request: SweepRequest
+
+
+# Job requests carry the same body as the endpoint of their kind
+JobRequest = Annotated[RunJobRequest | BatchJobRequest | SweepJobRequest, Field(discriminator="kind")]
+
+JobResult = EmulatorResponse | ColumnarEmulatorResponse | list[BatchEmulatorResult] | SweepResponse
+
+
+class JobInfo(BaseModel):
+    id: str
+    kind: JobKind
+    status: JobStatus
+    scenariosDone: int
+    scenariosTotal: int
+    error: str | None = None
+
+
 class CompareParameter(BaseModel):
     parameter_name: str = Field(serialization_alias="parameterName")
     label: str
@@ -127,3 +263,9 @@ class InterventionCompareParameter(CompareParameter):
 class CompareParametersResponse(BaseModel):
     baseline_parameters: list[CompareParameter] = Field(serialization_alias="baselineParameters")
     intervention_parameters: list[InterventionCompareParameter] = Field(serialization_alias="interventionParameters")
+
+
+class Bootstrap(BaseModel):
+    version: Version
+    options: dict
+    compareParameters: CompareParametersResponse
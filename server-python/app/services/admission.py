@@ -0,0 +1,152 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import ADMISSION_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT
+from app.metrics import LATENCY_BUCKETS
+from app.services.cancellation import RequestCancellation
+
+# Weight of the latest request in the running average of how long admitted requests take
+HOLD_TIME_SMOOTHING = 0.2
+
+ADMISSION_ACTIVE = Gauge(
+    "emulator_admission_active_requests", "Emulator requests admitted and running", multiprocess_mode="livesum"
+)
+ADMISSION_QUEUED = Gauge(
+    "emulator_admission_queued_requests", "Emulator requests waiting to be admitted", multiprocess_mode="livesum"
+)
+ADMISSION_WAIT = Histogram(
+    "emulator_admission_wait_seconds", "Time emulator requests waited to be admitted", buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter(
+    "emulator_admission_rejected_total", "Emulator requests rejected by admission control, by reason", ["reason"]
+)
+
+
+class AdmissionController:
+    """Bounded concurrency for emulator requests, with a bounded first-come first-served queue in front of it.
+
+    Requests finding the queue full, or waiting in it for longer than `max_wait` seconds, are rejected with a 503 and
+    a Retry-After estimated from how long admitted requests recently took. A burst then makes some requests fail fast
+    instead of making all of them slow. Waiting requests hold no threads.
+    """
+
+    def __init__(self, concurrency: int, max_queue: int, max_wait: float):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._active = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._hold_time = 1.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.concurrency > 0
+
+    @property
+    def has_capacity(self) -> bool:
+        """Whether another request would be admitted or queued rather than rejected."""
+        return not self.enabled or self._active < self.concurrency or len(self._waiters) < self.max_queue
+
+    @asynccontextmanager
+    async def admit(self, cancellation: RequestCancellation | None = None) -> AsyncIterator[None]:
+        """Hold one of the concurrency slots, waiting for one in the queue if they are all taken.
+
+        A request cancelled while it waits leaves the queue with its deadline or disconnection error.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start_time = time.perf_counter()
+        await self._acquire(cancellation)
+        admitted_at = time.perf_counter()
+        ADMISSION_WAIT.observe(admitted_at - start_time)
+        try:
+            yield
+        finally:
+            self._hold_time += HOLD_TIME_SMOOTHING * (time.perf_counter() - admitted_at - self._hold_time)
+            self._release()
+
+    async def _acquire(self, cancellation: RequestCancellation | None) -> None:
+        if self._active < self.concurrency and not self._waiters:
+            self._active += 1
+            self._update_gauges()
+            return
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTED.labels(reason="queue_full").inc()
+            raise self._unavailable("Emulator is at capacity, please try again later")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        max_wait = self.max_wait
+        if cancellation is not None and cancellation.remaining is not None:
+            max_wait = min(max_wait, max(cancellation.remaining, 0))
+        try:
+            async with asyncio.timeout(max_wait):
+                await wait_for_slot(waiter, cancellation)
+        except TimeoutError:
+            self._withdraw(waiter)
+            if cancellation is not None:
+                cancellation.check("admission")
+            ADMISSION_REJECTED.labels(reason="timeout").inc()
+            raise self._unavailable("Timed out waiting for the emulator, please try again later") from None
+        except BaseException:
+            self._withdraw(waiter)
+            raise
+        if not waiter.done():
+            # The client disconnected
+            self._withdraw(waiter)
+            cancellation.check("admission")
+
+    def _withdraw(self, waiter: asyncio.Future[None]) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # A slot was handed over just as the wait ended, so pass it on
+            self._release()
+        elif waiter in self._waiters:
+            self._waiters.remove(waiter)
+            self._update_gauges()
+
+    def _release(self) -> None:
+        # Hand the slot straight to the longest waiting request still waiting, so it can't be taken in between
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self._active -= 1
+        self._update_gauges()
+
+    def _unavailable(self, detail: str) -> HTTPException:
+        """A 503 asking the client to retry once the requests ahead of it should have finished."""
+        retry_after = max(math.ceil(self._hold_time * (len(self._waiters) + 1) / self.concurrency), 1)
+        return HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
+
+    def _update_gauges(self) -> None:
+        ADMISSION_ACTIVE.set(self._active)
+        ADMISSION_QUEUED.set(len(self._waiters))
+
+
+async def wait_for_slot(waiter: asyncio.Future[None], cancellation: RequestCancellation | None) -> None:
+    """Wait until the waiter is handed a slot, or the request's client disconnects."""
+    if cancellation is None:
+        await waiter
+        return
+    disconnected = asyncio.ensure_future(cancellation.disconnected.wait())
+    try:
+        await asyncio.wait([waiter, disconnected], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+
+
+emulator_admission = AdmissionController(
+    concurrency=ADMISSION_CONCURRENCY, max_queue=ADMISSION_MAX_QUEUE, max_wait=ADMISSION_MAX_WAIT
+)
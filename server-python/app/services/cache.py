@@ -0,0 +1,116 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from concurrent.futures import CancelledError, Future
+from typing import Generic, TypeVar
+
+from minte import __version__ as minte_version
+from prometheus_client import Counter
+
+from app.services.cancellation import RequestCancelled, cancellable_result
+
+T = TypeVar("T")
+
+CACHE_HITS = Counter("emulator_result_cache_hits_total", "Scenario results served from the result cache")
+CACHE_MISSES = Counter("emulator_result_cache_misses_total", "Scenario results computed by the emulator")
+CACHE_EVICTIONS = Counter("emulator_result_cache_evictions_total", "Scenario results evicted from the result cache")
+
+
+def scenario_key(scenario: dict) -> str:
+    """Canonical hash of a scenario's emulator inputs, ignoring its tag."""
+    inputs = {
+        name: float(value) if isinstance(value, int | float) else value
+        for name, value in scenario.items()
+        if name != "scenario_tag"
+    }
+    payload = json.dumps({"minte": minte_version, "scenario": inputs}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ScenarioResultCache(Generic[T]):
+    """Size-bounded LRU cache of scenario results with single-flight computation of misses.
+
+    Concurrent callers missing on the same key share the result of whichever caller started computing it first. If
+    that caller's request is cancelled, the others take the keys over and compute them themselves.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, T] = OrderedDict()
+        self._in_flight: dict[str, Future[T]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, keys: Iterable[str], compute: Callable[[list[str]], dict[str, T]]) -> dict[str, T]:
+        """Return results for all keys, calling `compute` once with the keys nobody else is computing."""
+        results: dict[str, T] = {}
+        waiting: dict[str, Future[T]] = {}
+        owned: list[str] = []
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[key] = self._entries[key]
+                    CACHE_HITS.inc()
+                elif key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                    CACHE_HITS.inc()
+                else:
+                    self._in_flight[key] = Future()
+                    owned.append(key)
+                    CACHE_MISSES.inc()
+
+        if owned:
+            results.update(self._compute_owned(owned, compute))
+
+        abandoned: list[str] = []
+        for key, future in waiting.items():
+            try:
+                results[key] = cancellable_result(future, "cache", len(waiting), shared=True)
+            except CancelledError:
+                abandoned.append(key)
+        if abandoned:
+            results.update(self.get_or_compute(abandoned, compute))
+
+        return results
+
+    def _compute_owned(self, owned: list[str], compute: Callable[[list[str]], dict[str, T]]) -> dict[str, T]:
+        try:
+            computed = compute(owned)
+        except RequestCancelled:
+            # Not a failure of the keys, so callers waiting on them compute them instead
+            with self._lock:
+                for key in owned:
+                    self._in_flight.pop(key).cancel()
+            raise
+        except BaseException as exc:
+            with self._lock:
+                for key in owned:
+                    self._in_flight.pop(key).set_exception(exc)
+            raise
+
+        with self._lock:
+            for key in owned:
+                self._store(key, computed[key])
+                self._in_flight.pop(key).set_result(computed[key])
+        return computed
+
+    def _store(self, key: str, value: T) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc()
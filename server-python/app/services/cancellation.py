@@ -0,0 +1,103 @@
+import asyncio
+import time
+from concurrent.futures import Future
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException, Request
+from prometheus_client import Counter
+
+from app.config import REQUEST_TIMEOUT
+
+# Seconds between checks for cancellation while waiting on queued emulator work
+POLL_INTERVAL = 0.05
+# Non-standard status, as nginx logs it, of requests whose client went away before the response
+CLIENT_CLOSED_REQUEST = 499
+
+ABANDONED = Counter(
+    "emulator_abandoned_total",
+    "Emulator requests whose remaining work was dropped, by reason and the stage it was dropped at",
+    ["reason", "stage"],
+)
+ABANDONED_SCENARIOS = Counter(
+    "emulator_abandoned_scenarios_total", "Scenarios dropped before the emulator ran them, by reason", ["reason"]
+)
+
+
+class RequestCancelled(HTTPException):
+    """Error response of a request whose deadline passed or whose client disconnected."""
+
+
+@dataclass
+class RequestCancellation:
+    """Deadline and client connection of the request emulator work is being done for.
+
+    Work checks it before each stage it could skip: waiting for admission, dispatching scenarios to the emulator,
+    waiting in the coalescing window or the worker pool queue, and post-processing results. Work already running in
+    the emulator always finishes, and its results are cached.
+    """
+
+    deadline: float | None = None
+    disconnected: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def remaining(self) -> float | None:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    @property
+    def reason(self) -> str | None:
+        if self.disconnected.is_set():
+            return "disconnected"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "deadline"
+        return None
+
+    def check(self, stage: str, scenarios: int = 0) -> None:
+        """Raise the request's error response if it was cancelled, counting the work dropped at this stage."""
+        reason = self.reason
+        if reason is None:
+            return
+        ABANDONED.labels(reason=reason, stage=stage).inc()
+        ABANDONED_SCENARIOS.labels(reason=reason).inc(scenarios)
+        if reason == "deadline":
+            raise RequestCancelled(status_code=504, detail="Request deadline exceeded")
+        raise RequestCancelled(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+
+# Set for the duration of each emulator request, and copied into the threads its endpoint and streams run in
+current_cancellation: ContextVar[RequestCancellation | None] = ContextVar("current_cancellation", default=None)
+
+
+def request_cancellation(timeout: float | None) -> RequestCancellation:
+    """Cancellation of a request with the client's timeout, capped by the server's."""
+    timeouts = [value for value in (timeout, REQUEST_TIMEOUT) if value]
+    return RequestCancellation(deadline=time.monotonic() + min(timeouts) if timeouts else None)
+
+
+def check_cancelled(stage: str, scenarios: int = 0) -> None:
+    cancellation = current_cancellation.get()
+    if cancellation is not None:
+        cancellation.check(stage, scenarios)
+
+
+def cancellable_result[R](future: Future[R], stage: str, scenarios: int = 0, *, shared: bool = False) -> R:
+    """The future's result, unless the current request is cancelled before the future starts running.
+
+    A `shared` future, which other requests wait on as well, is left alone and only this request stops waiting.
+    """
+    cancellation = current_cancellation.get()
+    if cancellation is None:
+        return future.result()
+    while True:
+        try:
+            return future.result(timeout=POLL_INTERVAL)
+        except TimeoutError:
+            if cancellation.reason is not None and (shared or future.cancel()):
+                cancellation.check(stage, scenarios)
+
+
+async def watch_disconnect(request: Request, cancellation: RequestCancellation) -> None:
+    """Mark the request as cancelled once its client disconnects; run after the request body has been read."""
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    cancellation.disconnected.set()
@@ -1,18 +1,528 @@
-from typing import Annotated
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future
+from dataclasses import dataclass, field, fields, replace
+from operator import attrgetter
+from typing import Annotated, Generic, TypeVar
 
+import msgpack
+import numpy as np
+import pandas as pd
 from fastapi import HTTPException
 from minte import MintwebResults, run_mintweb_controller
+from prometheus_client import Counter, Histogram
+from pydantic import ValidationError
 
-from app.models import EmulatorRequest, EmulatorResponse, EmulatorScenario, cases_adapter, prevalence_adapter
+from app.config import (
+    COALESCE_MAX_SCENARIOS,
+    COALESCE_WINDOW_MS,
+    REDIS_URL,
+    RESULT_CACHE_SIZE,
+    RESULT_STORE_PATH,
+    RESULT_STORE_SIZE,
+    SHARED_CACHE_LOCK_TIMEOUT,
+    SHARED_CACHE_TTL,
+)
+from app.metrics import LATENCY_BUCKETS
+from app.models import (
+    BatchEmulatorItem,
+    BatchEmulatorResult,
+    ColumnarEmulatorResponse,
+    EmulatorRequest,
+    EmulatorResponse,
+    EmulatorScenario,
+    ResponseFormat,
+    ScenarioChunk,
+    ScenarioSeries,
+    StreamEnd,
+)
+from app.services.cache import ScenarioResultCache, scenario_key
+from app.services.cancellation import (
+    RequestCancellation,
+    RequestCancelled,
+    cancellable_result,
+    check_cancelled,
+    current_cancellation,
+)
+from app.services.pool import emulator_pool
+from app.services.result_store import ResultStore
+from app.services.shared_cache import SharedResultCache
 
+T = TypeVar("T")
 
-def run_emulator_model(emulator_request: EmulatorRequest) -> EmulatorResponse:
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    """Emulator output for a single scenario, independent of its tag."""
+
+    prevalence: np.ndarray
+    cases: np.ndarray
+    eir_valid: bool
+    prev_ood: bool = False
+
+
+# Controller column names, in field order, and a getter reading them all from a scenario as one tuple
+SCENARIO_FIELDS = tuple(scenario_field.name for scenario_field in fields(EmulatorScenario))
+scenario_values = attrgetter(*SCENARIO_FIELDS)
+
+
+def encode_scenario_result(result: ScenarioResult) -> bytes:
+    return msgpack.packb(
+        {
+            "prevalence": result.prevalence.astype(np.float64).tobytes(),
+            "cases": result.cases.astype(np.float64).tobytes(),
+            "eir_valid": result.eir_valid,
+            "prev_ood": result.prev_ood,
+        }
+    )
+
+
+def decode_scenario_result(value: bytes) -> ScenarioResult:
+    result = msgpack.unpackb(value)
+    return ScenarioResult(
+        prevalence=np.frombuffer(result["prevalence"], dtype=np.float64),
+        cases=np.frombuffer(result["cases"], dtype=np.float64),
+        eir_valid=result["eir_valid"],
+        prev_ood=result["prev_ood"],
+    )
+
+
+result_cache: ScenarioResultCache[ScenarioResult] = ScenarioResultCache(max_size=RESULT_CACHE_SIZE)
+result_store: ResultStore[ScenarioResult] = ResultStore(
+    path=RESULT_STORE_PATH, max_size=RESULT_STORE_SIZE, encode=encode_scenario_result, decode=decode_scenario_result
+)
+shared_cache: SharedResultCache[ScenarioResult] = SharedResultCache(
+    url=REDIS_URL,
+    ttl=SHARED_CACHE_TTL,
+    lock_timeout=SHARED_CACHE_LOCK_TIMEOUT,
+    encode=encode_scenario_result,
+    decode=decode_scenario_result,
+)
+
+COALESCED_BATCH_REQUESTS = Histogram(
+    "emulator_coalesced_batch_requests",
+    "Controller calls merged into each coalesced batch",
+    buckets=(1, 2, 3, 5, 10, 20, 50),
+)
+COALESCED_BATCH_SCENARIOS = Histogram(
+    "emulator_coalesced_batch_scenarios",
+    "Scenarios run in each coalesced batch",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+COALESCE_WAIT = Histogram(
+    "emulator_coalesce_wait_seconds",
+    "Time controller calls wait for their coalesced batch to start",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25),
+)
+
+STAGE_DURATION = Histogram(
+    "emulator_stage_duration_seconds",
+    "Time spent in each stage of handling emulator requests",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+# Their ratio shows how much emulator work deduplicating identical scenarios saves
+SCENARIOS_REQUESTED = Counter("emulator_scenarios_requested_total", "Scenarios requested of the emulator")
+SCENARIOS_DISTINCT = Counter(
+    "emulator_scenarios_distinct_total", "Scenarios left to run after merging those with identical inputs"
+)
+REQUEST_SCENARIOS = Histogram(
+    "emulator_request_scenarios",
+    "Scenarios built for each emulator request",
+    buckets=(1, 2, 3, 4, 5, 6, 7, 8, 10, 12),
+)
+
+
+def run_emulator_model(
+    emulator_request: EmulatorRequest, response_format: ResponseFormat = ResponseFormat.rows
+) -> EmulatorResponse | ColumnarEmulatorResponse:
     """Run the emulator model based on the request and return the response."""
     scenarios = build_scenarios(emulator_request)
-    results = run_mintweb_controller(**scenarios)
+    results = run_scenarios(scenarios)
+    check_cancelled("post_processing")
+    return format_results(results, response_format)
+
+
+def stream_emulator_model(emulator_request: EmulatorRequest) -> Iterator[str]:
+    """Run the emulator model, returning an NDJSON line per scenario followed by one with eirValid.
+
+    The no_intervention baseline runs on its own before anything is streamed, so it goes first and a failure
+    running it still gets an error status. The other scenarios then run together as the stream is consumed, and are
+    left out if the request is cancelled by then.
+    """
+    scenarios = build_scenarios(emulator_request)
+    baseline = run_scenarios(select_scenarios(scenarios, [0]))
+    return stream_scenario_results(scenarios, baseline)
+
+
+def stream_scenario_results(scenarios: dict, baseline: MintwebResults) -> Iterator[str]:
+    eir_valid = baseline.eir_valid
+    yield from scenario_chunks(baseline)
+
+    if len(scenarios["scenario_tag"]) > 1:
+        try:
+            results = run_scenarios(select_scenarios(scenarios, range(1, len(scenarios["scenario_tag"]))))
+        except RequestCancelled:
+            # Too late for an error status, so end the stream without its final line
+            return
+        eir_valid = eir_valid or results.eir_valid
+        yield from scenario_chunks(results)
+
+    yield StreamEnd(eirValid=eir_valid).model_dump_json() + "\n"
+
+
+def stream_results(results: MintwebResults) -> Iterator[str]:
+    """NDJSON lines of results that are already complete, like stream_scenario_results produces."""
+    yield from scenario_chunks(results)
+    yield StreamEnd(eirValid=results.eir_valid).model_dump_json() + "\n"
+
+
+def scenario_chunks(results: MintwebResults) -> Iterator[str]:
+    for tag, result in split_results(results).items():
+        chunk = ScenarioChunk(
+            scenario=tag,
+            days=list(range(0, len(result.prevalence) * 14, 14)),
+            prevalence=result.prevalence.tolist(),
+            year=list(range(1, len(result.cases) + 1)),
+            casesPer1000=result.cases.tolist(),
+        )
+        yield chunk.model_dump_json() + "\n"
+
+
+def select_scenarios(scenarios: dict, indices: Iterable[int]) -> dict:
+    """Subset of columnar scenarios at the given indices."""
+    indices = list(indices)
+    return {name: [values[index] for index in indices] for name, values in scenarios.items()}
+
+
+def format_results(
+    results: MintwebResults, response_format: ResponseFormat
+) -> EmulatorResponse | ColumnarEmulatorResponse:
+    if response_format is ResponseFormat.columnar:
+        return post_process_results_columnar(results)
     return post_process_results(results)
 
 
+@dataclass(frozen=True)
+class EmulationPlan(Generic[T]):
+    """Scenario sets to run through the emulator and how to assemble their results into a response."""
+
+    scenario_sets: list[dict]
+    assemble: Callable[[list[MintwebResults]], T]
+
+    @property
+    def scenario_count(self) -> int:
+        return sum(len(scenarios["scenario_tag"]) for scenarios in self.scenario_sets)
+
+    def run(self) -> T:
+        results = run_scenario_sets(self.scenario_sets) if self.scenario_sets else []
+        check_cancelled("post_processing")
+        return self.assemble(results)
+
+
+def plan_emulator_model(
+    emulator_request: EmulatorRequest, response_format: ResponseFormat = ResponseFormat.rows
+) -> EmulationPlan[EmulatorResponse | ColumnarEmulatorResponse]:
+    return EmulationPlan(
+        scenario_sets=[build_scenarios(emulator_request)],
+        assemble=lambda results: format_results(results[0], response_format),
+    )
+
+
+def run_emulator_batch(
+    items: list[BatchEmulatorItem], response_format: ResponseFormat = ResponseFormat.rows
+) -> list[BatchEmulatorResult]:
+    """Run a batch of emulator requests with a single controller call, reporting invalid requests per item."""
+    return plan_emulator_batch(items, response_format).run()
+
+
+def plan_emulator_batch(
+    items: list[BatchEmulatorItem], response_format: ResponseFormat = ResponseFormat.rows
+) -> EmulationPlan[list[BatchEmulatorResult]]:
+    batch_results: list[BatchEmulatorResult | None] = [None] * len(items)
+    valid_requests: dict[int, EmulatorRequest] = {}
+    for index, item in enumerate(items):
+        if not isinstance(item.id, str):
+            batch_results[index] = BatchEmulatorResult(
+                id=None, error="Validation errors: ('id',): Input should be a valid string"
+            )
+            continue
+        try:
+            valid_requests[index] = EmulatorRequest.model_validate(item.request)
+        except ValidationError as exc:
+            errors = [f"{error['loc']}: {error['msg']}" for error in exc.errors()]
+            batch_results[index] = BatchEmulatorResult(id=item.id, error="Validation errors: " + "; ".join(errors))
+
+    def assemble(results: list[MintwebResults]) -> list[BatchEmulatorResult]:
+        for index, request_results in zip(valid_requests, results, strict=True):
+            batch_results[index] = BatchEmulatorResult(
+                id=str(items[index].id), data=format_results(request_results, response_format)
+            )
+        return batch_results
+
+    return EmulationPlan(
+        scenario_sets=[build_scenarios(emulator_request) for emulator_request in valid_requests.values()],
+        assemble=assemble,
+    )
+
+
+def run_scenario_sets(scenario_sets: list[dict]) -> list[MintwebResults]:
+    """Run several independent sets of columnar scenarios together and split the results back out per set."""
+    merged, tags = merge_scenario_sets(scenario_sets)
+    return split_scenario_sets(run_scenarios(merged), scenario_sets, tags)
+
+
+def merge_scenario_sets(scenario_sets: list[dict]) -> tuple[dict, list[list[str]]]:
+    """Merge sets of columnar scenarios into one, returning the merged tags of each set."""
+    # Prefix tags with the set index so identically tagged scenarios from different sets stay apart
+    tags = [[f"{index}/{tag}" for tag in scenarios["scenario_tag"]] for index, scenarios in enumerate(scenario_sets)]
+    merged = {name: [value for scenarios in scenario_sets for value in scenarios[name]] for name in scenario_sets[0]}
+    merged["scenario_tag"] = [tag for set_tags in tags for tag in set_tags]
+    return merged, tags
+
+
+def split_scenario_sets(
+    results: MintwebResults, scenario_sets: list[dict], tags: list[list[str]]
+) -> list[MintwebResults]:
+    """Split results of merged scenario sets back out per set, under each set's original tags."""
+    split = split_results(results)
+    return [
+        combine_results(scenarios["scenario_tag"], [split[tag] for tag in set_tags])
+        for scenarios, set_tags in zip(scenario_sets, tags, strict=True)
+    ]
+
+
+def run_scenarios(scenarios: dict) -> MintwebResults:
+    """Run columnar scenarios through the controller, only computing those missing from the result caches.
+
+    Results are looked up in the in-process cache, then the persistent store, then the cache shared between replicas.
+    Scenarios with identical canonical inputs are run once and their results copied out to each of their tags.
+    Controller calls are dispatched to the emulator worker pool so the result cache stays shared between them.
+    """
+    tags = scenarios["scenario_tag"]
+    rows = [
+        canonical_scenario(dict(zip(scenarios, values, strict=True)))
+        for values in zip(*scenarios.values(), strict=True)
+    ]
+    keys = [scenario_key(row) for row in rows]
+    rows_by_key = dict(zip(keys, rows, strict=True))
+    SCENARIOS_REQUESTED.inc(len(keys))
+    SCENARIOS_DISTINCT.inc(len(rows_by_key))
+
+    def run(keys_to_run: list[str]) -> dict[str, ScenarioResult]:
+        # Tag each scenario to run with its key so results can be split back out unambiguously
+        columns = {name: [rows_by_key[key][name] for key in keys_to_run] for name in scenarios}
+        columns["scenario_tag"] = keys_to_run
+        return split_results(run_controller(columns))
+
+    def compute(missing_keys: list[str]) -> dict[str, ScenarioResult]:
+        stored = result_store.get_many(missing_keys) if result_store.enabled else {}
+        to_run = [key for key in missing_keys if key not in stored]
+        if not to_run:
+            return stored
+        computed = shared_cache.get_or_compute(to_run, run) if shared_cache.enabled else run(to_run)
+        if result_store.enabled:
+            result_store.put_many(computed)
+        return {**stored, **computed}
+
+    if result_cache.enabled:
+        results = result_cache.get_or_compute(keys, compute)
+    elif result_store.enabled or shared_cache.enabled or len(rows_by_key) < len(keys):
+        results = compute(list(rows_by_key))
+    else:
+        return run_controller(scenarios)
+    return combine_results(tags, [results[key] for key in keys])
+
+
+def canonical_scenario(scenario: dict) -> dict:
+    """Scenario inputs normalised so that scenarios the emulator can't tell apart compare equal.
+
+    Numbers become floats, without negative zeros, and the future net type is dropped when no future nets are
+    distributed, which makes a net scenario without nets the same as the baseline.
+    """
+    canonical = {
+        name: float(value) + 0.0 if isinstance(value, int | float) else value for name, value in scenario.items()
+    }
+    if canonical["itn_future"] == 0 and canonical["routine"] == 0:
+        canonical["net_type_future"] = None
+    return canonical
+
+
+def run_controller(scenarios: dict) -> MintwebResults:
+    """Run columnar scenarios in the worker pool, coalesced with concurrent calls when enabled."""
+    check_cancelled("emulator", len(scenarios["scenario_tag"]))
+    if controller_coalescer.enabled:
+        return controller_coalescer.run(scenarios)
+    return call_controller(scenarios)
+
+
+@STAGE_DURATION.labels(stage="controller").time()
+def call_controller(scenarios: dict) -> MintwebResults:
+    """Run columnar scenarios through the controller in the worker pool, waiting for a free worker if needed.
+
+    The call is dropped from the pool's queue if the request it is for is cancelled before a worker picks it up.
+    """
+    future = emulator_pool.submit(run_mintweb_controller, **scenarios)
+    return cancellable_result(future, "pool", len(scenarios["scenario_tag"]))
+
+
+@dataclass
+class PendingControllerCall:
+    scenarios: dict
+    queued_at: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+    cancellation: RequestCancellation | None = field(default_factory=current_cancellation.get)
+
+
+class ControllerCoalescer:
+    """Collects controller calls arriving within a short window and runs them as one call.
+
+    The first caller of a window waits for it to close, or for the batch to reach `max_scenarios`, then runs the
+    merged call on behalf of everyone and hands each caller its own slice of the results. Calls for requests
+    cancelled before the window closes are left out of the merged call.
+    """
+
+    def __init__(self, window: float, max_scenarios: int):
+        self.window = window
+        self.max_scenarios = max_scenarios
+        self._pending: list[PendingControllerCall] = []
+        self._pending_scenarios = 0
+        self._condition = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def run(self, scenarios: dict) -> MintwebResults:
+        call = PendingControllerCall(scenarios)
+        with self._condition:
+            self._pending.append(call)
+            self._pending_scenarios += len(scenarios["scenario_tag"])
+            is_leader = len(self._pending) == 1
+            if self._pending_scenarios >= self.max_scenarios:
+                self._condition.notify_all()
+
+            if is_leader:
+                closes_at = call.queued_at + self.window
+                while self._pending_scenarios < self.max_scenarios:
+                    remaining = closes_at - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending
+                self._pending = []
+                self._pending_scenarios = 0
+
+        if is_leader:
+            self._run_batch(batch)
+        return cancellable_result(call.future, "coalescer", len(scenarios["scenario_tag"]))
+
+    def _run_batch(self, batch: list[PendingControllerCall]) -> None:
+        batch = [call for call in batch if self._start(call)]
+        if not batch:
+            return
+        started_at = time.perf_counter()
+        for call in batch:
+            COALESCE_WAIT.observe(started_at - call.queued_at)
+        COALESCED_BATCH_REQUESTS.observe(len(batch))
+
+        scenario_sets = [call.scenarios for call in batch]
+        try:
+            merged, tags = merge_scenario_sets(scenario_sets)
+            COALESCED_BATCH_SCENARIOS.observe(len(merged["scenario_tag"]))
+            # Run on behalf of every caller, so not dropped if the leader's own request is cancelled
+            token = current_cancellation.set(None)
+            try:
+                results = call_controller(merged)
+            finally:
+                current_cancellation.reset(token)
+            call_results = split_scenario_sets(results, scenario_sets, tags)
+        except Exception as exc:
+            for call in batch:
+                call.future.set_exception(exc)
+            return
+
+        for call, results in zip(batch, call_results, strict=True):
+            call.future.set_result(results)
+
+    @staticmethod
+    def _start(call: PendingControllerCall) -> bool:
+        """Whether the call is still wanted, after which its caller can no longer cancel it."""
+        if not call.future.set_running_or_notify_cancel():
+            return False
+        if call.cancellation is not None:
+            try:
+                call.cancellation.check("coalescer", len(call.scenarios["scenario_tag"]))
+            except HTTPException as exc:
+                call.future.set_exception(exc)
+                return False
+        return True
+
+
+controller_coalescer = ControllerCoalescer(window=COALESCE_WINDOW_MS / 1000, max_scenarios=COALESCE_MAX_SCENARIOS)
+
+
+def split_results(results: MintwebResults) -> dict[str, ScenarioResult]:
+    """Split controller output into per-scenario results keyed by scenario tag."""
+    if results.prevalence is None or results.cases is None:
+        raise HTTPException(status_code=500, detail="Emulator model did not return prevalence or cases results")
+
+    prevalence = results.prevalence
+    prev_ood = prevalence["prev_ood"].to_numpy() if "prev_ood" in prevalence else np.zeros(len(prevalence), dtype=bool)
+    scenario_prevalence = split_groups(
+        prevalence["scenario"].to_numpy(),
+        prevalence["prevalence"].to_numpy(dtype=float),
+        prevalence["eir_valid"].to_numpy(),
+        prev_ood,
+    )
+    scenario_cases = split_groups(
+        results.cases["scenario"].to_numpy(), results.cases["cases_per_1000"].to_numpy(dtype=float)
+    )
+    return {
+        tag: ScenarioResult(
+            prevalence=values,
+            cases=scenario_cases[tag][0],
+            eir_valid=bool(eir_valid[0]),
+            prev_ood=bool(prev_ood[0]),
+        )
+        for tag, (values, eir_valid, prev_ood) in scenario_prevalence.items()
+    }
+
+
+def combine_results(tags: list[str], scenario_results: list[ScenarioResult]) -> MintwebResults:
+    """Stitch per-scenario results back into controller output, labelled with the given tags."""
+    prevalence_lengths = [len(result.prevalence) for result in scenario_results]
+    cases_lengths = [len(result.cases) for result in scenario_results]
+    eir_valid = [result.eir_valid for result in scenario_results]
+    prev_ood = [result.prev_ood for result in scenario_results]
+
+    prevalence_tags = np.repeat(tags, prevalence_lengths)
+    prevalence = pd.DataFrame(
+        {
+            "prevalence": np.concatenate([result.prevalence for result in scenario_results]),
+            "scenario": prevalence_tags,
+            "scenario_tag": prevalence_tags,
+            "eir_valid": np.repeat(eir_valid, prevalence_lengths),
+            "prev_ood": np.repeat(prev_ood, prevalence_lengths),
+        }
+    )
+    cases = pd.DataFrame(
+        {
+            "cases_per_1000": np.concatenate([result.cases for result in scenario_results]),
+            "scenario": np.repeat(tags, cases_lengths),
+        }
+    )
+    return MintwebResults(
+        prevalence=prevalence,
+        cases=cases,
+        scenario_meta=pd.DataFrame({"scenario_tag": tags, "eir_valid": eir_valid, "prev_ood": prev_ood}),
+        eir_valid=any(eir_valid),
+        prev_ood=any(prev_ood),
+    )
+
+
+@STAGE_DURATION.labels(stage="build_scenarios").time()
 def build_scenarios(
     emulator_request: EmulatorRequest,
 ) -> Annotated[dict, "EmulatorScenario with values as list for each scenario"]:
@@ -22,6 +532,7 @@ def build_scenarios(
 
     scenarios.extend(build_intervention_scenarios(emulator_request, base_scenario))
 
+    REQUEST_SCENARIOS.observe(len(scenarios))
     return scenarios_to_dict(scenarios)
 
 
@@ -33,13 +544,11 @@ def build_intervention_scenarios(
 
     # IRS only scenario
     if emulator_request.irs_future > 0:
-        scenarios.append(
-            base_scenario.model_copy(update={"scenario_tag": "irs_only", "irs_future": emulator_request.irs_future})
-        )
+        scenarios.append(replace(base_scenario, scenario_tag="irs_only", irs_future=emulator_request.irs_future))
 
     # LSM only scenario
     if emulator_request.lsm > 0:
-        scenarios.append(base_scenario.model_copy(update={"scenario_tag": "lsm_only", "lsm": emulator_request.lsm}))
+        scenarios.append(replace(base_scenario, scenario_tag="lsm_only", lsm=emulator_request.lsm))
 
     # Net type scenarios (with optional LSM)
     scenarios.extend(build_net_scenarios(emulator_request, base_scenario))
@@ -52,26 +561,18 @@ def build_net_scenarios(emulator_request: EmulatorRequest, base_scenario: Emulat
     scenarios = []
     for net_type in emulator_request.net_type_future:
         # Net only scenario
-        net_scenario = base_scenario.model_copy(
-            update={
-                "scenario_tag": f"{net_type.value}_only",
-                "net_type_future": net_type.value,
-                "itn_future": emulator_request.itn_future,
-                "routine": emulator_request.routine,
-            }
+        net_scenario = replace(
+            base_scenario,
+            scenario_tag=f"{net_type.value}_only",
+            net_type_future=net_type.value,
+            itn_future=emulator_request.itn_future,
+            routine=emulator_request.routine,
         )
         scenarios.append(net_scenario)
 
         # Net with LSM scenario
         if emulator_request.lsm > 0:
-            scenarios.append(
-                net_scenario.model_copy(
-                    update={
-                        "scenario_tag": f"{net_type.value}_with_lsm",
-                        "lsm": emulator_request.lsm,
-                    }
-                )
-            )
+            scenarios.append(replace(net_scenario, scenario_tag=f"{net_type.value}_with_lsm", lsm=emulator_request.lsm))
 
     return scenarios
 
@@ -81,33 +582,129 @@ def scenarios_to_dict(scenarios: list[EmulatorScenario]) -> dict:
     if not scenarios:
         return {}
 
-    return {key: [scenario.model_dump()[key] for scenario in scenarios] for key in scenarios[0].model_dump().keys()}
+    # One tuple of field values per scenario, transposed into the columns the controller takes
+    columns = zip(*map(scenario_values, scenarios), strict=True)
+    return {name: list(column) for name, column in zip(SCENARIO_FIELDS, columns, strict=True)}
 
 
 def build_base_scenario(emulator_request: EmulatorRequest) -> EmulatorScenario:
     """Build the base scenario from the emulator request."""
     return EmulatorScenario(
-        **emulator_request.model_dump(
-            include={"res_use", "py_only", "py_pbo", "py_pyrrole", "py_ppf", "prev", "Q0", "phi", "season", "irs"}
-        )
+        res_use=emulator_request.res_use,
+        py_only=emulator_request.py_only,
+        py_pbo=emulator_request.py_pbo,
+        py_pyrrole=emulator_request.py_pyrrole,
+        py_ppf=emulator_request.py_ppf,
+        prev=emulator_request.prev,
+        Q0=emulator_request.Q0,
+        phi=emulator_request.phi,
+        season=emulator_request.season,
+        irs=emulator_request.irs,
     )
 
 
+@STAGE_DURATION.labels(stage="post_process").time()
 def post_process_results(results: MintwebResults) -> EmulatorResponse:
     """Process emulator results into response format."""
     if results.prevalence is None or results.cases is None:
         raise HTTPException(status_code=500, detail="Emulator model did not return prevalence or cases results")
 
-    # Process prevalence data (fortnightly time steps)
-    prevalence_df = results.prevalence.drop(columns=["scenario_tag", "eir_valid"])
-    prevalence_df["days"] = prevalence_df.groupby("scenario").cumcount() * 14
+    # Prevalence is fortnightly and cases yearly, counted from the start of each scenario's rows
+    prevalence_scenarios = results.prevalence["scenario"].to_numpy()
+    cases_scenarios = results.cases["scenario"].to_numpy()
+    days = group_positions(prevalence_scenarios) * 14
+    years = group_positions(cases_scenarios) + 1
+
+    # Plain columns go through a single validation call, rather than a DataFrame and dict per row
+    return EmulatorResponse.model_validate(
+        {
+            "prevalence": [
+                {"scenario": scenario, "days": day, "prevalence": prevalence}
+                for scenario, day, prevalence in zip(
+                    prevalence_scenarios.tolist(),
+                    days.tolist(),
+                    results.prevalence["prevalence"].to_numpy(dtype=float).tolist(),
+                    strict=True,
+                )
+            ],
+            "cases": [
+                {"scenario": scenario, "year": year, "casesPer1000": cases}
+                for scenario, year, cases in zip(
+                    cases_scenarios.tolist(),
+                    years.tolist(),
+                    results.cases["cases_per_1000"].to_numpy(dtype=float).tolist(),
+                    strict=True,
+                )
+            ],
+            "eirValid": results.eir_valid,
+        }
+    )
+
 
-    # Process cases data
-    cases_df = results.cases.rename(columns={"cases_per_1000": "casesPer1000"})
-    cases_df["year"] = cases_df.groupby("scenario").cumcount() + 1
+def group_runs(groups: np.ndarray) -> tuple[np.ndarray | None, np.ndarray]:
+    """Order of elements bringing each group's elements together, and where each group starts in that order.
+
+    The order is None when each group is already one contiguous run, as the controller returns them. Otherwise groups
+    are ordered by first appearance, with their elements in their original order.
+    """
+    if len(groups) == 0:
+        return None, np.zeros(0, dtype=np.int64)
+
+    run_starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    if len(set(groups[run_starts].tolist())) == len(run_starts):
+        return None, run_starts
+
+    _, first_positions, inverse = np.unique(groups, return_index=True, return_inverse=True)
+    order = np.argsort(np.argsort(first_positions)[inverse], kind="stable")
+    ordered = groups[order]
+    return order, np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+
+
+def group_positions(groups: np.ndarray) -> np.ndarray:
+    """Position of each element among the elements of its group, in order of appearance."""
+    order, run_starts = group_runs(groups)
+    run_lengths = np.diff(np.r_[run_starts, len(groups)])
+    positions = np.arange(len(groups)) - np.repeat(run_starts, run_lengths)
+    if order is None:
+        return positions
+
+    unordered = np.empty(len(groups), dtype=np.int64)
+    unordered[order] = positions
+    return unordered
+
+
+def split_groups(groups: np.ndarray, *columns: np.ndarray) -> dict[str, tuple[np.ndarray, ...]]:
+    """Split columns into the elements of each group, keyed by group in order of appearance."""
+    order, run_starts = group_runs(groups)
+    if order is not None:
+        groups = groups[order]
+        columns = tuple(column[order] for column in columns)
+    group_columns = zip(*(np.split(column, run_starts[1:]) for column in columns), strict=True)
+    return dict(zip(groups[run_starts].tolist(), group_columns, strict=True))
+
+
+@STAGE_DURATION.labels(stage="post_process").time()
+def post_process_results_columnar(results: MintwebResults) -> ColumnarEmulatorResponse:
+    """Process emulator results into one prevalence and cases series per scenario."""
+    if results.prevalence is None or results.cases is None:
+        raise HTTPException(status_code=500, detail="Emulator model did not return prevalence or cases results")
+
+    scenario_prevalence = split_groups(
+        results.prevalence["scenario"].to_numpy(), results.prevalence["prevalence"].to_numpy(dtype=float)
+    )
+    scenario_cases = split_groups(
+        results.cases["scenario"].to_numpy(), results.cases["cases_per_1000"].to_numpy(dtype=float)
+    )
+    # Scenarios normally share their length; shorter series cover the start of the axes
+    prevalence_steps = max((len(prevalence) for (prevalence,) in scenario_prevalence.values()), default=0)
+    cases_years = max((len(cases) for (cases,) in scenario_cases.values()), default=0)
 
-    return EmulatorResponse(
-        prevalence=prevalence_adapter.validate_python(prevalence_df.to_dict(orient="records")),
-        cases=cases_adapter.validate_python(cases_df.to_dict(orient="records")),
+    return ColumnarEmulatorResponse(
+        days=list(range(0, prevalence_steps * 14, 14)),
+        year=list(range(1, cases_years + 1)),
+        scenarios=[
+            ScenarioSeries(scenario=tag, prevalence=prevalence.tolist(), casesPer1000=scenario_cases[tag][0].tolist())
+            for tag, (prevalence,) in scenario_prevalence.items()
+        ],
         eirValid=results.eir_valid,
     )
@@ -0,0 +1,142 @@
+import json
+from collections.abc import Iterator
+from enum import Enum
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+from fastapi import HTTPException
+from fastapi import Response as HttpResponse
+from fastapi.responses import StreamingResponse
+from minte import MintwebResults
+from prometheus_client import Histogram
+from pydantic import BaseModel
+
+from app.services.emulator import STAGE_DURATION, group_positions
+
+# Metrics in the Arrow table, in the order of its metric dictionary
+ARROW_METRICS = ["prevalence", "casesPer1000"]
+
+RESPONSE_SIZE = Histogram(
+    "emulator_response_size_bytes",
+    "Size of encoded emulator response bodies",
+    ["encoding"],
+    buckets=(1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2.5e7, 5e7),
+)
+
+
+# Media ranges answered with the default encoding
+WILDCARD_MEDIA_RANGES = {"*/*", "application/*"}
+
+
+class ResultEncoding(Enum):
+    json = "application/json"
+    arrow = "application/vnd.apache.arrow.stream"
+    msgpack = "application/msgpack"
+    ndjson = "application/x-ndjson"
+
+
+def negotiate_encoding(
+    accept: str | None, supported: tuple[ResultEncoding, ...] = tuple(ResultEncoding)
+) -> ResultEncoding:
+    """Supported encoding the Accept header prefers, falling back to JSON.
+
+    JSON is always available, and is what wildcard media ranges ask for.
+    """
+    best, best_quality = ResultEncoding.json, 0.0
+    for media_range in (accept or "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        media_type = media_type.lower()
+        if media_type in WILDCARD_MEDIA_RANGES:
+            encoding = ResultEncoding.json
+        else:
+            try:
+                encoding = ResultEncoding(media_type)
+            except ValueError:
+                continue
+            if encoding not in supported and encoding is not ResultEncoding.json:
+                continue
+        quality = media_range_quality(params)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def media_range_quality(params: list[str]) -> float:
+    """The q parameter of a media range, taken as 1 when it is missing or can't be parsed."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return min(max(float(value), 0.0), 1.0)
+            except ValueError:
+                return 1.0
+    return 1.0
+
+
+def encoded_response(model: BaseModel, encoding: ResultEncoding = ResultEncoding.json) -> HttpResponse:
+    """The response document as JSON, or packed as MessagePack."""
+    with STAGE_DURATION.labels(stage="encode").time():
+        if encoding is ResultEncoding.msgpack:
+            content = msgpack.packb(model.model_dump(mode="json", by_alias=True))
+        else:
+            encoding = ResultEncoding.json
+            content = model.model_dump_json(by_alias=True).encode()
+    return sized_response(content, encoding)
+
+
+def arrow_response(results: MintwebResults) -> HttpResponse:
+    with STAGE_DURATION.labels(stage="encode").time():
+        sink = pa.BufferOutputStream()
+        table = results_to_arrow(results)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        content = sink.getvalue().to_pybytes()
+    return sized_response(content, ResultEncoding.arrow)
+
+
+def ndjson_response(lines: Iterator[str]) -> StreamingResponse:
+    return StreamingResponse(measure_stream(lines), media_type=ResultEncoding.ndjson.value)
+
+
+def sized_response(content: bytes, encoding: ResultEncoding) -> HttpResponse:
+    RESPONSE_SIZE.labels(encoding=encoding.name).observe(len(content))
+    return HttpResponse(content=content, media_type=encoding.value)
+
+
+def measure_stream(lines: Iterator[str]) -> Iterator[bytes]:
+    size = 0
+    for line in lines:
+        chunk = line.encode()
+        size += len(chunk)
+        yield chunk
+    RESPONSE_SIZE.labels(encoding=ResultEncoding.ndjson.name).observe(size)
+
+
+def results_to_arrow(results: MintwebResults) -> pa.Table:
+    """
+    Controller output as one long table of scenario, metric, time and value columns.
+
+    Time is in days for prevalence and in years for cases, and eirValid is kept in the schema metadata.
+    """
+    if results.prevalence is None or results.cases is None:
+        raise HTTPException(status_code=500, detail="Emulator model did not return prevalence or cases results")
+
+    prevalence_scenarios = results.prevalence["scenario"].to_numpy()
+    cases_scenarios = results.cases["scenario"].to_numpy()
+    scenarios = np.concatenate([prevalence_scenarios, cases_scenarios])
+    metrics = np.repeat(np.arange(len(ARROW_METRICS), dtype=np.int8), [len(prevalence_scenarios), len(cases_scenarios)])
+    times = np.concatenate([group_positions(prevalence_scenarios) * 14, group_positions(cases_scenarios) + 1])
+    values = np.concatenate(
+        [results.prevalence["prevalence"].to_numpy(dtype=float), results.cases["cases_per_1000"].to_numpy(dtype=float)]
+    )
+
+    table = pa.table(
+        {
+            "scenario": pa.array(scenarios, pa.string()).dictionary_encode(),
+            "metric": pa.DictionaryArray.from_arrays(metrics, ARROW_METRICS),
+            "time": pa.array(times, pa.int32()),
+            "value": pa.array(values, pa.float64()),
+        }
+    )
+    return table.replace_schema_metadata({"eirValid": json.dumps(bool(results.eir_valid))})
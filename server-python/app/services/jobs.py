@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import HTTPException
+from prometheus_client import Counter
+
+from app.config import JOB_CHUNK_SCENARIOS, JOB_MAX_JOBS, JOB_TTL, JOB_WORKERS
+from app.models import JobInfo, JobKind, JobRequest, JobStatus, RunJobRequest, SweepJobRequest
+from app.services.emulator import EmulationPlan, plan_emulator_batch, plan_emulator_model, run_scenario_sets
+from app.services.sweep import plan_emulator_sweep
+
+logger = logging.getLogger(__name__)
+
+JOBS_FINISHED = Counter("emulator_jobs_finished_total", "Emulator jobs finished, by final status", ["status"])
+JOBS_EVICTED = Counter("emulator_jobs_evicted_total", "Finished emulator jobs evicted from the job store")
+
+FINISHED_STATUSES = {JobStatus.succeeded, JobStatus.failed, JobStatus.cancelled}
+
+# Seconds between progress checks of a job's event stream
+EVENTS_POLL_INTERVAL = 0.25
+
+
+@dataclass
+class Job:
+    id: str
+    kind: JobKind
+    plan: EmulationPlan
+    status: JobStatus = JobStatus.pending
+    scenarios_done: int = 0
+    result: Any = None
+    error: str | None = None
+    finished_at: float | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def info(self) -> JobInfo:
+        with self._lock:
+            return JobInfo(
+                id=self.id,
+                kind=self.kind,
+                status=self.status,
+                scenariosDone=self.scenarios_done,
+                scenariosTotal=self.plan.scenario_count,
+                error=self.error,
+            )
+
+    def start(self) -> bool:
+        """Mark the job as running, unless it was cancelled while pending."""
+        with self._lock:
+            if self.status is not JobStatus.pending:
+                return False
+            self.status = JobStatus.running
+            return True
+
+    def advance(self, scenarios: int) -> bool:
+        """Record finished scenarios, returning whether the job should carry on."""
+        with self._lock:
+            self.scenarios_done += scenarios
+            return self.status is JobStatus.running
+
+    def finish(self, status: JobStatus, result: Any = None, error: str | None = None) -> None:
+        with self._lock:
+            if self.finished:
+                return
+            self.status, self.result, self.error = status, result, error
+            self.finished_at = time.monotonic()
+        JOBS_FINISHED.labels(status=status.value).inc()
+
+
+class JobManager:
+    """Bounded in-memory store of emulator jobs, run in background threads.
+
+    Finished jobs are kept for `ttl` seconds so their results can be fetched, then evicted by `evict_expired`.
+    """
+
+    def __init__(self, max_jobs: int, ttl: float, workers: int, chunk_scenarios: int):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.workers = workers
+        self.chunk_scenarios = chunk_scenarios
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="emulator-job")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.finish(JobStatus.cancelled)
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def submit(self, job_request: JobRequest) -> Job:
+        """Plan a job, so invalid requests fail straight away, and queue it to run."""
+        job = Job(id=uuid.uuid4().hex, kind=JobKind(job_request.kind), plan=plan_job(job_request))
+        with self._lock:
+            self._evict(time.monotonic())
+            if len(self._jobs) >= self.max_jobs:
+                # Make room by dropping the oldest finished jobs before their time is up
+                for finished_job in [queued for queued in self._jobs.values() if queued.finished]:
+                    if len(self._jobs) < self.max_jobs:
+                        break
+                    del self._jobs[finished_job.id]
+                    JOBS_EVICTED.inc()
+            if len(self._jobs) >= self.max_jobs:
+                raise HTTPException(status_code=503, detail="Too many jobs, please try again later")
+            self._jobs[job.id] = job
+
+        # Without an executor, as when the app runs without its lifespan, jobs run before submit returns
+        if self._executor is None:
+            self.run(job)
+        else:
+            self._executor.submit(self.run, job)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Job not found") from None
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel an unfinished job. Scenarios already sent to the emulator finish, but their results are dropped."""
+        job = self.get(job_id)
+        job.finish(JobStatus.cancelled)
+        return job
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            return self._evict(time.monotonic())
+
+    def _evict(self, now: float) -> int:
+        expired = [
+            job.id for job in self._jobs.values() if job.finished_at is not None and now - job.finished_at >= self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        JOBS_EVICTED.inc(len(expired))
+        return len(expired)
+
+    def run(self, job: Job) -> None:
+        if not job.start():
+            return
+        try:
+            results = []
+            for scenario_sets in chunk_scenario_sets(job.plan.scenario_sets, self.chunk_scenarios):
+                results.extend(run_scenario_sets(scenario_sets))
+                if not job.advance(sum(len(scenarios["scenario_tag"]) for scenarios in scenario_sets)):
+                    return
+            job.finish(JobStatus.succeeded, result=job.plan.assemble(results))
+        except HTTPException as exc:
+            job.finish(JobStatus.failed, error=exc.detail)
+        except Exception:
+            logger.exception(f"Job {job.id} failed")
+            job.finish(JobStatus.failed, error="Internal server error")
+
+
+def plan_job(job_request: JobRequest) -> EmulationPlan:
+    if isinstance(job_request, RunJobRequest):
+        return plan_emulator_model(job_request.request, job_request.response_format)
+    if isinstance(job_request, SweepJobRequest):
+        return plan_emulator_sweep(job_request.request)
+    return plan_emulator_batch(job_request.request, job_request.response_format)
+
+
+def chunk_scenario_sets(scenario_sets: list[dict], max_scenarios: int) -> list[list[dict]]:
+    """Group consecutive scenario sets into chunks of up to `max_scenarios` scenarios, never splitting a set."""
+    chunks: list[list[dict]] = []
+    chunk_scenarios = 0
+    for scenarios in scenario_sets:
+        count = len(scenarios["scenario_tag"])
+        if not chunks or chunk_scenarios + count > max_scenarios:
+            chunks.append([])
+            chunk_scenarios = 0
+        chunks[-1].append(scenarios)
+        chunk_scenarios += count
+    return chunks
+
+
+async def job_events(job: Job) -> AsyncIterator[str]:
+    """Server-sent events with the job's status each time its progress changes, until it finishes."""
+    last_info = None
+    while True:
+        info = job.info()
+        if info != last_info:
+            yield f"data: {info.model_dump_json()}\n\n"
+            last_info = info
+        if info.status in FINISHED_STATUSES:
+            return
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+
+async def evict_jobs_periodically(manager: JobManager, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        manager.evict_expired()
+
+
+job_manager = JobManager(max_jobs=JOB_MAX_JOBS, ttl=JOB_TTL, workers=JOB_WORKERS, chunk_scenarios=JOB_CHUNK_SCENARIOS)
@@ -0,0 +1,130 @@
+import logging
+import multiprocessing
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import ParamSpec, TypeVar
+
+from fastapi import HTTPException
+from prometheus_client import Gauge
+
+from app.config import EMULATOR_MAX_QUEUE, EMULATOR_MAX_TASKS_PER_WORKER, EMULATOR_WORKERS
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Each server process has its own pool, so these are summed over the live ones
+POOL_WORKERS = Gauge("emulator_pool_workers", "Worker processes in the emulator pool", multiprocess_mode="livesum")
+POOL_BUSY_WORKERS = Gauge(
+    "emulator_pool_busy_workers", "Emulator pool workers currently running a task", multiprocess_mode="livesum"
+)
+POOL_QUEUED_TASKS = Gauge(
+    "emulator_pool_queued_tasks", "Emulator tasks waiting for a free worker", multiprocess_mode="livesum"
+)
+
+
+def import_emulator() -> None:
+    """Worker initializer: import minte once so tasks don't pay for it."""
+    import minte  # noqa: F401, PLC0415
+
+
+class EmulatorPool:
+    """Pool of worker processes for CPU-bound emulator calls, with a bounded queue.
+
+    With no workers configured, tasks run in the calling thread. If a worker dies, which breaks the executor for good,
+    the tasks it had fail and a new executor takes the next ones.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_tasks_per_worker: int = 0,
+        max_queue: int = 0,
+        initializer: Callable[[], None] | None = import_emulator,
+    ):
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def has_capacity(self) -> bool:
+        """Whether another task would be accepted rather than rejected for a full queue."""
+        with self._lock:
+            return self._executor is None or self._pending < self.workers + self.max_queue
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        POOL_WORKERS.set(self.workers)
+        logger.info(f"Started emulator pool with {self.workers} workers")
+
+    def shutdown(self) -> None:
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        POOL_WORKERS.set(0)
+
+    def submit(self, fn: Callable[P, R], /, *args: P.args, **kwargs: P.kwargs) -> Future[R]:
+        """Queue `fn` on a worker, rejecting it with a 503 if the queue is full."""
+        if self._executor is None:
+            future: Future[R] = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                raise HTTPException(status_code=503, detail="Emulator queue is full, please try again later")
+            try:
+                future = self._executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                logger.warning("Emulator pool is broken, most likely by a worker dying; replacing it")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create_executor()
+                future = self._executor.submit(fn, *args, **kwargs)
+            # Only counted once queued, so a failed submit doesn't leave a task pending forever
+            self._pending += 1
+            self._update_gauges()
+
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            # Spawned workers don't inherit the parent's threads or model state, and can be recycled
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+            max_tasks_per_child=self.max_tasks_per_worker or None,
+        )
+
+    def _task_done(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        POOL_BUSY_WORKERS.set(min(self._pending, self.workers))
+        POOL_QUEUED_TASKS.set(max(self._pending - self.workers, 0))
+
+
+emulator_pool = EmulatorPool(
+    workers=EMULATOR_WORKERS,
+    max_tasks_per_worker=EMULATOR_MAX_TASKS_PER_WORKER,
+    max_queue=EMULATOR_MAX_QUEUE,
+)
@@ -1,8 +1,13 @@
 import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
+from types import MappingProxyType
 from typing import Annotated
 
 import jsonschema
+from jsonschema.protocols import Validator
 
 from app.models import (
     CompareParameter,
@@ -12,25 +17,64 @@ from app.models import (
 )
 
 APP_DIR = Path(__file__).parent.parent
+SCHEMA_SUFFIX = ".schema.json"
 
 
-def validate_json(instance, schema_name: str) -> None:
-    schema_path = APP_DIR / "schemas" / f"{schema_name}.schema.json"
-    schema = json.loads(schema_path.read_text())
-    jsonschema.validate(instance=instance, schema=schema)
+@dataclass(frozen=True)
+class ResourceRegistry:
+    """Static resources, loaded and validated once. Treat everything in it as read-only."""
 
+    dynamic_form_options: dict
+    validators: Mapping[str, Validator]
+    form_fields: Mapping[str, dict]
+    compare_parameters: CompareParametersResponse
 
-def get_dynamic_form_options() -> dict:
+
+@cache
+def get_resources() -> ResourceRegistry:
+    """Shared resource registry, built on first use. Loading it at startup surfaces invalid resources early."""
+    return load_resources()
+
+
+def load_resources() -> ResourceRegistry:
+    validators = load_validators()
     options_path = APP_DIR / "resources" / "dynamicFormOptions.json"
     options = json.loads(options_path.read_text())
+    validators["DynamicFormOptions"].validate(options)
+
+    form_fields = index_form_fields(options)
+    return ResourceRegistry(
+        dynamic_form_options=options,
+        validators=MappingProxyType(validators),
+        form_fields=MappingProxyType(form_fields),
+        compare_parameters=build_compare_parameters(form_fields),
+    )
+
+
+def load_validators() -> dict[str, Validator]:
+    """Compile a validator for each schema in the schemas directory, keyed by schema name."""
+    validators = {}
+    for schema_path in sorted((APP_DIR / "schemas").glob(f"*{SCHEMA_SUFFIX}")):
+        schema = json.loads(schema_path.read_text())
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator_class.check_schema(schema)
+        validators[schema_path.name.removesuffix(SCHEMA_SUFFIX)] = validator_class(schema)
+    return validators
 
-    validate_json(options, "DynamicFormOptions")
 
-    return options
+def validate_json(instance, schema_name: str) -> None:
+    get_resources().validators[schema_name].validate(instance)
+
+
+def get_dynamic_form_options() -> dict:
+    return get_resources().dynamic_form_options
 
 
 def get_compare_parameters() -> CompareParametersResponse:
-    form_options = get_dynamic_form_options()
+    return get_resources().compare_parameters
+
+
+def build_compare_parameters(form_fields: Mapping[str, dict]) -> CompareParametersResponse:
     baseline_param_names = [
         ("current_malaria_prevalence", "Baseline prevalence"),
     ]
@@ -44,9 +88,9 @@ def get_compare_parameters() -> CompareParametersResponse:
         ("lsm", "LSM coverage", ["lsm_cost"]),
     ]
 
-    baseline_parameters = [create_compare_parameter(param_name, form_options) for param_name in baseline_param_names]
+    baseline_parameters = [create_compare_parameter(param_name, form_fields) for param_name in baseline_param_names]
     intervention_parameters = [
-        create_intervention_compare_parameter(param_name, form_options) for param_name in intervention_param_names
+        create_intervention_compare_parameter(param_name, form_fields) for param_name in intervention_param_names
     ]
 
     return CompareParametersResponse(
@@ -57,10 +101,10 @@ def get_compare_parameters() -> CompareParametersResponse:
 
 def create_intervention_compare_parameter(
     param: Annotated[tuple[str, str, list[str]], "parameter name, label, linked cost names"],
-    form_options: dict,
+    form_fields: Mapping[str, dict],
 ) -> InterventionCompareParameter:
     param_name, label, linked_cost_names = param
-    cost_fields = [get_form_field(cost_name, form_options) for cost_name in linked_cost_names]
+    cost_fields = [get_form_field(cost_name, form_fields) for cost_name in linked_cost_names]
     linked_costs = [
         InterventionCompareCost(
             cost_name=cost_field["id"],
@@ -69,16 +113,16 @@ def create_intervention_compare_parameter(
         for cost_field in cost_fields
     ]
     return InterventionCompareParameter(
-        **create_compare_parameter((param_name, label), form_options).model_dump(),
+        **create_compare_parameter((param_name, label), form_fields).model_dump(),
         linked_costs=linked_costs,
     )
 
 
 def create_compare_parameter(
-    param: Annotated[tuple[str, str], "parameter name, label"], form_options: dict
+    param: Annotated[tuple[str, str], "parameter name, label"], form_fields: Mapping[str, dict]
 ) -> CompareParameter:
     param_name, label = param
-    field = get_form_field(param_name, form_options)
+    field = get_form_field(param_name, form_fields)
     return CompareParameter(
         parameter_name=param_name,
         label=label,
@@ -87,10 +131,18 @@ def create_compare_parameter(
     )
 
 
-def get_form_field(parameter_name: str, form_options: dict) -> dict:
-    for group in form_options.get("groups", []):
-        for sub_group in group.get("subGroups", []):
-            for field in sub_group.get("fields", []):
-                if field.get("id") == parameter_name:
-                    return field
-    raise ValueError(f"Parameter '{parameter_name}' not found in form options.")
+def index_form_fields(form_options: dict) -> dict[str, dict]:
+    """Index the fields of every group and sub group by id."""
+    return {
+        field["id"]: field
+        for group in form_options.get("groups", [])
+        for sub_group in group.get("subGroups", [])
+        for field in sub_group.get("fields", [])
+    }
+
+
+def get_form_field(parameter_name: str, form_fields: Mapping[str, dict]) -> dict:
+    try:
+        return form_fields[parameter_name]
+    except KeyError:
+        raise ValueError(f"Parameter '{parameter_name}' not found in form options.") from None
@@ -0,0 +1,203 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from itertools import batched
+from typing import Generic, TypeVar
+
+from estimint import __version__ as estimint_version
+from minte import __version__ as minte_version
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Versions of the emulator packages producing the results, as reported on /version
+RESULT_NAMESPACE = f"minte={minte_version};estimint={estimint_version}"
+# Seconds to wait for another process holding the database's write lock
+SQLITE_TIMEOUT = 5.0
+# Keys looked up per query, well below SQLite's limit on bound parameters
+SQLITE_BATCH_SIZE = 500
+# Seconds reads may go without writing when their results were used, so one write covers many reads
+TOUCH_FLUSH_INTERVAL = 10.0
+# Share of `max_size` a process writes between checks of the store's size, by which the store may exceed it meanwhile
+SIZE_CHECK_FRACTION = 0.05
+
+STORE_HITS = Counter("emulator_result_store_hits_total", "Scenario results served from the persistent result store")
+STORE_MISSES = Counter(
+    "emulator_result_store_misses_total", "Scenario results missing from the persistent result store"
+)
+STORE_EVICTIONS = Counter(
+    "emulator_result_store_evictions_total", "Scenario results evicted from the persistent result store"
+)
+STORE_ERRORS = Counter("emulator_result_store_errors_total", "Failed persistent result store reads and writes")
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value BLOB NOT NULL,
+        used_at INTEGER NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at)",
+)
+
+
+class ResultStore(Generic[T]):
+    """Size-bounded LRU store of scenario results in an SQLite database on a local volume.
+
+    The database is in WAL mode so every worker process on a node can share it. Results are namespaced by the
+    emulator versions, and those of other versions are dropped when a process first opens the store. Database errors
+    are logged and treated as misses, so a broken volume slows requests down rather than failing them.
+
+    Reads only take the database's write lock every `TOUCH_FLUSH_INTERVAL` seconds, to record when their results were
+    used, and writes only count the stored results every so often to evict the least recently used ones.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int,
+        encode: Callable[[T], bytes],
+        decode: Callable[[bytes], T],
+        namespace: str = RESULT_NAMESPACE,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.encode = encode
+        self.decode = decode
+        self.namespace = namespace
+        self._local = threading.local()
+        self._prepared = False
+        self._lock = threading.Lock()
+        self._touched: dict[str, int] = {}
+        self._touches_flushed_at = time.monotonic()
+        # Starting at the threshold, so the size is checked on the first write
+        self._writes_since_size_check = self._size_check_interval
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_size > 0
+
+    def __len__(self) -> int:
+        query = "SELECT COUNT(*) FROM results WHERE namespace = ?"
+        return self._connection().execute(query, (self.namespace,)).fetchone()[0]
+
+    @property
+    def _size_check_interval(self) -> int:
+        return max(int(self.max_size * SIZE_CHECK_FRACTION), 1)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, T]:
+        """Stored results of whichever keys are present, marking them as recently used."""
+        keys = list(keys)
+        try:
+            connection = self._connection()
+            rows = [
+                row
+                for batch in batched(keys, SQLITE_BATCH_SIZE)
+                for row in connection.execute(
+                    f"SELECT key, value FROM results WHERE namespace = ? AND key IN ({', '.join('?' * len(batch))})",
+                    (self.namespace, *batch),
+                )
+            ]
+            self._touch([key for key, _ in rows])
+            if time.monotonic() - self._touches_flushed_at >= TOUCH_FLUSH_INTERVAL:
+                with self._transaction(connection):
+                    self._flush_touches(connection)
+        except sqlite3.Error:
+            logger.exception("Failed to read from the result store")
+            STORE_ERRORS.inc()
+            rows = []
+
+        STORE_HITS.inc(len(rows))
+        STORE_MISSES.inc(len(keys) - len(rows))
+        return {key: self.decode(value) for key, value in rows}
+
+    def put_many(self, results: dict[str, T]) -> None:
+        """Store results, evicting the least recently used ones beyond `max_size`."""
+        if not results:
+            return
+        rows = [(self.namespace, key, self.encode(result), time.time_ns()) for key, result in results.items()]
+        try:
+            connection = self._connection()
+            with self._transaction(connection):
+                # While holding the write lock anyway, and so that eviction sees the latest uses
+                self._flush_touches(connection)
+                connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+                if self._size_check_due(len(rows)):
+                    self._evict(connection)
+        except sqlite3.Error:
+            logger.exception("Failed to write to the result store")
+            STORE_ERRORS.inc()
+
+    def _touch(self, keys: list[str]) -> None:
+        used_at = time.time_ns()
+        with self._lock:
+            self._touched.update(dict.fromkeys(keys, used_at))
+
+    def _flush_touches(self, connection: sqlite3.Connection) -> None:
+        """Write when the results read since the last flush were used, within the caller's transaction."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._touches_flushed_at = time.monotonic()
+        if touched:
+            connection.executemany(
+                "UPDATE results SET used_at = ? WHERE namespace = ? AND key = ?",
+                [(used_at, self.namespace, key) for key, used_at in touched.items()],
+            )
+
+    def _size_check_due(self, written: int) -> bool:
+        with self._lock:
+            self._writes_since_size_check += written
+            if self._writes_since_size_check < self._size_check_interval:
+                return False
+            self._writes_since_size_check = 0
+            return True
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        excess = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_size
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY used_at LIMIT ?)", (excess,)
+            )
+            STORE_EVICTIONS.inc(excess)
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, preparing the database when the process first opens it."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode, with writes grouped into explicit transactions
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._prepared:
+                    self._prepare(connection)
+                    self._prepared = True
+            self._local.connection = connection
+        return connection
+
+    def _prepare(self, connection: sqlite3.Connection) -> None:
+        with self._transaction(connection):
+            for statement in SCHEMA:
+                connection.execute(statement)
+            dropped = connection.execute("DELETE FROM results WHERE namespace != ?", (self.namespace,)).rowcount
+        if dropped:
+            logger.info(f"Dropped {dropped} results of other emulator versions from the result store")
+
+    @contextmanager
+    def _transaction(self, connection: sqlite3.Connection) -> Iterator[None]:
+        # Take the write lock up front, so concurrent writers wait on the busy timeout rather than deadlocking
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
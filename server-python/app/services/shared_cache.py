@@ -0,0 +1,171 @@
+import logging
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from typing import Generic, TypeVar
+
+import redis
+from prometheus_client import Counter
+
+from app.services.cancellation import check_cancelled
+from app.services.result_store import RESULT_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Seconds between checks for results another replica is computing
+LOCK_POLL_INTERVAL = 0.05
+
+# Deletes a lock only if it still holds our token, so a lock that expired and was taken over is left alone
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+SHARED_HITS = Counter("emulator_shared_cache_hits_total", "Scenario results served from the shared Redis cache")
+SHARED_MISSES = Counter("emulator_shared_cache_misses_total", "Scenario results computed for the shared Redis cache")
+SHARED_WAITS = Counter(
+    "emulator_shared_cache_waits_total", "Scenario results waited for while another replica computed them"
+)
+SHARED_ERRORS = Counter("emulator_shared_cache_errors_total", "Failed shared Redis cache operations")
+
+
+class SharedResultCache(Generic[T]):
+    """Scenario result cache in Redis shared by all replicas, with single-flight computation across them.
+
+    A replica missing a result takes a lock on its key before computing it. Replicas finding the key locked wait for
+    the result to appear instead, and compute it themselves only if the lock is released or expires without one. Redis
+    errors are logged and the results computed locally, so an unavailable Redis slows requests down rather than
+    failing them.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: int,
+        lock_timeout: int,
+        *,
+        encode: Callable[[T], bytes],
+        decode: Callable[[bytes], T],
+        namespace: str = RESULT_NAMESPACE,
+        client: redis.Redis | None = None,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.encode = encode
+        self.decode = decode
+        self.prefix = f"mint:result:{namespace}:"
+        self._client = client
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url) or self._client is not None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def get_or_compute(self, keys: Iterable[str], compute: Callable[[list[str]], dict[str, T]]) -> dict[str, T]:
+        """Return results for all keys, calling `compute` with the keys no replica has or is computing."""
+        results: dict[str, T] = {}
+        keys = list(dict.fromkeys(keys))
+        while keys:
+            owned, token = [], ""
+            try:
+                found = self._get(keys)
+                owned, token = self._lock([key for key in keys if key not in found])
+                # Another replica may have stored a key and released its lock between reading and locking it
+                stored = self._get(owned)
+                if stored:
+                    self._unlock(list(stored), token)
+                    found.update(stored)
+                    owned = [key for key in owned if key not in stored]
+            except redis.RedisError:
+                logger.exception("Failed to read from the shared result cache")
+                SHARED_ERRORS.inc()
+                self._unlock(owned, token)
+                results.update(compute(keys))
+                break
+
+            SHARED_HITS.inc(len(found))
+            results.update(found)
+            if owned:
+                SHARED_MISSES.inc(len(owned))
+                results.update(self._compute_owned(owned, token, compute))
+
+            # Other replicas are computing the rest; once one of them finishes, look again
+            keys = [key for key in keys if key not in results]
+            if keys:
+                SHARED_WAITS.inc(len(keys))
+                self._wait(keys)
+        return results
+
+    def _get(self, keys: list[str]) -> dict[str, T]:
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: self.decode(value) for key, value in zip(keys, values, strict=True) if value is not None}
+
+    def _lock(self, keys: list[str]) -> tuple[list[str], str]:
+        """Take the locks of whichever keys are free, returning those keys and the token the locks hold."""
+        token = uuid.uuid4().hex
+        if not keys:
+            return [], token
+        pipeline = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.set(f"{self.prefix}{key}:lock", token, nx=True, ex=self.lock_timeout)
+        acquired = pipeline.execute()
+        return [key for key, locked in zip(keys, acquired, strict=True) if locked], token
+
+    def _compute_owned(
+        self, owned: list[str], token: str, compute: Callable[[list[str]], dict[str, T]]
+    ) -> dict[str, T]:
+        try:
+            computed = compute(owned)
+            self._store(computed)
+        finally:
+            self._unlock(owned, token)
+        return computed
+
+    def _store(self, results: dict[str, T]) -> None:
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for key, result in results.items():
+                pipeline.set(self.prefix + key, self.encode(result), ex=self.ttl)
+            pipeline.execute()
+        except redis.RedisError:
+            logger.exception("Failed to write to the shared result cache")
+            SHARED_ERRORS.inc()
+
+    def _unlock(self, keys: list[str], token: str) -> None:
+        try:
+            release = self.client.register_script(RELEASE_LOCK_SCRIPT)
+            pipeline = self.client.pipeline(transaction=False)
+            for key in keys:
+                release(keys=[f"{self.prefix}{key}:lock"], args=[token], client=pipeline)
+            pipeline.execute()
+        except redis.RedisError:
+            # The locks expire on their own
+            logger.exception("Failed to release shared result cache locks")
+            SHARED_ERRORS.inc()
+
+    def _wait(self, keys: list[str]) -> None:
+        """Wait until another replica releases one of the keys' locks, or they expire, or the request is cancelled."""
+        lock_keys = [f"{self.prefix}{key}:lock" for key in keys]
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            check_cancelled("shared_cache", len(keys))
+            time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                if self.client.exists(*lock_keys) < len(lock_keys):
+                    return
+            except redis.RedisError:
+                logger.exception("Failed to read from the shared result cache")
+                SHARED_ERRORS.inc()
+                return
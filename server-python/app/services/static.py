@@ -0,0 +1,64 @@
+import hashlib
+from dataclasses import dataclass
+from functools import cache
+
+from estimint import __version__ as estimint_version
+from fastapi import Response as HttpResponse
+from minte import __version__ as minte_version
+from pydantic import BaseModel
+
+from app import __version__
+from app.config import STATIC_MAX_AGE
+from app.models import Bootstrap, CompareParametersResponse, Response, Version
+from app.services.resources import get_compare_parameters, get_dynamic_form_options
+
+
+@dataclass(frozen=True)
+class StaticResponse:
+    """Pre-serialised JSON response body with a strong ETag."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "StaticResponse":
+        body = model.model_dump_json(by_alias=True).encode()
+        return cls(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    def respond(self, if_none_match: str | None = None) -> HttpResponse:
+        """Full response, or 304 Not Modified if the client already holds this ETag."""
+        headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={STATIC_MAX_AGE}"}
+        if if_none_match is not None and etag_matches(if_none_match, self.etag):
+            return HttpResponse(status_code=304, headers=headers)
+        return HttpResponse(content=self.body, media_type="application/json", headers=headers)
+
+
+@dataclass(frozen=True)
+class StaticResponses:
+    version: StaticResponse
+    options: StaticResponse
+    compare_parameters: StaticResponse
+    bootstrap: StaticResponse
+
+
+@cache
+def get_static_responses() -> StaticResponses:
+    """Responses that only change between deploys, serialised once."""
+    version = Version(server=__version__, minte=minte_version, estimint=estimint_version)
+    options = get_dynamic_form_options()
+    compare_parameters = get_compare_parameters()
+    return StaticResponses(
+        version=StaticResponse.from_model(Response[Version](data=version)),
+        options=StaticResponse.from_model(Response[dict](data=options)),
+        compare_parameters=StaticResponse.from_model(Response[CompareParametersResponse](data=compare_parameters)),
+        bootstrap=StaticResponse.from_model(
+            Response[Bootstrap](data=Bootstrap(version=version, options=options, compareParameters=compare_parameters))
+        ),
+    )
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
@@ -0,0 +1,352 @@
+import argparse
+import itertools
+import json
+import logging
+import operator
+import sys
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import asdict, dataclass, replace
+from functools import cache, reduce
+from pathlib import Path
+
+import numpy as np
+from minte import MintwebResults, run_mintweb_controller
+from prometheus_client import Counter
+
+from app.config import SURROGATE_DIR
+from app.models import EmulatorRequest, ItnFutureType
+from app.services.cache import scenario_key
+from app.services.emulator import (
+    SCENARIO_FIELDS,
+    EmulationPlan,
+    ScenarioResult,
+    build_base_scenario,
+    canonical_scenario,
+    combine_results,
+    run_scenario_sets,
+    split_results,
+)
+from app.services.resources import get_compare_parameters
+from app.services.result_store import RESULT_NAMESPACE
+from app.services.sweep import REQUEST_FIELDS
+
+logger = logging.getLogger(__name__)
+
+GRID_FILE = "grid.json"
+# Scenario inputs the grid spans, over the ranges of the compare parameters they belong to, with default point counts
+DEFAULT_GRID_POINTS = {"prev": 8, "itn_future": 6, "irs_future": 5, "lsm": 5}
+GRID_FIELDS = tuple(DEFAULT_GRID_POINTS)
+# Routine distribution is a yes/no setting, so both values are part of every grid
+ROUTINE_VALUES = (0.0, 1.0)
+# Inputs that stay fixed across a grid: a grid only answers requests matching all of them
+CONTEXT_FIELDS = tuple(
+    name for name in SCENARIO_FIELDS if name not in {"scenario_tag", "net_type_future", "routine", *GRID_FIELDS}
+)
+# Scenarios run per controller call while building a grid
+BUILD_CHUNK_SIZE = 500
+# Grid cells whose midpoints, where linear interpolation is least accurate, are checked against the emulator
+VALIDATION_SAMPLES = 32
+# Slack on the grid bounds for values that went through a percentage to fraction conversion
+AXIS_TOLERANCE = 1e-9
+
+APPROXIMATIONS = Counter(
+    "emulator_approximations_total",
+    "Scenario sets in approximate mode requests, by how they were answered",
+    ["outcome"],
+)
+
+
+@dataclass(frozen=True)
+class ErrorBound:
+    """Estimated largest absolute interpolation error of each emulator output."""
+
+    prevalence: float
+    cases_per_1000: float
+
+    def __or__(self, other: "ErrorBound") -> "ErrorBound":
+        return ErrorBound(max(self.prevalence, other.prevalence), max(self.cases_per_1000, other.cases_per_1000))
+
+
+@dataclass(frozen=True)
+class SurrogateGrid:
+    """Emulator outputs precomputed over the compare parameters' ranges, for one set of the other inputs.
+
+    Outputs are indexed by variant, the future net type and routine distribution of a scenario, then by position
+    along each grid axis. Prevalence and cases have a trailing time dimension.
+    """
+
+    context: dict
+    variants: list[tuple[str | None, float]]
+    axes: dict[str, np.ndarray]
+    prevalence: np.ndarray
+    cases: np.ndarray
+    eir_valid: np.ndarray
+    error_bound: ErrorBound
+
+    @property
+    def context_key(self) -> str:
+        return scenario_key(self.context)
+
+    def locate(self, rows: list[dict]) -> tuple[np.ndarray, np.ndarray] | None:
+        """Variant indices and grid coordinates of canonical scenario rows, if the grid covers all of them."""
+        variant_indices = {variant: index for index, variant in enumerate(self.variants)}
+        try:
+            variants = np.array([variant_indices[row["net_type_future"], row["routine"]] for row in rows])
+        except KeyError:
+            return None
+        points = np.array([[row[name] for name in self.axes] for row in rows], dtype=float)
+        lower = np.array([axis[0] for axis in self.axes.values()]) - AXIS_TOLERANCE
+        upper = np.array([axis[-1] for axis in self.axes.values()]) + AXIS_TOLERANCE
+        if np.any(points < lower) or np.any(points > upper):
+            return None
+        return variants, points
+
+    def interpolate(self, variants: np.ndarray, points: np.ndarray) -> list[ScenarioResult]:
+        """Multilinear interpolation between the grid points surrounding each point."""
+        lower, fractions = [], []
+        for dimension, axis in enumerate(self.axes.values()):
+            index = np.clip(np.searchsorted(axis, points[:, dimension], side="right") - 1, 0, len(axis) - 2)
+            lower.append(index)
+            fractions.append(np.clip((points[:, dimension] - axis[index]) / (axis[index + 1] - axis[index]), 0, 1))
+
+        prevalence = np.zeros((len(points), self.prevalence.shape[-1]))
+        cases = np.zeros((len(points), self.cases.shape[-1]))
+        eir_valid = np.ones(len(points), dtype=bool)
+        for corner in itertools.product((0, 1), repeat=len(lower)):
+            weight = np.prod([f if c else 1 - f for f, c in zip(fractions, corner, strict=True)], axis=0)
+            index = (variants, *(start + c for start, c in zip(lower, corner, strict=True)))
+            prevalence += weight[:, None] * self.prevalence[index]
+            cases += weight[:, None] * self.cases[index]
+            # Scenarios are only valid if every grid point they're interpolated from is
+            eir_valid &= self.eir_valid[index] | (weight == 0)
+
+        return [
+            ScenarioResult(prevalence=prevalence[row], cases=cases[row], eir_valid=bool(eir_valid[row]))
+            for row in range(len(points))
+        ]
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        # Outputs as float32 .npy files, which load memory-mapped
+        np.save(directory / "prevalence.npy", self.prevalence.astype(np.float32))
+        np.save(directory / "cases.npy", self.cases.astype(np.float32))
+        np.save(directory / "eir_valid.npy", self.eir_valid)
+        metadata = {
+            "namespace": RESULT_NAMESPACE,
+            "context": self.context,
+            "variants": self.variants,
+            "axes": {name: axis.tolist() for name, axis in self.axes.items()},
+            "errorBound": {"prevalence": self.error_bound.prevalence, "casesPer1000": self.error_bound.cases_per_1000},
+        }
+        (directory / GRID_FILE).write_text(json.dumps(metadata, indent=2) + "\n")
+
+    @classmethod
+    def load(cls, directory: Path) -> "SurrogateGrid":
+        metadata = json.loads((directory / GRID_FILE).read_text())
+        return cls(
+            context=metadata["context"],
+            variants=[tuple(variant) for variant in metadata["variants"]],
+            axes={name: np.array(axis) for name, axis in metadata["axes"].items()},
+            prevalence=np.load(directory / "prevalence.npy", mmap_mode="r"),
+            cases=np.load(directory / "cases.npy", mmap_mode="r"),
+            eir_valid=np.load(directory / "eir_valid.npy", mmap_mode="r"),
+            error_bound=ErrorBound(metadata["errorBound"]["prevalence"], metadata["errorBound"]["casesPer1000"]),
+        )
+
+
+class SurrogateRegistry:
+    """Surrogate grids keyed by the fixed inputs they were built for."""
+
+    def __init__(self, grids: Iterable[SurrogateGrid]):
+        self._grids = {grid.context_key: grid for grid in grids}
+
+    def __len__(self) -> int:
+        return len(self._grids)
+
+    def approximate(self, scenarios: dict) -> tuple[MintwebResults, ErrorBound] | None:
+        """Interpolated results of columnar scenarios, or None if no grid covers them."""
+        rows = [
+            canonical_scenario(dict(zip(scenarios, values, strict=True)))
+            for values in zip(*scenarios.values(), strict=True)
+        ]
+        context_keys = {scenario_key(scenario_context(row)) for row in rows}
+        grid = self._grids.get(context_keys.pop()) if len(context_keys) == 1 else None
+        located = grid.locate(rows) if grid is not None else None
+        if located is None:
+            return None
+        return combine_results(scenarios["scenario_tag"], grid.interpolate(*located)), grid.error_bound
+
+
+@cache
+def get_surrogates() -> SurrogateRegistry:
+    """Surrogate grids in the configured directory, loaded on first use."""
+    return load_surrogates(Path(SURROGATE_DIR)) if SURROGATE_DIR else SurrogateRegistry([])
+
+
+def load_surrogates(directory: Path) -> SurrogateRegistry:
+    grids = []
+    for grid_file in sorted(directory.glob(f"*/{GRID_FILE}")):
+        if json.loads(grid_file.read_text())["namespace"] != RESULT_NAMESPACE:
+            logger.warning(f"Skipping surrogate grid {grid_file.parent.name} built with other emulator versions")
+            continue
+        grids.append(SurrogateGrid.load(grid_file.parent))
+    logger.info(f"Loaded {len(grids)} surrogate grids")
+    return SurrogateRegistry(grids)
+
+
+def approximate_scenario_sets(scenario_sets: list[dict]) -> tuple[list[MintwebResults], ErrorBound | None]:
+    """Interpolate each set of scenarios a surrogate grid covers, and run the others through the emulator together.
+
+    The error bound is the largest of those of the grids used, or None if every set ran through the emulator.
+    """
+    surrogates = get_surrogates()
+    approximations = [surrogates.approximate(scenarios) for scenarios in scenario_sets]
+    exact_sets = [
+        scenarios
+        for scenarios, approximation in zip(scenario_sets, approximations, strict=True)
+        if approximation is None
+    ]
+    exact_results = iter(run_scenario_sets(exact_sets) if exact_sets else [])
+    APPROXIMATIONS.labels(outcome="approximated").inc(len(scenario_sets) - len(exact_sets))
+    APPROXIMATIONS.labels(outcome="exact").inc(len(exact_sets))
+
+    results = [next(exact_results) if approximation is None else approximation[0] for approximation in approximations]
+    error_bounds = [approximation[1] for approximation in approximations if approximation is not None]
+    return results, reduce(operator.or_, error_bounds) if error_bounds else None
+
+
+def approximate_plan[T](plan: EmulationPlan[T]) -> tuple[T, ErrorBound | None]:
+    results, error_bound = approximate_scenario_sets(plan.scenario_sets)
+    return plan.assemble(results), error_bound
+
+
+def approximation_headers(error_bound: ErrorBound | None) -> dict[str, str]:
+    """Response headers telling clients whether results were interpolated, and how far off they may be."""
+    if error_bound is None:
+        return {"X-Emulation-Mode": "exact"}
+    return {
+        "X-Emulation-Mode": "approximate",
+        "X-Error-Bound-Prevalence": f"{error_bound.prevalence:.6g}",
+        "X-Error-Bound-Cases-Per-1000": f"{error_bound.cases_per_1000:.6g}",
+    }
+
+
+def scenario_context(row: dict) -> dict:
+    return {name: row[name] for name in CONTEXT_FIELDS}
+
+
+def grid_axes(points: Mapping[str, int]) -> dict[str, np.ndarray]:
+    """Evenly spaced values over each grid field's compare parameter range, as fractions like the scenarios use."""
+    compare_parameters = get_compare_parameters()
+    ranges = {
+        REQUEST_FIELDS[parameter.parameter_name]: (parameter.min / 100, parameter.max / 100)
+        for parameter in [*compare_parameters.baseline_parameters, *compare_parameters.intervention_parameters]
+    }
+    return {name: np.linspace(*ranges[name], points.get(name, DEFAULT_GRID_POINTS[name])) for name in GRID_FIELDS}
+
+
+def build_surrogate_grid(
+    emulator_request: EmulatorRequest,
+    points: Mapping[str, int] = DEFAULT_GRID_POINTS,
+    run: Callable[..., MintwebResults] = run_mintweb_controller,
+    validation_samples: int = VALIDATION_SAMPLES,
+    seed: int = 0,
+) -> SurrogateGrid:
+    """Evaluate the emulator over a grid for the request's fixed inputs, and estimate its interpolation error."""
+    context = scenario_context(canonical_scenario(asdict(build_base_scenario(emulator_request))))
+    axes = grid_axes(points)
+    variants = [(None, 0.0), *((net_type.value, routine) for net_type in ItnFutureType for routine in ROUTINE_VALUES)]
+    shape = (len(variants), *(len(axis) for axis in axes.values()))
+
+    rows = [
+        grid_row(context, variant, dict(zip(axes, values, strict=True)))
+        for variant, values in itertools.product(variants, itertools.product(*axes.values()))
+    ]
+    results = evaluate_rows(rows, run)
+    grid = SurrogateGrid(
+        context=context,
+        variants=variants,
+        axes=axes,
+        prevalence=np.stack([result.prevalence for result in results]).reshape(*shape, -1),
+        cases=np.stack([result.cases for result in results]).reshape(*shape, -1),
+        eir_valid=np.array([result.eir_valid for result in results]).reshape(shape),
+        error_bound=ErrorBound(0.0, 0.0),
+    )
+    return replace(grid, error_bound=estimate_error_bound(grid, run, validation_samples, seed))
+
+
+def estimate_error_bound(
+    grid: SurrogateGrid, run: Callable[..., MintwebResults], samples: int, seed: int = 0
+) -> ErrorBound:
+    """Largest interpolation error against the emulator at the midpoints of randomly chosen grid cells."""
+    rng = np.random.default_rng(seed)
+    variants = rng.integers(len(grid.variants), size=samples)
+    cells = [rng.integers(len(axis) - 1, size=samples) for axis in grid.axes.values()]
+    points = np.column_stack(
+        [(axis[cell] + axis[cell + 1]) / 2 for axis, cell in zip(grid.axes.values(), cells, strict=True)]
+    )
+
+    rows = [
+        grid_row(grid.context, grid.variants[variant], dict(zip(grid.axes, point, strict=True)))
+        for variant, point in zip(variants, points.tolist(), strict=True)
+    ]
+    exact = evaluate_rows(rows, run)
+    approximate = grid.interpolate(variants, points)
+    return ErrorBound(
+        prevalence=max(
+            (float(np.abs(a.prevalence - e.prevalence).max()) for a, e in zip(approximate, exact, strict=True)),
+            default=0.0,
+        ),
+        cases_per_1000=max(
+            (float(np.abs(a.cases - e.cases).max()) for a, e in zip(approximate, exact, strict=True)), default=0.0
+        ),
+    )
+
+
+def grid_row(context: dict, variant: tuple[str | None, float], values: dict) -> dict:
+    net_type_future, routine = variant
+    row = {"scenario_tag": "", **context, "net_type_future": net_type_future, "routine": routine, **values}
+    return {name: row[name] for name in SCENARIO_FIELDS}
+
+
+def evaluate_rows(rows: list[dict], run: Callable[..., MintwebResults]) -> list[ScenarioResult]:
+    """Run scenario rows through the emulator a chunk at a time, returning their results in order."""
+    results = []
+    for start in range(0, len(rows), BUILD_CHUNK_SIZE):
+        chunk = rows[start : start + BUILD_CHUNK_SIZE]
+        columns = {name: [row[name] for row in chunk] for name in SCENARIO_FIELDS}
+        columns["scenario_tag"] = [str(index) for index in range(len(chunk))]
+        by_tag = split_results(run(**columns))
+        results.extend(by_tag[tag] for tag in columns["scenario_tag"])
+        logger.info(f"Evaluated {start + len(chunk)} of {len(rows)} grid scenarios")
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.surrogate",
+        description="Build a surrogate grid answering approximate mode requests with the given request's fixed inputs",
+    )
+    parser.add_argument("request", type=Path, help="JSON emulator request, as posted to /emulator/run")
+    parser.add_argument("output", type=Path, help="directory to write the grid to, inside MINT_SURROGATE_DIR")
+    parser.add_argument(
+        "--points",
+        nargs="+",
+        default=[],
+        metavar="FIELD=COUNT",
+        help=f"grid points along each of {', '.join(GRID_FIELDS)} (default: {DEFAULT_GRID_POINTS})",
+    )
+    parser.add_argument("--samples", type=int, default=VALIDATION_SAMPLES, help="cells checked to estimate the error")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    points = {**DEFAULT_GRID_POINTS, **{name: int(count) for name, count in (arg.split("=") for arg in args.points)}}
+    emulator_request = EmulatorRequest.model_validate_json(args.request.read_text())
+    grid = build_surrogate_grid(emulator_request, points, run=run_mintweb_controller, validation_samples=args.samples)
+    grid.save(args.output)
+    print(f"Estimated error bound: {grid.error_bound}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import numpy as np
+from fastapi import HTTPException
+from minte import MintwebResults
+
+from app.models import EmulatorRequest, SweepPoint, SweepRequest, SweepResponse, SweepScenarioSummary
+from app.services.emulator import EmulationPlan, build_scenarios, split_results
+from app.services.resources import get_compare_parameters
+
+# Request field names keyed by the alias the form and compare parameters use
+REQUEST_FIELDS = {field.alias or name: name for name, field in EmulatorRequest.model_fields.items()}
+
+
+def run_emulator_sweep(sweep_request: SweepRequest) -> SweepResponse:
+    """Run the emulator over a range of values of one compare parameter in a single controller call."""
+    return plan_emulator_sweep(sweep_request).run()
+
+
+def plan_emulator_sweep(sweep_request: SweepRequest) -> EmulationPlan[SweepResponse]:
+    values = get_sweep_values(sweep_request)
+    field_name = REQUEST_FIELDS[sweep_request.parameter_name]
+
+    # Compare parameters are percentages, which the request stores as fractions
+    variants = [sweep_request.request.model_copy(update={field_name: value / 100.0}) for value in values]
+
+    def assemble(results: list[MintwebResults]) -> SweepResponse:
+        return SweepResponse(
+            parameterName=sweep_request.parameter_name,
+            points=[
+                SweepPoint(value=value, eirValid=point_results.eir_valid, scenarios=summarise_scenarios(point_results))
+                for value, point_results in zip(values, results, strict=True)
+            ],
+        )
+
+    return EmulationPlan(scenario_sets=[build_scenarios(variant) for variant in variants], assemble=assemble)
+
+
+def get_sweep_values(sweep_request: SweepRequest) -> list[float]:
+    """Values of the swept parameter, spread evenly over its compare range unless given explicitly."""
+    compare_parameters = get_compare_parameters()
+    parameter = next(
+        (
+            parameter
+            for parameter in [*compare_parameters.baseline_parameters, *compare_parameters.intervention_parameters]
+            if parameter.parameter_name == sweep_request.parameter_name
+        ),
+        None,
+    )
+    if parameter is None:
+        raise HTTPException(status_code=400, detail=f"'{sweep_request.parameter_name}' is not a compare parameter")
+
+    if sweep_request.values is None:
+        values = np.linspace(parameter.min, parameter.max, sweep_request.points).tolist()
+    else:
+        values = sweep_request.values
+        if any(value < parameter.min or value > parameter.max for value in values):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Values for '{parameter.parameter_name}' must be between {parameter.min} and {parameter.max}",
+            )
+    return values
+
+
+def summarise_scenarios(results: MintwebResults) -> list[SweepScenarioSummary]:
+    """Compact per-scenario summary of one sweep point's results."""
+    return [
+        SweepScenarioSummary(
+            scenario=tag,
+            casesPer1000=result.cases.tolist(),
+            meanPrevalence=float(result.prevalence.mean()),
+            finalPrevalence=float(result.prevalence[-1]),
+        )
+        for tag, result in split_results(results).items()
+    ]
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+
+from minte import run_mintweb_controller
+from prometheus_client import Gauge
+
+from app.config import WARMUP_ATTEMPTS
+from app.models import EmulatorRequest
+from app.services.emulator import build_scenarios
+from app.services.pool import EmulatorPool, emulator_pool
+
+logger = logging.getLogger(__name__)
+
+# Each server process warms up its own workers; report the slowest
+WARMUP_DURATION = Gauge(
+    "emulator_warmup_duration_seconds", "Time the start-up warm-up emulation took", multiprocess_mode="livemax"
+)
+
+# Seconds before retrying a failed warm-up, doubling after each further failure up to the maximum
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+# A small fixed request covering the net, IRS and LSM scenarios, so their code paths are warm as well
+WARMUP_REQUEST = EmulatorRequest.model_validate(
+    {
+        "is_seasonal": 1.0,
+        "current_malaria_prevalence": 30.0,
+        "preference_for_biting_in_bed": 80.0,
+        "preference_for_biting": 85.0,
+        "pyrethroid_resistance": 50.0,
+        "py_only": 20.0,
+        "py_pbo": 20.0,
+        "py_pyrrole": 0.0,
+        "py_ppf": 0.0,
+        "irs_coverage": 0.0,
+        "itn_future": 50.0,
+        "itn_future_types": ["py_pbo"],
+        "routine_coverage": 0.0,
+        "irs_future": 30.0,
+        "lsm": 20.0,
+    }
+)
+
+
+class Warmup:
+    """Start-up emulation paying the emulator's lazy model loading and first-call costs before serving requests.
+
+    A failed warm-up is retried with backoff. Once all `attempts` have failed, the warm-up is marked as failed, so the
+    liveness check can get the server restarted rather than leave it unready for good.
+    """
+
+    def __init__(self, pool: EmulatorPool, attempts: int = WARMUP_ATTEMPTS):
+        self.pool = pool
+        self.attempts = attempts
+        self._done = threading.Event()
+        self._failed = threading.Event()
+        self._stopped = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return self._failed.is_set()
+
+    def reset(self) -> None:
+        self._done.clear()
+        self._failed.clear()
+        self._stopped.clear()
+
+    def stop(self) -> None:
+        """Stop waiting to retry, as the server is shutting down."""
+        self._stopped.set()
+
+    def run(self) -> None:
+        """Warm the emulator up, retrying with backoff until it succeeds or runs out of attempts."""
+        delay = RETRY_DELAY
+        for attempt in range(1, self.attempts + 1):
+            if self._run_once():
+                return
+            if attempt < self.attempts:
+                logger.warning(f"Retrying emulator warm-up in {delay:.0f}s")
+                if self._stopped.wait(delay):
+                    return
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+        logger.error(f"Emulator warm-up failed {self.attempts} times, reporting the server as unhealthy")
+        self._failed.set()
+
+    def _run_once(self) -> bool:
+        """Run the warm-up emulation once on every worker, bypassing the result cache so the emulator really runs."""
+        start_time = time.perf_counter()
+        scenarios = build_scenarios(WARMUP_REQUEST)
+        try:
+            # Idle workers each pick up one of the tasks, so all of them load the models
+            futures = [self.pool.submit(run_mintweb_controller, **scenarios) for _ in range(max(self.pool.workers, 1))]
+            for future in futures:
+                future.result()
+        except Exception:
+            logger.exception("Emulator warm-up failed")
+            return False
+
+        duration = time.perf_counter() - start_time
+        WARMUP_DURATION.set(duration)
+        logger.info(f"Emulator warmed up in {duration:.2f}s")
+        self._done.set()
+        return True
+
+
+warmup = Warmup(emulator_pool)
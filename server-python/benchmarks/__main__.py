@@ -0,0 +1,94 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.services.surrogate import SurrogateGrid
+from benchmarks.load import ArrivalMode, Backend, LoadProfile, run_load_test
+from benchmarks.suite import DEFAULT_SIZES, compare, run_suite
+from benchmarks.surrogate import surrogate_error
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the emulator request pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the benchmarks and save the results as a JSON baseline")
+    run.add_argument("--output", type=Path, help="file to write the results to")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="scenario counts to time")
+    run.add_argument("--filter", dest="name_filter", help="only run benchmarks whose name contains this")
+    run.add_argument("--repeat", type=int, default=5, help="timing repeats per benchmark")
+
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="fractional slowdown in median time flagged as a regression"
+    )
+
+    surrogate = commands.add_parser(
+        "surrogate-error", help="measure a surrogate grid's interpolation error against the real emulator"
+    )
+    surrogate.add_argument("grid", type=Path, help="directory of a grid built with app.services.surrogate")
+    surrogate.add_argument("--samples", type=int, default=200, help="random points to compare at")
+    surrogate.add_argument("--seed", type=int, default=0)
+
+    load = commands.add_parser("load", help="load a uvicorn server on localhost and report latency and throughput")
+    load.add_argument("--output", type=Path, help="file to write the JSON report to, as well as printing it")
+    load.add_argument("--backend", choices=[backend.value for backend in Backend], default="fake", help="emulator")
+    load.add_argument(
+        "--mode", choices=[mode.value for mode in ArrivalMode], default=LoadProfile.mode.value, help="request arrivals"
+    )
+    load.add_argument(
+        "--concurrency", type=int, default=LoadProfile.concurrency, help="clients in closed mode, connections in open"
+    )
+    load.add_argument("--rate", type=float, default=LoadProfile.rate, help="average requests per second in open mode")
+    load.add_argument("--duration", type=float, default=LoadProfile.duration, help="seconds to send requests for")
+    load.add_argument("--warmup", type=float, default=LoadProfile.warmup, help="seconds left out of the report")
+    load.add_argument(
+        "--distinct-bodies", type=int, default=LoadProfile.distinct_bodies, help="different /emulator/run requests"
+    )
+    load.add_argument(
+        "--server-cpus", type=int, nargs="+", help="cores to pin the server to, with the load generator on the others"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "load":
+        profile = LoadProfile(
+            mode=ArrivalMode(args.mode),
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            warmup=args.warmup,
+            distinct_bodies=args.distinct_bodies,
+        )
+        results = run_load_test(Backend(args.backend), profile, set(args.server_cpus or ()))
+        print(json.dumps(results, indent=2))
+        if args.output is not None:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps(results, indent=2) + "\n")
+        return 0
+    if args.command == "surrogate-error":
+        errors = surrogate_error(SurrogateGrid.load(args.grid), args.samples, args.seed)
+        for output, error in errors.items():
+            print(f"{output:<12} " + "  ".join(f"{name} {value:.4g}" for name, value in error.items()))
+        return 0
+    if args.command == "run":
+        results = run_suite(sizes=tuple(args.sizes), name_filter=args.name_filter, repeat=args.repeat)
+        if args.output is not None:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps(results, indent=2) + "\n")
+        return 0
+
+    lines, regressions = compare(
+        json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.threshold
+    )
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import statistics
+import timeit
+from collections.abc import Callable
+from dataclasses import dataclass
+
+MAX_CALLS_PER_REPEAT = 1_000_000
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    run: Callable[[], object]
+
+
+def measure(benchmark: Benchmark, repeat: int, min_time: float) -> dict:
+    """Per-call timings in seconds, calling the benchmark often enough to fill `min_time` in each repeat."""
+    timer = timeit.Timer(benchmark.run)
+    number = 1
+    while number * min(timer.repeat(repeat=1, number=1)) < min_time and number < MAX_CALLS_PER_REPEAT:
+        number *= 10
+    timings = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"min": min(timings), "median": statistics.median(timings), "number": number, "repeat": repeat}
@@ -0,0 +1,74 @@
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+from minte import MintwebResults
+
+from app.models import EmulatorRequest
+from app.services.emulator import build_base_scenario
+
+# The emulator reports prevalence fortnightly and cases yearly over four years
+PREVALENCE_STEPS = 104
+CASES_YEARS = 4
+# Scenarios from this baseline prevalence up are reported as outside the emulator's valid EIR range
+MAX_VALID_PREVALENCE = 0.9
+
+REQUEST_BODY = {
+    "is_seasonal": 1.0,
+    "current_malaria_prevalence": 50.0,
+    "preference_for_biting_in_bed": 79.0,
+    "preference_for_biting": 82.0,
+    "pyrethroid_resistance": 30.0,
+    "py_only": 5.0,
+    "py_pbo": 10.0,
+    "py_pyrrole": 5.0,
+    "py_ppf": 5.0,
+    "irs_coverage": 10.0,
+    "itn_future": 40.0,
+    "itn_future_types": ["py_only", "py_pbo"],
+    "routine_coverage": 1.0,
+    "irs_future": 15.0,
+    "lsm": 15.0,
+}
+
+
+def fake_mintweb_controller(**scenarios) -> MintwebResults:
+    """Deterministic stand-in for run_mintweb_controller, shaped like its output.
+
+    Results only depend on each scenario's prevalence, so repeated runs and cached results agree.
+    """
+    tags = np.asarray(scenarios["scenario_tag"], dtype=object)
+    prevs = np.asarray(scenarios["prev"], dtype=float)
+    seasonality = 1 + 0.1 * np.sin(np.arange(PREVALENCE_STEPS) * np.pi / 13)
+    growth = 1 + 0.05 * np.arange(CASES_YEARS)
+    eir_valid = prevs < MAX_VALID_PREVALENCE
+
+    prevalence_tags = np.repeat(tags, PREVALENCE_STEPS)
+    return MintwebResults(
+        prevalence=pd.DataFrame(
+            {
+                "prevalence": (prevs[:, None] * seasonality).ravel(),
+                "scenario": prevalence_tags,
+                "scenario_tag": prevalence_tags,
+                "eir_valid": np.repeat(eir_valid, PREVALENCE_STEPS),
+                "prev_ood": False,
+            }
+        ),
+        cases=pd.DataFrame(
+            {
+                "cases_per_1000": (prevs[:, None] * 1000 * growth).ravel(),
+                "scenario": np.repeat(tags, CASES_YEARS),
+            }
+        ),
+        eir_valid=bool(eir_valid.any()),
+    )
+
+
+def fake_scenarios(count: int) -> dict:
+    """Columnar controller input of `count` distinct scenarios."""
+    base = asdict(build_base_scenario(EmulatorRequest.model_validate(REQUEST_BODY)))
+    prevs = np.linspace(0.05, 0.85, count).tolist()
+    scenarios = {name: [value] * count for name, value in base.items()}
+    scenarios["scenario_tag"] = [f"scenario{index}" for index in range(count)]
+    scenarios["prev"] = prevs
+    return scenarios
@@ -0,0 +1,236 @@
+import asyncio
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from enum import Enum
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_emulator import REQUEST_BODY
+
+# Seconds to wait for the server to start and warm up
+SERVER_START_TIMEOUT = 120
+# Seconds before a request is given up on and counted as an error
+REQUEST_TIMEOUT = 60
+
+
+class Backend(Enum):
+    fake = "fake"
+    real = "real"
+
+
+class ArrivalMode(Enum):
+    # A fixed number of clients, each sending its next request once the previous one is answered
+    closed = "closed"
+    # Requests arriving at a fixed average rate whether or not earlier ones were answered, like independent users
+    open = "open"
+
+
+@dataclass(frozen=True)
+class LoadRequest:
+    name: str
+    method: str
+    path: str
+    weight: int
+    distinct_bodies: bool = False
+
+
+# Roughly the calls a page load and a few form changes make: the form metadata, then emulator runs
+REQUEST_MIX = (
+    LoadRequest("emulator_run", "POST", "/emulator/run", weight=6, distinct_bodies=True),
+    LoadRequest("options", "GET", "/options", weight=2),
+    LoadRequest("compare_parameters", "GET", "/compare-parameters", weight=2),
+)
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    mode: ArrivalMode = ArrivalMode.closed
+    # Clients in closed mode; connections in open mode, beyond which requests wait and that wait counts as latency
+    concurrency: int = 8
+    # Average requests per second in open mode
+    rate: float = 20
+    duration: float = 30
+    # Seconds at the start left out of the report, while connections open and the result cache fills
+    warmup: float = 5
+    # Different /emulator/run requests sent
+    distinct_bodies: int = 100
+    seed: int = 0
+
+
+@dataclass(frozen=True)
+class Sample:
+    name: str
+    start: float
+    latency: float
+    ok: bool
+
+
+def run_bodies(count: int, seed: int) -> list[dict]:
+    """Emulator requests differing in current prevalence, so only repeats of one of them hit the result cache."""
+    rng = random.Random(seed)
+    return [
+        {**REQUEST_BODY, "current_malaria_prevalence": round(rng.uniform(5, 65), 1), "itn_future": rng.choice([0, 40])}
+        for _ in range(count)
+    ]
+
+
+async def send(client: httpx.AsyncClient, request: LoadRequest, bodies: list[dict], rng: random.Random) -> bool:
+    body = rng.choice(bodies) if request.distinct_bodies else None
+    try:
+        response = await client.request(request.method, request.path, json=body)
+    except httpx.HTTPError:
+        return False
+    return response.is_success
+
+
+async def generate_load(client: httpx.AsyncClient, profile: LoadProfile) -> list[Sample]:
+    """Send the request mix for the profile's duration, returning a sample per request.
+
+    Open-loop latencies are measured from when a request was due rather than sent, so a server falling behind shows
+    up as latency instead of as a lower arrival rate.
+    """
+    rng = random.Random(profile.seed)
+    bodies = run_bodies(profile.distinct_bodies, profile.seed)
+    weights = [request.weight for request in REQUEST_MIX]
+    samples: list[Sample] = []
+    start = time.perf_counter()
+    end = start + profile.duration
+
+    async def timed(request: LoadRequest, due: float) -> None:
+        ok = await send(client, request, bodies, rng)
+        samples.append(Sample(request.name, due - start, time.perf_counter() - due, ok))
+
+    async def closed_loop_client() -> None:
+        while (now := time.perf_counter()) < end:
+            await timed(rng.choices(REQUEST_MIX, weights)[0], now)
+
+    if profile.mode is ArrivalMode.closed:
+        await asyncio.gather(*(closed_loop_client() for _ in range(profile.concurrency)))
+        return samples
+
+    tasks = []
+    due = start
+    while (due := due + rng.expovariate(profile.rate)) < end:
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+        tasks.append(asyncio.create_task(timed(rng.choices(REQUEST_MIX, weights)[0], due)))
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def summarize(samples: list[Sample], duration: float) -> dict:
+    """Throughput and error rate of the samples, and latency percentiles of the successful ones."""
+    latencies = np.array([sample.latency for sample in samples if sample.ok])
+    errors = sum(not sample.ok for sample in samples)
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput": (len(samples) - errors) / duration,
+    }
+    if len(latencies):
+        p50, p95, p99 = np.quantile(latencies, [0.5, 0.95, 0.99]).tolist()
+        summary["latency"] = {
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "mean": float(latencies.mean()),
+            "max": float(latencies.max()),
+        }
+    return summary
+
+
+def report(samples: list[Sample], backend: Backend, profile: LoadProfile) -> dict:
+    """JSON-serialisable results over the period after the warm-up, overall and per request type."""
+    measured = [sample for sample in samples if profile.warmup <= sample.start]
+    measured_duration = profile.duration - profile.warmup
+    return {
+        "meta": {
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "backend": backend.value,
+            **{name: value.value if isinstance(value, Enum) else value for name, value in asdict(profile).items()},
+        },
+        "overall": summarize(measured, measured_duration),
+        "requests": {
+            request.name: summarize([sample for sample in measured if sample.name == request.name], measured_duration)
+            for request in REQUEST_MIX
+        },
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def server(backend: Backend, port: int, cpus: set[int] | None = None) -> Iterator[str]:
+    """Serve the app with uvicorn in a separate process, yielding its URL once it is ready.
+
+    With `cpus`, the server is pinned to those cores and this process to the others, so the load generator doesn't
+    take CPU time from the server.
+    """
+    env = dict(os.environ)
+    if backend is Backend.fake:
+        # The fake controller is only patched in the server process itself, so emulations can't go to pool workers
+        env["MINT_EMULATOR_WORKERS"] = "0"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_server", "--backend", backend.value, "--port", str(port)],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+        # Keep stdout for the report
+        stdout=sys.stderr,
+    )
+    if cpus:
+        # Before the server starts its threads, which inherit the affinity
+        os.sched_setaffinity(process.pid, cpus)
+        os.sched_setaffinity(0, (os.sched_getaffinity(0) - cpus) or cpus)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while not ready(base_url):
+            if process.poll() is not None:
+                raise RuntimeError("The server exited during start-up")
+            if time.monotonic() > deadline:
+                raise RuntimeError("The server did not become ready in time")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def ready(base_url: str) -> bool:
+    try:
+        return httpx.get(f"{base_url}/readyz").is_success
+    except httpx.HTTPError:
+        return False
+
+
+def run_load_test(backend: Backend, profile: LoadProfile, server_cpus: set[int] | None = None) -> dict:
+    """Load a freshly started server with the request mix, reporting on the period after the warm-up."""
+
+    async def load(base_url: str) -> list[Sample]:
+        limits = httpx.Limits(max_connections=profile.concurrency, max_keepalive_connections=profile.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=REQUEST_TIMEOUT) as client:
+            return await generate_load(client, profile)
+
+    with server(backend, free_port(), server_cpus) as base_url:
+        samples = asyncio.run(load(base_url))
+    results = report(samples, backend, profile)
+    results["meta"]["server_cpus"] = sorted(server_cpus) if server_cpus else None
+    return results
@@ -0,0 +1,28 @@
+import argparse
+from unittest.mock import patch
+
+import uvicorn
+
+from app.main import app
+from benchmarks.fake_emulator import fake_mintweb_controller
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Serve the app for a load test, with either the real emulator or the fake controller."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_server")
+    parser.add_argument("--backend", choices=["fake", "real"], default="fake")
+    parser.add_argument("--port", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    if args.backend == "real":
+        uvicorn.run(app, port=args.port, log_level="warning")
+        return
+    with (
+        patch("app.services.emulator.run_mintweb_controller", side_effect=fake_mintweb_controller),
+        patch("app.services.warmup.run_mintweb_controller", side_effect=fake_mintweb_controller),
+    ):
+        uvicorn.run(app, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections.abc import Iterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message
+
+from app.middleware import MetricsMiddleware
+from benchmarks.benchmark import Benchmark
+
+# Separate registry so the previous middleware's metrics don't clash with the app's
+BASELINE_REGISTRY = CollectorRegistry()
+BASELINE_COUNT = Counter("requests", "Requests", ["method", "endpoint", "status"], registry=BASELINE_REGISTRY)
+BASELINE_LATENCY = Histogram("latency", "Latency", ["method", "endpoint"], registry=BASELINE_REGISTRY)
+BASELINE_ACTIVE = Gauge("in_flight", "In-flight requests", ["method", "endpoint"], registry=BASELINE_REGISTRY)
+
+
+def minimal_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(job_id: str):
+        return PlainTextResponse(job_id)
+
+    return app
+
+
+def base_http_middleware_app() -> FastAPI:
+    """The app instrumented the way the metrics middleware used to be, through BaseHTTPMiddleware."""
+    app = minimal_app()
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next):
+        metric_labels = {"method": request.method, "endpoint": request.url.path}
+        BASELINE_ACTIVE.labels(**metric_labels).inc()
+        start_time = time.time()
+
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            BASELINE_LATENCY.labels(**metric_labels).observe(time.time() - start_time)
+            BASELINE_COUNT.labels(**metric_labels, status=status_code).inc()
+            BASELINE_ACTIVE.labels(**metric_labels).dec()
+
+    return app
+
+
+def asgi_middleware_app() -> FastAPI:
+    app = minimal_app()
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def call_app(loop: asyncio.AbstractEventLoop, app: ASGIApp) -> None:
+    """Call the app directly with one GET request, leaving out any HTTP client or server overhead."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/jobs/1",
+        "raw_path": b"/jobs/1",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("benchmark", 80),
+    }
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message: Message) -> None:
+        pass
+
+    loop.run_until_complete(app(scope, receive, send))
+
+
+def middleware_benchmarks(loop: asyncio.AbstractEventLoop) -> Iterator[Benchmark]:
+    """The same request without metrics, with the previous middleware and with the current one."""
+    for name, app in [
+        ("none", minimal_app()),
+        ("base_http", base_http_middleware_app()),
+        ("asgi", asgi_middleware_app()),
+    ]:
+        yield Benchmark(f"metrics_middleware[{name}]", lambda app=app: call_app(loop, app))
@@ -0,0 +1,142 @@
+import asyncio
+import platform
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import httpx
+
+from app.main import app
+from app.models import EmulatorRequest, EmulatorScenario
+from app.services.emulator import (
+    build_scenarios,
+    post_process_results,
+    post_process_results_columnar,
+    result_cache,
+    scenarios_to_dict,
+)
+from benchmarks.benchmark import Benchmark, measure
+from benchmarks.fake_emulator import REQUEST_BODY, fake_mintweb_controller, fake_scenarios
+from benchmarks.middleware import middleware_benchmarks
+from benchmarks.surrogate import fake_surrogates
+
+DEFAULT_SIZES = (1, 10, 50, 200)
+
+
+@contextmanager
+def fake_emulator() -> Iterator[None]:
+    """Run the app against the fake controller and a surrogate grid built from it, with an empty result cache."""
+    result_cache.clear()
+    with (
+        patch("app.services.emulator.run_mintweb_controller", side_effect=fake_mintweb_controller),
+        patch("app.services.surrogate.get_surrogates", return_value=fake_surrogates()),
+    ):
+        yield
+    result_cache.clear()
+
+
+def pipeline_benchmarks(sizes: tuple[int, ...]) -> Iterator[Benchmark]:
+    emulator_request = EmulatorRequest.model_validate(REQUEST_BODY)
+    yield Benchmark("validate_request", lambda: EmulatorRequest.model_validate(REQUEST_BODY))
+    yield Benchmark("build_scenarios", lambda: build_scenarios(emulator_request))
+    scenarios = build_scenarios(emulator_request)
+    yield Benchmark("surrogate_approximate", lambda: fake_surrogates().approximate(scenarios))
+
+    for size in sizes:
+        scenarios = fake_scenarios(size)
+        scenario_models = [
+            EmulatorScenario(**dict(zip(scenarios, values, strict=True)))
+            for values in zip(*scenarios.values(), strict=True)
+        ]
+        results = fake_mintweb_controller(**scenarios)
+        yield Benchmark(f"scenarios_to_dict[{size}]", lambda models=scenario_models: scenarios_to_dict(models))
+        yield Benchmark(f"post_process_results[{size}]", lambda results=results: post_process_results(results))
+        yield Benchmark(
+            f"post_process_results_columnar[{size}]",
+            lambda results=results: post_process_results_columnar(results),
+        )
+
+
+def asgi_benchmarks(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> Iterator[Benchmark]:
+    def post_run() -> httpx.Response:
+        response = loop.run_until_complete(client.post("/emulator/run", json=REQUEST_BODY))
+        response.raise_for_status()
+        return response
+
+    def post_run_uncached() -> httpx.Response:
+        result_cache.clear()
+        return post_run()
+
+    def post_run_approximate() -> httpx.Response:
+        response = loop.run_until_complete(
+            client.post("/emulator/run", params={"mode": "approximate"}, json=REQUEST_BODY)
+        )
+        response.raise_for_status()
+        return response
+
+    yield Benchmark("emulator_run_asgi[uncached]", post_run_uncached)
+    yield Benchmark("emulator_run_asgi[cached]", post_run)
+    yield Benchmark("emulator_run_asgi[approximate]", post_run_approximate)
+
+
+def run_suite(
+    sizes: tuple[int, ...] = DEFAULT_SIZES,
+    name_filter: str | None = None,
+    repeat: int = 5,
+    min_time: float = 0.05,
+    log: Callable[[str], object] = print,
+) -> dict:
+    """Time every benchmark whose name contains `name_filter`, returning a JSON-serialisable baseline."""
+    results = {}
+    loop = asyncio.new_event_loop()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    try:
+        with fake_emulator():
+            for benchmark in [
+                *pipeline_benchmarks(sizes),
+                *asgi_benchmarks(loop, client),
+                *middleware_benchmarks(loop),
+            ]:
+                if name_filter is not None and name_filter not in benchmark.name:
+                    continue
+                results[benchmark.name] = measure(benchmark, repeat=repeat, min_time=min_time)
+                log(f"{benchmark.name:<40} {format_seconds(results[benchmark.name]['median'])}")
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
+
+    return {
+        "meta": {
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list[str], list[str]]:
+    """Report lines comparing median timings, and the names of benchmarks slower than the threshold allows."""
+    lines, regressions = [], []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            lines.append(f"{name:<40} {format_seconds(result['median']):>10}   (new)")
+            continue
+        ratio = result["median"] / baseline["results"][name]["median"]
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        lines.append(
+            f"{name:<40} {format_seconds(baseline['results'][name]['median']):>10} -> "
+            f"{format_seconds(result['median']):>10} {ratio:6.2f}x{'  REGRESSION' if regressed else ''}"
+        )
+    lines.extend(f"{name:<40} (missing)" for name in baseline["results"].keys() - current["results"].keys())
+    return lines, regressions
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
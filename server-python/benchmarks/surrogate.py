@@ -0,0 +1,53 @@
+from collections.abc import Callable
+from functools import cache
+
+import numpy as np
+from minte import MintwebResults, run_mintweb_controller
+
+from app.models import EmulatorRequest
+from app.services.surrogate import SurrogateGrid, SurrogateRegistry, build_surrogate_grid, evaluate_rows, grid_row
+from benchmarks.fake_emulator import REQUEST_BODY, fake_mintweb_controller
+
+# Coarse enough to build from the fake controller in well under a second
+FAKE_GRID_POINTS = {"prev": 4, "itn_future": 3, "irs_future": 3, "lsm": 3}
+
+
+@cache
+def fake_surrogate_grid() -> SurrogateGrid:
+    """A surrogate grid covering REQUEST_BODY, built from the fake controller."""
+    emulator_request = EmulatorRequest.model_validate(REQUEST_BODY)
+    return build_surrogate_grid(emulator_request, FAKE_GRID_POINTS, run=fake_mintweb_controller, validation_samples=0)
+
+
+@cache
+def fake_surrogates() -> SurrogateRegistry:
+    return SurrogateRegistry([fake_surrogate_grid()])
+
+
+def surrogate_error(
+    grid: SurrogateGrid, samples: int, seed: int = 0, run: Callable[..., MintwebResults] = run_mintweb_controller
+) -> dict[str, dict[str, float]]:
+    """Interpolation error against the emulator at points drawn uniformly from the grid, per output."""
+    rng = np.random.default_rng(seed)
+    variants = rng.integers(len(grid.variants), size=samples)
+    points = np.column_stack([rng.uniform(axis[0], axis[-1], size=samples) for axis in grid.axes.values()])
+
+    rows = [
+        grid_row(grid.context, grid.variants[variant], dict(zip(grid.axes, point, strict=True)))
+        for variant, point in zip(variants, points.tolist(), strict=True)
+    ]
+    exact = evaluate_rows(rows, run)
+    approximate = grid.interpolate(variants, points)
+
+    errors = {}
+    for output in ("prevalence", "cases"):
+        error = np.concatenate(
+            [np.abs(getattr(a, output) - getattr(e, output)) for a, e in zip(approximate, exact, strict=True)]
+        )
+        errors[output] = {
+            "mean": float(error.mean()),
+            "p95": float(np.quantile(error, 0.95)),
+            "max": float(error.max()),
+            "bound": grid.error_bound.prevalence if output == "prevalence" else grid.error_bound.cases_per_1000,
+        }
+    return errors
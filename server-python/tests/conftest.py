@@ -1,6 +1,7 @@
 import pytest
 
 from app.models import EmulatorRequest, ItnFutureType
+from app.services.emulator import result_cache
 
 
 @pytest.fixture
@@ -22,3 +23,10 @@ def emulator_request():
         irs_future=15.0,
         lsm=15.0,
     )
+
+
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    result_cache.clear()
+    yield
+    result_cache.clear()
@@ -0,0 +1,26 @@
+import pandas as pd
+from minte import MintwebResults
+
+
+def fake_controller_results(**scenarios) -> MintwebResults:
+    """Deterministic controller output: 4 prevalence and 2 cases rows per scenario derived from its prevalence."""
+    tags = scenarios["scenario_tag"]
+    prevs = scenarios["prev"]
+    return MintwebResults(
+        prevalence=pd.DataFrame(
+            {
+                "prevalence": [prev + step / 100 for prev in prevs for step in range(4)],
+                "scenario": [tag for tag in tags for _ in range(4)],
+                "scenario_tag": [tag for tag in tags for _ in range(4)],
+                "eir_valid": [prev < 0.9 for prev in prevs for _ in range(4)],
+                "prev_ood": [False] * 4 * len(tags),
+            }
+        ),
+        cases=pd.DataFrame(
+            {
+                "cases_per_1000": [prev * 1000 + year for prev in prevs for year in range(2)],
+                "scenario": [tag for tag in tags for _ in range(2)],
+            }
+        ),
+        eir_valid=any(prev < 0.9 for prev in prevs),
+    )
@@ -0,0 +1,184 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+
+from app.services.admission import AdmissionController
+from app.services.cancellation import CLIENT_CLOSED_REQUEST, RequestCancellation
+
+
+def queued_requests() -> float:
+    return REGISTRY.get_sample_value("emulator_admission_queued_requests")
+
+
+def rejections(reason: str) -> float:
+    return REGISTRY.get_sample_value("emulator_admission_rejected_total", {"reason": reason}) or 0
+
+
+async def hold(controller: AdmissionController, order: list[int], index: int, release: asyncio.Event) -> None:
+    async with controller.admit():
+        order.append(index)
+        await release.wait()
+
+
+def test_admits_queued_requests_in_arrival_order():
+    controller = AdmissionController(concurrency=2, max_queue=4, max_wait=5)
+    order: list[int] = []
+
+    async def run() -> None:
+        releases = [asyncio.Event() for _ in range(5)]
+        tasks = []
+        for index, release in enumerate(releases):
+            tasks.append(asyncio.create_task(hold(controller, order, index, release)))
+            await asyncio.sleep(0)
+
+        assert order == [0, 1]
+        assert queued_requests() == 3
+        for release in reversed(releases[:2]):
+            release.set()
+            await asyncio.sleep(0.01)
+        assert order == [0, 1, 2, 3]
+
+        for release in releases:
+            release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert order == [0, 1, 2, 3, 4]
+    assert queued_requests() == 0
+    assert controller.has_capacity
+
+
+def test_rejects_requests_beyond_queue():
+    controller = AdmissionController(concurrency=1, max_queue=1, max_wait=5)
+    rejected_before = rejections("queue_full")
+
+    async def run() -> None:
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, [], index, release)) for index in range(2)]
+        await asyncio.sleep(0)
+        assert not controller.has_capacity
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with controller.admit():
+                pass
+
+        assert exc_info.value.status_code == 503
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert rejections("queue_full") == rejected_before + 1
+
+
+def test_rejects_requests_waiting_too_long():
+    controller = AdmissionController(concurrency=1, max_queue=1, max_wait=0.05)
+    rejected_before = rejections("timeout")
+
+    async def run() -> None:
+        release = asyncio.Event()
+        task = asyncio.create_task(hold(controller, [], 0, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with controller.admit():
+                pass
+
+        assert exc_info.value.status_code == 503
+        assert queued_requests() == 0
+        release.set()
+        await task
+
+        # The slot isn't left taken by the request that gave up
+        async with asyncio.timeout(1), controller.admit():
+            pass
+
+    asyncio.run(run())
+
+    assert rejections("timeout") == rejected_before + 1
+
+
+def test_cancelled_request_leaves_queue():
+    controller = AdmissionController(concurrency=1, max_queue=2, max_wait=5)
+    order: list[int] = []
+
+    async def run() -> None:
+        releases = [asyncio.Event() for _ in range(3)]
+        tasks = []
+        for index, release in enumerate(releases):
+            tasks.append(asyncio.create_task(hold(controller, order, index, release)))
+            await asyncio.sleep(0)
+
+        tasks[1].cancel()
+        await asyncio.sleep(0)
+        assert queued_requests() == 1
+        for release in releases:
+            release.set()
+        await asyncio.gather(tasks[0], tasks[2])
+
+    asyncio.run(run())
+
+    assert order == [0, 2]
+
+
+def test_disabled():
+    controller = AdmissionController(concurrency=0, max_queue=0, max_wait=0)
+
+    async def run() -> None:
+        async with controller.admit(), controller.admit():
+            assert controller.has_capacity
+
+    asyncio.run(run())
+
+
+def test_request_past_deadline_leaves_queue():
+    controller = AdmissionController(concurrency=1, max_queue=1, max_wait=5)
+    rejected_before = rejections("timeout")
+
+    async def run() -> None:
+        release = asyncio.Event()
+        task = asyncio.create_task(hold(controller, [], 0, release))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with asyncio.timeout(1), controller.admit(RequestCancellation(deadline=time.monotonic() + 0.05)):
+                pass
+
+        assert exc_info.value.status_code == 504
+        assert queued_requests() == 0
+        release.set()
+        await task
+
+    asyncio.run(run())
+
+    assert rejections("timeout") == rejected_before
+
+
+def test_disconnected_request_leaves_queue():
+    controller = AdmissionController(concurrency=1, max_queue=1, max_wait=5)
+
+    async def run() -> None:
+        release = asyncio.Event()
+        task = asyncio.create_task(hold(controller, [], 0, release))
+        await asyncio.sleep(0)
+        cancellation = RequestCancellation()
+        asyncio.get_running_loop().call_later(0.05, cancellation.disconnected.set)
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with asyncio.timeout(1), controller.admit(cancellation):
+                pass
+
+        assert exc_info.value.status_code == CLIENT_CLOSED_REQUEST
+        assert queued_requests() == 0
+        release.set()
+        await task
+
+        async with asyncio.timeout(1), controller.admit(RequestCancellation()):
+            assert controller.has_capacity
+
+    asyncio.run(run())
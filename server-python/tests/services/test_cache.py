@@ -0,0 +1,184 @@
+import threading
+import time
+from typing import ClassVar
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.cache import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES, ScenarioResultCache, scenario_key
+from app.services.cancellation import RequestCancellation, RequestCancelled, current_cancellation
+
+
+def upper_keys(keys: list[str]) -> dict[str, str]:
+    return {key: key.upper() for key in keys}
+
+
+class TestScenarioKey:
+    scenario: ClassVar[dict] = {"scenario_tag": "no_intervention", "prev": 0.5, "lsm": 0, "net_type_future": None}
+
+    def test_ignores_scenario_tag(self):
+        assert scenario_key(self.scenario) == scenario_key({**self.scenario, "scenario_tag": "irs_only"})
+
+    def test_ints_and_floats_are_equivalent(self):
+        assert scenario_key(self.scenario) == scenario_key({**self.scenario, "lsm": 0.0})
+
+    def test_key_order_does_not_matter(self):
+        assert scenario_key(self.scenario) == scenario_key(dict(reversed(self.scenario.items())))
+
+    def test_different_inputs(self):
+        assert scenario_key(self.scenario) != scenario_key({**self.scenario, "prev": 0.51})
+        assert scenario_key(self.scenario) != scenario_key({**self.scenario, "net_type_future": "py_only"})
+
+
+class TestScenarioResultCache:
+    def test_computes_misses_once(self):
+        cache = ScenarioResultCache(max_size=10)
+        compute = Mock(side_effect=lambda keys: {key: key.upper() for key in keys})
+
+        assert cache.get_or_compute(["a", "b"], compute) == {"a": "A", "b": "B"}
+        assert cache.get_or_compute(["b", "c", "c"], compute) == {"b": "B", "c": "C"}
+
+        assert [call.args[0] for call in compute.call_args_list] == [["a", "b"], ["c"]]
+
+    def test_updates_metrics(self):
+        cache = ScenarioResultCache(max_size=1)
+        initial = [CACHE_HITS._value.get(), CACHE_MISSES._value.get(), CACHE_EVICTIONS._value.get()]
+
+        cache.get_or_compute(["a"], lambda keys: dict.fromkeys(keys, 1))
+        cache.get_or_compute(["a", "b"], lambda keys: dict.fromkeys(keys, 1))
+
+        final = [CACHE_HITS._value.get(), CACHE_MISSES._value.get(), CACHE_EVICTIONS._value.get()]
+        assert [f - i for f, i in zip(final, initial, strict=True)] == [1, 2, 1]
+
+    def test_evicts_least_recently_used(self):
+        cache = ScenarioResultCache(max_size=2)
+        compute = Mock(side_effect=lambda keys: dict.fromkeys(keys, 1))
+        cache.get_or_compute(["a", "b"], compute)
+        cache.get_or_compute(["a"], compute)
+
+        cache.get_or_compute(["c"], compute)
+        cache.get_or_compute(["a", "b"], compute)
+
+        assert len(cache) == 2
+        assert compute.call_args.args[0] == ["b"]
+
+    def test_failed_compute_is_not_cached(self):
+        cache = ScenarioResultCache(max_size=2)
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute(["a"], Mock(side_effect=RuntimeError("boom")))
+
+        assert cache.get_or_compute(["a"], lambda keys: dict.fromkeys(keys, 1)) == {"a": 1}
+
+    def test_concurrent_misses_share_one_computation(self):
+        cache = ScenarioResultCache(max_size=10)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_compute(keys):
+            calls.append(keys)
+            started.set()
+            release.wait(timeout=5)
+            return dict.fromkeys(keys, "result")
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache.get_or_compute(["a"], slow_compute)))
+        leader.start()
+        started.wait(timeout=5)
+        follower = threading.Thread(target=lambda: results.append(cache.get_or_compute(["a"], slow_compute)))
+        follower.start()
+        release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+        assert calls == [["a"]]
+        assert results == [{"a": "result"}, {"a": "result"}]
+
+    def test_concurrent_miss_receives_failure(self):
+        cache = ScenarioResultCache(max_size=10)
+        started = threading.Event()
+        release = threading.Event()
+
+        def failing_compute(_keys):
+            started.set()
+            release.wait(timeout=5)
+            raise RuntimeError("boom")
+
+        errors = []
+
+        def run():
+            try:
+                cache.get_or_compute(["a"], failing_compute)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait(timeout=5)
+        follower = threading.Thread(target=run)
+        follower.start()
+        release.set()
+        leader.join(timeout=5)
+        follower.join(timeout=5)
+
+        assert len(errors) == 2
+        assert len(cache) == 0
+
+    def test_cancelled_owner_hands_keys_over(self):
+        cache = ScenarioResultCache(max_size=10)
+        started = threading.Event()
+        release = threading.Event()
+
+        def cancelled_compute(_keys):
+            started.set()
+            release.wait(timeout=5)
+            raise RequestCancelled(status_code=504, detail="Request deadline exceeded")
+
+        errors = []
+        results = []
+
+        def run_cancelled():
+            try:
+                cache.get_or_compute(["a"], cancelled_compute)
+            except RequestCancelled as exc:
+                errors.append(exc)
+
+        owner = threading.Thread(target=run_cancelled)
+        owner.start()
+        started.wait(timeout=5)
+        waiter = threading.Thread(target=lambda: results.append(cache.get_or_compute(["a", "b"], upper_keys)))
+        waiter.start()
+        time.sleep(0.05)
+        release.set()
+        owner.join(timeout=5)
+        waiter.join(timeout=5)
+
+        assert len(errors) == 1
+        assert results == [{"a": "A", "b": "B"}]
+        assert len(cache) == 2
+
+    def test_cancelled_waiter_stops_waiting(self):
+        cache = ScenarioResultCache(max_size=10)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_compute(keys):
+            started.set()
+            release.wait(timeout=5)
+            return dict.fromkeys(keys, "result")
+
+        results = []
+        owner = threading.Thread(target=lambda: results.append(cache.get_or_compute(["a"], slow_compute)))
+        owner.start()
+        started.wait(timeout=5)
+        token = current_cancellation.set(RequestCancellation(deadline=time.monotonic()))
+        try:
+            with pytest.raises(RequestCancelled):
+                cache.get_or_compute(["a"], slow_compute)
+        finally:
+            current_cancellation.reset(token)
+        release.set()
+        owner.join(timeout=5)
+
+        assert results == [{"a": "result"}]
@@ -0,0 +1,109 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.cancellation import (
+    CLIENT_CLOSED_REQUEST,
+    RequestCancellation,
+    RequestCancelled,
+    cancellable_result,
+    current_cancellation,
+    request_cancellation,
+)
+
+
+def abandoned(reason: str, stage: str) -> float:
+    return REGISTRY.get_sample_value("emulator_abandoned_total", {"reason": reason, "stage": stage}) or 0
+
+
+def abandoned_scenarios(reason: str) -> float:
+    return REGISTRY.get_sample_value("emulator_abandoned_scenarios_total", {"reason": reason}) or 0
+
+
+def test_check_passes_before_deadline():
+    cancellation = RequestCancellation(deadline=time.monotonic() + 60)
+
+    cancellation.check("emulator", 3)
+
+    assert cancellation.reason is None
+    assert 0 < cancellation.remaining <= 60
+
+
+def test_check_after_deadline():
+    cancellation = RequestCancellation(deadline=time.monotonic())
+    abandoned_before = abandoned("deadline", "emulator")
+    scenarios_before = abandoned_scenarios("deadline")
+
+    with pytest.raises(RequestCancelled) as exc_info:
+        cancellation.check("emulator", 3)
+
+    assert exc_info.value.status_code == 504
+    assert abandoned("deadline", "emulator") == abandoned_before + 1
+    assert abandoned_scenarios("deadline") == scenarios_before + 3
+
+
+def test_check_after_disconnect():
+    cancellation = RequestCancellation(deadline=time.monotonic())
+    cancellation.disconnected.set()
+    abandoned_before = abandoned("disconnected", "post_processing")
+
+    with pytest.raises(RequestCancelled) as exc_info:
+        cancellation.check("post_processing")
+
+    assert exc_info.value.status_code == CLIENT_CLOSED_REQUEST
+    assert abandoned("disconnected", "post_processing") == abandoned_before + 1
+
+
+@pytest.mark.parametrize(
+    ("timeout", "server_timeout", "expected"), [(None, 0, None), (5, 0, 5), (None, 10, 10), (5, 10, 5), (20, 10, 10)]
+)
+def test_request_deadline(timeout: float | None, server_timeout: int, expected: float | None):
+    with patch("app.services.cancellation.REQUEST_TIMEOUT", server_timeout):
+        cancellation = request_cancellation(timeout)
+
+    if expected is None:
+        assert cancellation.deadline is None
+    else:
+        assert cancellation.remaining == pytest.approx(expected, abs=0.5)
+
+
+def test_cancellable_result_drops_queued_work():
+    release = threading.Event()
+    ran = []
+    abandoned_before = abandoned("deadline", "pool")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        running = executor.submit(release.wait, 5)
+        queued = executor.submit(ran.append, "queued")
+        token = current_cancellation.set(RequestCancellation(deadline=time.monotonic()))
+        try:
+            with pytest.raises(RequestCancelled):
+                cancellable_result(queued, "pool", 2)
+        finally:
+            current_cancellation.reset(token)
+        release.set()
+
+    assert running.result()
+    assert queued.cancelled()
+    assert ran == []
+    assert abandoned("deadline", "pool") == abandoned_before + 1
+
+
+def test_cancellable_result_waits_for_running_work():
+    cancellation = RequestCancellation(deadline=time.monotonic() + 0.1)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(time.sleep, 0.3)
+        token = current_cancellation.set(cancellation)
+        try:
+            cancellable_result(future, "pool")
+        finally:
+            current_cancellation.reset(token)
+
+    assert cancellation.reason == "deadline"
+    assert future.done()
+    assert not future.cancelled()
@@ -1,20 +1,61 @@
+import json
+import threading
+import time
+from dataclasses import asdict, fields, replace
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pandas as pd
 import pytest
 from fastapi import HTTPException
 from minte import MintwebResults
-
-from app.models import Cases, EmulatorRequest, EmulatorResponse, EmulatorScenario, ItnFutureType, Prevalence
+from prometheus_client import REGISTRY
+
+from app.models import (
+    BatchEmulatorItem,
+    Cases,
+    ColumnarEmulatorResponse,
+    EmulatorRequest,
+    EmulatorResponse,
+    EmulatorScenario,
+    ItnFutureType,
+    Prevalence,
+    ResponseFormat,
+    cases_adapter,
+    prevalence_adapter,
+)
+from app.services.cancellation import RequestCancellation, RequestCancelled, current_cancellation
 from app.services.emulator import (
+    COALESCE_WAIT,
+    COALESCED_BATCH_REQUESTS,
+    COALESCED_BATCH_SCENARIOS,
+    SCENARIOS_DISTINCT,
+    SCENARIOS_REQUESTED,
+    ControllerCoalescer,
     build_base_scenario,
     build_intervention_scenarios,
     build_net_scenarios,
     build_scenarios,
+    canonical_scenario,
+    combine_results,
+    group_positions,
     post_process_results,
+    post_process_results_columnar,
+    result_cache,
+    run_controller,
+    run_emulator_batch,
     run_emulator_model,
+    run_scenario_sets,
+    run_scenarios,
     scenarios_to_dict,
+    split_results,
+    stream_emulator_model,
 )
+from tests.fakes import fake_controller_results
+
+
+def stage_count(stage: str) -> float:
+    return REGISTRY.get_sample_value("emulator_stage_duration_seconds_count", {"stage": stage}) or 0
 
 
 class TestScenariosToDict:
@@ -55,6 +96,15 @@ class TestScenariosToDict:
 
         assert result == expected
 
+    def test_matches_scenario_fields(self, emulator_request: EmulatorRequest):
+        base_scenario = build_base_scenario(emulator_request)
+        scenarios = [base_scenario, *build_intervention_scenarios(emulator_request, base_scenario)]
+
+        result = scenarios_to_dict(scenarios)
+
+        assert list(result) == [scenario_field.name for scenario_field in fields(EmulatorScenario)]
+        assert result == {key: [asdict(scenario)[key] for scenario in scenarios] for key in result}
+
 
 class TestBuildBaseScenario:
     def test_build_base_scenario(self, emulator_request: EmulatorRequest):
@@ -118,8 +168,8 @@ class TestBuildInterventionScenarios:
         scenarios = build_intervention_scenarios(emulator_request, base_scenario)
 
         expected_scenarios = [
-            base_scenario.model_copy(update={"scenario_tag": "irs_only", "irs_future": emulator_request.irs_future}),
-            base_scenario.model_copy(update={"scenario_tag": "lsm_only", "lsm": emulator_request.lsm}),
+            replace(base_scenario, scenario_tag="irs_only", irs_future=emulator_request.irs_future),
+            replace(base_scenario, scenario_tag="lsm_only", lsm=emulator_request.lsm),
             "net_scenarios",
         ]
 
@@ -146,9 +196,7 @@ class TestBuildInterventionScenarios:
 class TestBuildAllScenarios:
     def test_build_all_scenarios(self, mock_build: Mock, emulator_request: EmulatorRequest):
         base_scenario = build_base_scenario(emulator_request)
-        irs_future_scenario = base_scenario.model_copy(
-            update={"scenario_tag": "irs_only", "irs_future": emulator_request.irs_future}
-        )
+        irs_future_scenario = replace(base_scenario, scenario_tag="irs_only", irs_future=emulator_request.irs_future)
         mock_build.return_value = [irs_future_scenario]
 
         result = build_scenarios(emulator_request)
@@ -158,28 +206,456 @@ class TestBuildAllScenarios:
 
 
 @patch("app.services.emulator.post_process_results")
-@patch("app.services.emulator.run_mintweb_controller")
+@patch("app.services.emulator.run_scenarios")
 @patch("app.services.emulator.build_scenarios")
 class TestRunEmulatorModel:
     def test_run_emulator_model(
         self,
         mock_build_scenarios: Mock,
-        mock_run_mintweb_controller: Mock,
+        mock_run_scenarios: Mock,
         mock_post_process_results: Mock,
         emulator_request: EmulatorRequest,
     ):
         scenarios = {"scenario_key": "scenarios_dict"}
         mock_build_scenarios.return_value = scenarios
-        mock_run_mintweb_controller.return_value = "raw_results"
+        mock_run_scenarios.return_value = "raw_results"
         mock_post_process_results.return_value = "final_results"
 
         result = run_emulator_model(emulator_request)
 
         mock_build_scenarios.assert_called_once_with(emulator_request)
-        mock_run_mintweb_controller.assert_called_once_with(**scenarios)
+        mock_run_scenarios.assert_called_once_with(scenarios)
         mock_post_process_results.assert_called_once_with("raw_results")
         assert result == "final_results"
 
+    @patch("app.services.emulator.post_process_results_columnar")
+    def test_run_emulator_model_columnar(
+        self,
+        mock_post_process_columnar: Mock,
+        mock_build_scenarios: Mock,
+        mock_run_scenarios: Mock,
+        mock_post_process_results: Mock,
+        emulator_request: EmulatorRequest,
+    ):
+        mock_run_scenarios.return_value = "raw_results"
+        mock_post_process_columnar.return_value = "columnar_results"
+
+        result = run_emulator_model(emulator_request, ResponseFormat.columnar)
+
+        mock_build_scenarios.assert_called_once_with(emulator_request)
+        mock_post_process_columnar.assert_called_once_with("raw_results")
+        mock_post_process_results.assert_not_called()
+        assert result == "columnar_results"
+
+
+STREAMED_SCENARIOS = {"scenario_tag": ["no_intervention", "irs_only", "lsm_only"], "prev": [0.5, 0.3, 0.95]}
+
+
+@patch("app.services.emulator.run_scenarios", side_effect=lambda scenarios: fake_controller_results(**scenarios))
+class TestStreamEmulatorModel:
+    @patch("app.services.emulator.build_scenarios", return_value=STREAMED_SCENARIOS)
+    def test_baseline_first(self, _, mock_run_scenarios: Mock, emulator_request: EmulatorRequest):
+        stream = stream_emulator_model(emulator_request)
+
+        # The baseline is computed before streaming starts, the rest once the stream is read
+        mock_run_scenarios.assert_called_once_with({"scenario_tag": ["no_intervention"], "prev": [0.5]})
+        lines = [json.loads(line) for line in stream]
+        mock_run_scenarios.assert_called_with({"scenario_tag": ["irs_only", "lsm_only"], "prev": [0.3, 0.95]})
+
+        assert [line["scenario"] for line in lines[:-1]] == ["no_intervention", "irs_only", "lsm_only"]
+        assert lines[0] == {
+            "scenario": "no_intervention",
+            "prevalence": pytest.approx([0.5, 0.51, 0.52, 0.53]),
+            "casesPer1000": [500, 501],
+            "days": [0, 14, 28, 42],
+            "year": [1, 2],
+        }
+        assert lines[-1] == {"eirValid": True}
+
+    @patch("app.services.emulator.build_scenarios")
+    def test_baseline_only(self, mock_build_scenarios: Mock, mock_run_scenarios: Mock, emulator_request):
+        mock_build_scenarios.return_value = {"scenario_tag": ["no_intervention"], "prev": [0.95]}
+
+        lines = [json.loads(line) for line in stream_emulator_model(emulator_request)]
+
+        mock_run_scenarios.assert_called_once()
+        assert [line.get("scenario") for line in lines] == ["no_intervention", None]
+        assert lines[-1] == {"eirValid": False}
+
+    @patch("app.services.emulator.build_scenarios", return_value=STREAMED_SCENARIOS)
+    def test_matches_columnar_response(self, _, __, emulator_request: EmulatorRequest):
+        lines = [json.loads(line) for line in stream_emulator_model(emulator_request)]
+        columnar = post_process_results_columnar(fake_controller_results(**STREAMED_SCENARIOS))
+
+        assert [
+            {"scenario": line["scenario"], "prevalence": line["prevalence"], "casesPer1000": line["casesPer1000"]}
+            for line in lines[:-1]
+        ] == [series.model_dump() for series in columnar.scenarios]
+        assert all(line["days"] == columnar.days and line["year"] == columnar.year for line in lines[:-1])
+        assert lines[-1]["eirValid"] == columnar.eirValid
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestRunScenarios:
+    def test_matches_uncached_controller(self, _: Mock, emulator_request: EmulatorRequest):
+        scenarios = build_scenarios(emulator_request)
+
+        result = run_scenarios(scenarios)
+
+        expected = fake_controller_results(**scenarios)
+        assert post_process_results(result) == post_process_results(expected)
+        assert result.eir_valid == expected.eir_valid
+
+    def test_only_runs_cache_misses(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        run_scenarios(build_scenarios(emulator_request))
+        emulator_request.lsm = 0.0
+
+        result = run_scenarios(build_scenarios(emulator_request))
+
+        assert mock_controller.call_count == 1
+        assert set(result.prevalence["scenario"]) == {"no_intervention", "irs_only", "py_only_only", "py_pbo_only"}
+
+    def test_runs_new_scenarios_only(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        run_scenarios(build_scenarios(emulator_request))
+        emulator_request.irs_future = 0.5
+
+        run_scenarios(build_scenarios(emulator_request))
+
+        assert mock_controller.call_count == 2
+        assert mock_controller.call_args.kwargs["irs_future"] == [0.5]
+
+    def test_cache_disabled(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        scenarios = build_scenarios(emulator_request)
+
+        with patch.object(result_cache, "max_size", 0):
+            run_scenarios(scenarios)
+            run_scenarios(scenarios)
+
+        assert mock_controller.call_count == 2
+        mock_controller.assert_called_with(**scenarios)
+
+    @pytest.mark.parametrize("cache_size", [0, 128])
+    def test_runs_identical_scenarios_once(self, mock_controller: Mock, emulator_request: EmulatorRequest, cache_size):
+        # Without future nets or other interventions every net scenario is the baseline again
+        emulator_request.itn_future = emulator_request.routine = 0.0
+        emulator_request.irs_future = emulator_request.lsm = 0.0
+        scenarios = build_scenarios(emulator_request)
+        initial = [SCENARIOS_REQUESTED._value.get(), SCENARIOS_DISTINCT._value.get()]
+
+        with patch.object(result_cache, "max_size", cache_size):
+            result = run_scenarios(scenarios)
+
+        assert len(mock_controller.call_args.kwargs["scenario_tag"]) == 1
+        final = [SCENARIOS_REQUESTED._value.get(), SCENARIOS_DISTINCT._value.get()]
+        assert [after - before for before, after in zip(initial, final, strict=True)] == [3, 1]
+        assert result.prevalence["scenario"].unique().tolist() == scenarios["scenario_tag"]
+        assert post_process_results(result) == post_process_results(fake_controller_results(**scenarios))
+
+
+class TestCanonicalScenario:
+    def test_drops_net_type_without_future_nets(self, emulator_request: EmulatorRequest):
+        emulator_request.itn_future = emulator_request.routine = 0.0
+        base_scenario = build_base_scenario(emulator_request)
+        net_scenario = build_net_scenarios(emulator_request, base_scenario)[0]
+
+        assert canonical_scenario(asdict(net_scenario)) == canonical_scenario(
+            asdict(replace(base_scenario, scenario_tag=net_scenario.scenario_tag))
+        )
+
+    def test_keeps_net_type_with_routine_distribution(self, emulator_request: EmulatorRequest):
+        emulator_request.itn_future = 0.0
+        net_scenario = build_net_scenarios(emulator_request, build_base_scenario(emulator_request))[0]
+
+        assert canonical_scenario(asdict(net_scenario))["net_type_future"] == net_scenario.net_type_future
+
+    def test_normalises_numbers(self):
+        scenario = {"prev": 1, "lsm": -0.0, "itn_future": 0.5, "routine": 0, "net_type_future": "py_pbo"}
+
+        # Compared as JSON, since -0.0 == 0.0 and 1 == 1.0 would hide the difference
+        assert json.dumps(canonical_scenario(scenario)) == json.dumps(
+            {"prev": 1.0, "lsm": 0.0, "itn_future": 0.5, "routine": 0.0, "net_type_future": "py_pbo"}
+        )
+
+
+def request_data(emulator_request: EmulatorRequest, **updates) -> dict:
+    data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    data = {key: value * 100 if isinstance(value, float) else value for key, value in data.items()}
+    data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    return {**data, **updates}
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestRunEmulatorBatch:
+    def test_single_controller_call(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        with patch.object(result_cache, "max_size", 0):
+            first, second = run_scenario_sets(
+                [build_scenarios(emulator_request), build_scenarios(emulator_request.model_copy(update={"prev": 0.2}))]
+            )
+
+        mock_controller.assert_called_once()
+        assert len(mock_controller.call_args.kwargs["scenario_tag"]) == 14
+        assert first.prevalence["scenario"].iloc[0] == "no_intervention"
+        assert first.prevalence["prevalence"].iloc[0] == 0.5
+        assert second.prevalence["prevalence"].iloc[0] == 0.2
+
+    def test_matches_individual_runs(self, _: Mock, emulator_request: EmulatorRequest):
+        items = [
+            BatchEmulatorItem(id="a", request=request_data(emulator_request)),
+            BatchEmulatorItem(id="b", request=request_data(emulator_request, current_malaria_prevalence=20)),
+        ]
+
+        results = run_emulator_batch(items)
+
+        assert [result.id for result in results] == ["a", "b"]
+        assert results[0].data == run_emulator_model(emulator_request)
+        assert results[1].data == run_emulator_model(emulator_request.model_copy(update={"prev": 0.2}))
+        assert all(result.error is None for result in results)
+
+    def test_invalid_item_does_not_fail_batch(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        items = [
+            BatchEmulatorItem(id="invalid", request=request_data(emulator_request, current_malaria_prevalence=200)),
+            BatchEmulatorItem(id="valid", request=request_data(emulator_request)),
+        ]
+
+        invalid, valid = run_emulator_batch(items)
+
+        mock_controller.assert_called_once()
+        assert invalid.data is None
+        assert invalid.error == (
+            "Validation errors: ('current_malaria_prevalence',): Input should be less than or equal to 100"
+        )
+        assert valid.error is None
+
+    def test_malformed_items_do_not_fail_batch(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        items = [
+            BatchEmulatorItem(id="not an object", request=[1, 2]),
+            BatchEmulatorItem(request=request_data(emulator_request)),
+            BatchEmulatorItem(id="valid", request=request_data(emulator_request)),
+        ]
+
+        not_an_object, no_id, valid = run_emulator_batch(items)
+
+        mock_controller.assert_called_once()
+        assert not_an_object.id == "not an object"
+        assert not_an_object.error == (
+            "Validation errors: (): Input should be a valid dictionary or instance of EmulatorRequest"
+        )
+        assert no_id.id is None
+        assert no_id.error == "Validation errors: ('id',): Input should be a valid string"
+        assert valid.error is None
+        assert valid.data == run_emulator_model(emulator_request)
+
+    def test_columnar_format(self, _: Mock, emulator_request: EmulatorRequest):
+        items = [BatchEmulatorItem(id="a", request=request_data(emulator_request))]
+
+        (result,) = run_emulator_batch(items, ResponseFormat.columnar)
+
+        assert isinstance(result.data, ColumnarEmulatorResponse)
+
+    def test_all_items_invalid(self, mock_controller: Mock):
+        results = run_emulator_batch([BatchEmulatorItem(id="a", request={})])
+
+        assert results[0].error.startswith("Validation errors: ")
+        mock_controller.assert_not_called()
+
+
+def scenario_columns(tag: str, *prevs: float) -> dict:
+    return {"scenario_tag": [f"{tag}{index}" for index in range(len(prevs))], "prev": list(prevs)}
+
+
+def run_concurrently(
+    coalescer: ControllerCoalescer, *scenario_sets: dict, cancellations: dict[int, RequestCancellation] | None = None
+) -> list:
+    results = [None] * len(scenario_sets)
+
+    def run(index: int):
+        current_cancellation.set((cancellations or {}).get(index))
+        try:
+            results[index] = coalescer.run(scenario_sets[index])
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(scenario_sets))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestControllerCoalescer:
+    def test_disabled_by_default(self, mock_controller: Mock):
+        scenarios = scenario_columns("a", 0.1)
+
+        run_controller(scenarios)
+
+        mock_controller.assert_called_once_with(**scenarios)
+
+    def test_coalesces_concurrent_calls(self, mock_controller: Mock):
+        coalescer = ControllerCoalescer(window=0.2, max_scenarios=100)
+        initial_requests = COALESCED_BATCH_REQUESTS._sum.get()
+        initial_scenarios = COALESCED_BATCH_SCENARIOS._sum.get()
+        initial_wait_count = sum(bucket.get() for bucket in COALESCE_WAIT._buckets)
+
+        first, second, third = run_concurrently(
+            coalescer, scenario_columns("a", 0.1), scenario_columns("a", 0.2, 0.3), scenario_columns("b", 0.4)
+        )
+
+        mock_controller.assert_called_once()
+        assert len(mock_controller.call_args.kwargs["scenario_tag"]) == 4
+        assert first.prevalence["scenario"].unique().tolist() == ["a0"]
+        assert first.prevalence["prevalence"].iloc[0] == 0.1
+        assert second.prevalence["scenario"].unique().tolist() == ["a0", "a1"]
+        assert second.cases["cases_per_1000"].tolist() == [200, 201, 300, 301]
+        assert third.prevalence["prevalence"].iloc[0] == 0.4
+        assert COALESCED_BATCH_REQUESTS._sum.get() - initial_requests == 3
+        assert COALESCED_BATCH_SCENARIOS._sum.get() - initial_scenarios == 4
+        assert sum(bucket.get() for bucket in COALESCE_WAIT._buckets) - initial_wait_count == 3
+
+    def test_runs_full_batch_before_window_closes(self, mock_controller: Mock):
+        coalescer = ControllerCoalescer(window=10, max_scenarios=2)
+
+        first, second = run_concurrently(coalescer, scenario_columns("a", 0.1), scenario_columns("b", 0.2))
+
+        assert first.prevalence["prevalence"].iloc[0] == 0.1
+        assert second.prevalence["prevalence"].iloc[0] == 0.2
+        assert mock_controller.call_count <= 2
+
+    def test_leaves_out_cancelled_calls(self, mock_controller: Mock):
+        coalescer = ControllerCoalescer(window=0.2, max_scenarios=100)
+        cancellations = {0: RequestCancellation(deadline=time.monotonic() + 0.05)}
+
+        cancelled, kept = run_concurrently(
+            coalescer, scenario_columns("a", 0.1), scenario_columns("b", 0.2), cancellations=cancellations
+        )
+
+        mock_controller.assert_called_once()
+        assert len(mock_controller.call_args.kwargs["scenario_tag"]) == 1
+        assert isinstance(cancelled, RequestCancelled)
+        assert cancelled.status_code == 504
+        assert kept.prevalence["prevalence"].iloc[0] == 0.2
+
+    def test_failure_is_shared(self, mock_controller: Mock):
+        mock_controller.side_effect = RuntimeError("boom")
+        coalescer = ControllerCoalescer(window=0.2, max_scenarios=100)
+
+        results = run_concurrently(coalescer, scenario_columns("a", 0.1), scenario_columns("b", 0.2))
+
+        mock_controller.assert_called_once()
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+def test_cancelled_request_does_not_fail_requests_sharing_its_results(
+    mock_controller: Mock, emulator_request: EmulatorRequest
+):
+    # Differs only in LSM, so it shares the no_intervention baseline the cancelled request starts computing first
+    other_request = emulator_request.model_copy(update={"lsm": emulator_request.lsm + 10})
+    results = {}
+
+    def run(name: str, request: EmulatorRequest, cancellation: RequestCancellation | None) -> None:
+        current_cancellation.set(cancellation)
+        try:
+            results[name] = run_emulator_model(request)
+        except RequestCancelled as exc:
+            results[name] = exc
+
+    # The cancelled request's deadline passes while its call waits in the coalescing window
+    with patch("app.services.emulator.controller_coalescer", ControllerCoalescer(window=0.3, max_scenarios=100)):
+        cancelled = threading.Thread(
+            target=run, args=("cancelled", emulator_request, RequestCancellation(deadline=time.monotonic() + 0.1))
+        )
+        cancelled.start()
+        time.sleep(0.05)
+        other = threading.Thread(target=run, args=("other", other_request, None))
+        other.start()
+        cancelled.join(timeout=5)
+        other.join(timeout=5)
+
+    assert isinstance(results["cancelled"], RequestCancelled)
+    assert results["cancelled"].status_code == 504
+    assert results["other"] == run_emulator_model(other_request)
+    assert mock_controller.called
+
+
+class TestSplitAndCombineResults:
+    def test_round_trip(self):
+        results = fake_controller_results(scenario_tag=["a", "b"], prev=[0.2, 0.95])
+
+        split = split_results(results)
+        combined = combine_results(["a", "b"], [split["a"], split["b"]])
+
+        assert split["a"].prevalence.tolist() == pytest.approx([0.2, 0.21, 0.22, 0.23])
+        assert split["b"].cases.tolist() == [950.0, 951.0]
+        assert split["b"].eir_valid is False
+        pd.testing.assert_frame_equal(combined.prevalence, results.prevalence)
+        pd.testing.assert_frame_equal(combined.cases, results.cases)
+        assert combined.eir_valid is True
+
+    def test_split_interleaved_results(self):
+        results = fake_controller_results(scenario_tag=["b", "a"], prev=[0.2, 0.95])
+        results.prevalence = results.prevalence.iloc[[0, 4, 1, 5, 2, 6, 3, 7]]
+        results.cases = results.cases.iloc[[2, 0, 3, 1]]
+
+        split = split_results(results)
+
+        assert list(split) == ["b", "a"]
+        assert split["b"].prevalence.tolist() == pytest.approx([0.2, 0.21, 0.22, 0.23])
+        assert split["a"].cases.tolist() == [950.0, 951.0]
+        assert split["a"].eir_valid is False
+
+    def test_split_missing_results(self):
+        with pytest.raises(HTTPException) as exc_info:
+            split_results(MintwebResults())
+
+        assert exc_info.value.status_code == 500
+
+
+def pandas_post_process_results(results: MintwebResults) -> EmulatorResponse:
+    """Reference implementation post_process_results replaced, checked against the fast path."""
+    prevalence_df = results.prevalence.drop(columns=["scenario_tag", "eir_valid"])
+    prevalence_df["days"] = prevalence_df.groupby("scenario").cumcount() * 14
+    cases_df = results.cases.rename(columns={"cases_per_1000": "casesPer1000"})
+    cases_df["year"] = cases_df.groupby("scenario").cumcount() + 1
+    return EmulatorResponse(
+        prevalence=prevalence_adapter.validate_python(prevalence_df.to_dict(orient="records")),
+        cases=cases_adapter.validate_python(cases_df.to_dict(orient="records")),
+        eirValid=results.eir_valid,
+    )
+
+
+class TestGroupPositions:
+    def test_contiguous_groups(self):
+        assert group_positions(np.array(["a", "a", "a", "b", "b"], dtype=object)).tolist() == [0, 1, 2, 0, 1]
+
+    def test_interleaved_groups(self):
+        assert group_positions(np.array(["a", "b", "a", "b", "a"], dtype=object)).tolist() == [0, 0, 1, 1, 2]
+
+    def test_empty(self):
+        assert group_positions(np.array([], dtype=object)).tolist() == []
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestStageMetrics:
+    def test_stages_timed(self, _, emulator_request: EmulatorRequest):
+        stages = ["build_scenarios", "controller", "post_process"]
+        before = {stage: stage_count(stage) for stage in stages}
+        scenarios_before = REGISTRY.get_sample_value("emulator_request_scenarios_sum")
+
+        run_emulator_model(emulator_request)
+
+        assert {stage: stage_count(stage) for stage in stages} == {stage: count + 1 for stage, count in before.items()}
+        assert REGISTRY.get_sample_value("emulator_request_scenarios_sum") == scenarios_before + 7
+
+    def test_cached_results_skip_controller(self, _, emulator_request: EmulatorRequest):
+        run_emulator_model(emulator_request)
+        before = stage_count("controller")
+
+        run_emulator_model(emulator_request)
+
+        assert stage_count("controller") == before
+
 
 class TestPostProcessResults:
     def test_no_results(self):
@@ -233,3 +709,61 @@ class TestPostProcessResults:
 
         with pytest.raises(KeyError):
             post_process_results(MintwebResults(prevalence=prevalence_df, cases=cases_df, eir_valid=True))
+
+    def test_matches_pandas_implementation(self):
+        results = fake_controller_results(scenario_tag=["baseline", "irs_only", "py_only"], prev=[0.1, 0.5, 0.95])
+
+        assert post_process_results(results) == pandas_post_process_results(results)
+
+    def test_matches_pandas_implementation_interleaved(self):
+        results = fake_controller_results(scenario_tag=["scenario1", "scenario2"], prev=[0.1, 0.5])
+        results.prevalence = results.prevalence.iloc[[0, 4, 1, 5, 2, 6, 3, 7]]
+        results.cases = results.cases.iloc[[0, 2, 1, 3]]
+
+        assert post_process_results(results) == pandas_post_process_results(results)
+
+
+class TestPostProcessResultsColumnar:
+    def test_with_results(self):
+        results = fake_controller_results(scenario_tag=["scenario1", "scenario2"], prev=[0.1, 0.95])
+
+        result = post_process_results_columnar(results)
+
+        assert result.days == [0, 14, 28, 42]
+        assert result.year == [1, 2]
+        assert [series.scenario for series in result.scenarios] == ["scenario1", "scenario2"]
+        assert result.scenarios[0].prevalence == pytest.approx([0.1, 0.11, 0.12, 0.13])
+        assert result.scenarios[1].casesPer1000 == pytest.approx([950, 951])
+        assert result.eirValid is True
+
+    def test_matches_row_format(self):
+        results = fake_controller_results(scenario_tag=["scenario1", "scenario2"], prev=[0.1, 0.5])
+
+        rows = post_process_results(results)
+        columnar = post_process_results_columnar(results)
+
+        for series in columnar.scenarios:
+            prevalence = [row for row in rows.prevalence if row.scenario == series.scenario]
+            cases = [row for row in rows.cases if row.scenario == series.scenario]
+            assert [row.days for row in prevalence] == columnar.days
+            assert [row.prevalence for row in prevalence] == series.prevalence
+            assert [row.year for row in cases] == columnar.year
+            assert [row.casesPer1000 for row in cases] == series.casesPer1000
+
+    def test_interleaved_results(self):
+        results = fake_controller_results(scenario_tag=["scenario1", "scenario2"], prev=[0.1, 0.5])
+        results.prevalence = results.prevalence.iloc[[0, 4, 1, 5, 2, 6, 3, 7]]
+        results.cases = results.cases.iloc[[0, 2, 1, 3]]
+
+        result = post_process_results_columnar(results)
+
+        assert result.days == [0, 14, 28, 42]
+        assert [series.scenario for series in result.scenarios] == ["scenario1", "scenario2"]
+        assert result.scenarios[1].prevalence == pytest.approx([0.5, 0.51, 0.52, 0.53])
+        assert result.scenarios[1].casesPer1000 == pytest.approx([500, 501])
+
+    def test_no_results(self):
+        with pytest.raises(HTTPException) as exc_info:
+            post_process_results_columnar(MintwebResults())
+
+        assert exc_info.value.status_code == 500
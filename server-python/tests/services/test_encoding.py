@@ -0,0 +1,115 @@
+import json
+
+import pyarrow as pa
+import pytest
+from fastapi import HTTPException
+from minte import MintwebResults
+from prometheus_client import REGISTRY
+
+from app.models import Response
+from app.services.emulator import post_process_results
+from app.services.encoding import (
+    ResultEncoding,
+    arrow_response,
+    encoded_response,
+    measure_stream,
+    negotiate_encoding,
+    results_to_arrow,
+)
+from tests.fakes import fake_controller_results
+
+
+class TestNegotiateEncoding:
+    def test_defaults_to_json(self):
+        assert negotiate_encoding(None) is ResultEncoding.json
+        assert negotiate_encoding("*/*") is ResultEncoding.json
+        assert negotiate_encoding("text/csv") is ResultEncoding.json
+
+    def test_binary_encodings(self):
+        assert negotiate_encoding("application/msgpack") is ResultEncoding.msgpack
+        assert negotiate_encoding("application/vnd.apache.arrow.stream") is ResultEncoding.arrow
+
+    def test_quality(self):
+        accept = "application/json;q=0.5, application/msgpack;q=0.9, application/vnd.apache.arrow.stream;q=0.1"
+        assert negotiate_encoding(accept) is ResultEncoding.msgpack
+
+    def test_first_of_equal_quality(self):
+        assert negotiate_encoding("application/json, application/msgpack") is ResultEncoding.json
+
+    def test_unsupported(self):
+        accept = "application/vnd.apache.arrow.stream"
+        assert negotiate_encoding(accept, supported=(ResultEncoding.msgpack,)) is ResultEncoding.json
+
+    def test_json_is_always_ranked(self):
+        accept = "application/json, application/msgpack;q=0.5"
+        assert negotiate_encoding(accept, supported=(ResultEncoding.msgpack,)) is ResultEncoding.json
+
+    def test_wildcards_prefer_json(self):
+        for accept in ["*/*, application/msgpack;q=0.1", "application/*, application/msgpack;q=0.1"]:
+            assert negotiate_encoding(accept, supported=(ResultEncoding.msgpack,)) is ResultEncoding.json
+        assert negotiate_encoding("*/*;q=0.1, application/msgpack") is ResultEncoding.msgpack
+
+    def test_unparsable_quality(self):
+        assert negotiate_encoding("application/msgpack;q=x") is ResultEncoding.msgpack
+        assert negotiate_encoding("application/json;q=0.5, application/msgpack;q=x") is ResultEncoding.msgpack
+
+
+class TestResultsToArrow:
+    results = fake_controller_results(scenario_tag=["scenario1", "scenario2"], prev=[0.1, 0.95])
+
+    def test_schema(self):
+        table = results_to_arrow(self.results)
+
+        assert table.column_names == ["scenario", "metric", "time", "value"]
+        assert table.schema.field("time").type == pa.int32()
+        assert json.loads(table.schema.metadata[b"eirValid"]) is True
+
+    def test_matches_json_rows(self):
+        rows = results_to_arrow(self.results).to_pylist()
+        json_response = post_process_results(self.results)
+
+        assert [(row["scenario"], row["time"], row["value"]) for row in rows if row["metric"] == "prevalence"] == [
+            (row.scenario, row.days, row.prevalence) for row in json_response.prevalence
+        ]
+        assert [(row["scenario"], row["time"], row["value"]) for row in rows if row["metric"] == "casesPer1000"] == [
+            (row.scenario, row.year, row.casesPer1000) for row in json_response.cases
+        ]
+
+    def test_no_results(self):
+        with pytest.raises(HTTPException) as exc_info:
+            results_to_arrow(MintwebResults())
+
+        assert exc_info.value.status_code == 500
+
+    def test_arrow_response(self):
+        response = arrow_response(self.results)
+
+        assert response.media_type == "application/vnd.apache.arrow.stream"
+        assert pa.ipc.open_stream(response.body).read_all().equals(results_to_arrow(self.results))
+
+
+def response_size_count(encoding: str) -> float:
+    return REGISTRY.get_sample_value("emulator_response_size_bytes_count", {"encoding": encoding}) or 0
+
+
+class TestEncodedResponse:
+    def test_json(self):
+        before = response_size_count("json")
+
+        response = encoded_response(Response(data={"eirValid": True}))
+
+        assert response.media_type == "application/json"
+        assert response.body == b'{"data":{"eirValid":true}}'
+        assert response_size_count("json") == before + 1
+
+    def test_msgpack(self):
+        response = encoded_response(Response(data={"eirValid": True}), ResultEncoding.msgpack)
+
+        assert response.media_type == "application/msgpack"
+        assert response.body == b"\x81\xa4data\x81\xa8eirValid\xc3"
+
+    def test_measure_stream(self):
+        before = REGISTRY.get_sample_value("emulator_response_size_bytes_sum", {"encoding": "ndjson"}) or 0
+
+        assert list(measure_stream(iter(["ab\n", "c\n"]))) == [b"ab\n", b"c\n"]
+        assert REGISTRY.get_sample_value("emulator_response_size_bytes_sum", {"encoding": "ndjson"}) == before + 5
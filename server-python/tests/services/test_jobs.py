@@ -0,0 +1,184 @@
+import asyncio
+import threading
+from collections.abc import AsyncIterator
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import EmulatorRequest, JobInfo, JobKind, JobStatus, RunJobRequest, SweepJobRequest, SweepRequest
+from app.services.emulator import run_emulator_model
+from app.services.jobs import JobManager, chunk_scenario_sets, job_events
+from tests.fakes import fake_controller_results
+
+
+def scenario_set(size: int) -> dict:
+    return {"scenario_tag": [f"scenario{index}" for index in range(size)]}
+
+
+def run_job_request(emulator_request: EmulatorRequest) -> RunJobRequest:
+    return RunJobRequest(kind="run", request=emulator_request)
+
+
+def sweep_job_request(emulator_request: EmulatorRequest, points: int) -> SweepJobRequest:
+    return SweepJobRequest(
+        kind="sweep", request=SweepRequest(request=emulator_request, parameterName="lsm", points=points)
+    )
+
+
+async def consume(events: AsyncIterator[str]) -> list[JobInfo]:
+    return [JobInfo.model_validate_json(event.removeprefix("data: ")) async for event in events]
+
+
+class TestChunkScenarioSets:
+    def test_groups_sets_up_to_max_scenarios(self):
+        sets = [scenario_set(3), scenario_set(3), scenario_set(3), scenario_set(1)]
+
+        assert chunk_scenario_sets(sets, 6) == [sets[:2], sets[2:]]
+
+    def test_never_splits_a_set(self):
+        sets = [scenario_set(10), scenario_set(1)]
+
+        assert chunk_scenario_sets(sets, 4) == [[sets[0]], [sets[1]]]
+
+    def test_empty(self):
+        assert chunk_scenario_sets([], 4) == []
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestInlineJobs:
+    def test_run_job(self, _, emulator_request: EmulatorRequest):
+        manager = JobManager(max_jobs=10, ttl=60, workers=1, chunk_scenarios=50)
+
+        job = manager.submit(run_job_request(emulator_request))
+
+        info = job.info()
+        assert info.kind is JobKind.run
+        assert info.status is JobStatus.succeeded
+        assert info.scenariosDone == info.scenariosTotal == 7
+        assert job.result == run_emulator_model(emulator_request)
+        assert manager.get(job.id) is job
+
+    def test_sweep_job_progress(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        manager = JobManager(max_jobs=10, ttl=60, workers=1, chunk_scenarios=14)
+
+        job = manager.submit(sweep_job_request(emulator_request, points=3))
+
+        # Sweep points are run a chunk of up to 14 scenarios at a time
+        assert mock_controller.call_count == len(chunk_scenario_sets(job.plan.scenario_sets, 14)) == 2
+        assert job.info().scenariosDone == job.info().scenariosTotal == job.plan.scenario_count
+        assert [point.value for point in job.result.points] == [0, 45, 90]
+
+    def test_failed_job(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        mock_controller.side_effect = HTTPException(status_code=503, detail="Emulator queue is full")
+        manager = JobManager(max_jobs=10, ttl=60, workers=1, chunk_scenarios=50)
+
+        job = manager.submit(run_job_request(emulator_request))
+
+        assert job.info().status is JobStatus.failed
+        assert job.info().error == "Emulator queue is full"
+
+    def test_unexpected_error(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        mock_controller.side_effect = RuntimeError("boom")
+        manager = JobManager(max_jobs=10, ttl=60, workers=1, chunk_scenarios=50)
+
+        job = manager.submit(run_job_request(emulator_request))
+
+        assert job.info().status is JobStatus.failed
+        assert job.info().error == "Internal server error"
+
+    def test_invalid_request_fails_on_submit(self, _, emulator_request: EmulatorRequest):
+        manager = JobManager(max_jobs=10, ttl=60, workers=1, chunk_scenarios=50)
+        job_request = sweep_job_request(emulator_request, points=2)
+        job_request.request.parameter_name = "phi"
+
+        with pytest.raises(HTTPException) as exc_info:
+            manager.submit(job_request)
+
+        assert exc_info.value.status_code == 400
+        assert len(manager) == 0
+
+    def test_unknown_job(self, _):
+        with pytest.raises(HTTPException) as exc_info:
+            JobManager(max_jobs=10, ttl=60, workers=1, chunk_scenarios=50).get("missing")
+
+        assert exc_info.value.status_code == 404
+
+    def test_evicts_expired_jobs(self, _, emulator_request: EmulatorRequest):
+        manager = JobManager(max_jobs=10, ttl=0, workers=1, chunk_scenarios=50)
+        manager.submit(run_job_request(emulator_request))
+
+        assert manager.evict_expired() == 1
+        assert len(manager) == 0
+
+    def test_full_store_drops_oldest_finished_job(self, _, emulator_request: EmulatorRequest):
+        manager = JobManager(max_jobs=2, ttl=60, workers=1, chunk_scenarios=50)
+        first = manager.submit(run_job_request(emulator_request))
+        manager.submit(run_job_request(emulator_request))
+
+        manager.submit(run_job_request(emulator_request))
+
+        assert len(manager) == 2
+        with pytest.raises(HTTPException):
+            manager.get(first.id)
+
+
+class TestBackgroundJobs:
+    @pytest.fixture
+    def release(self):
+        release = threading.Event()
+        yield release
+        release.set()
+
+    @pytest.fixture
+    def manager(self, release: threading.Event):
+        def blocking_controller(**scenarios):
+            release.wait(5)
+            return fake_controller_results(**scenarios)
+
+        manager = JobManager(max_jobs=1, ttl=60, workers=1, chunk_scenarios=7)
+        manager.start()
+        with patch("app.services.emulator.run_mintweb_controller", side_effect=blocking_controller):
+            yield manager
+            release.set()
+            manager.shutdown()
+
+    def test_runs_in_background(self, manager: JobManager, release: threading.Event, emulator_request):
+        job = manager.submit(run_job_request(emulator_request))
+
+        assert job.info().status in {JobStatus.pending, JobStatus.running}
+        release.set()
+        asyncio.run(consume(job_events(job)))
+        assert job.info().status is JobStatus.succeeded
+
+    def test_rejects_jobs_when_full(self, manager: JobManager, emulator_request: EmulatorRequest):
+        manager.submit(run_job_request(emulator_request))
+
+        with pytest.raises(HTTPException) as exc_info:
+            manager.submit(run_job_request(emulator_request))
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.detail == "Too many jobs, please try again later"
+
+    def test_cancel(self, manager: JobManager, release: threading.Event, emulator_request: EmulatorRequest):
+        job = manager.submit(sweep_job_request(emulator_request, points=3))
+
+        manager.cancel(job.id)
+        release.set()
+        events = asyncio.run(consume(job_events(job)))
+
+        assert events[-1].status is JobStatus.cancelled
+        assert job.result is None
+        # The chunk already sent to the emulator finishes, but no further chunks run
+        assert job.info().scenariosDone < job.plan.scenario_count
+
+    def test_events_report_progress(self, manager: JobManager, release: threading.Event, emulator_request):
+        job = manager.submit(sweep_job_request(emulator_request, points=3))
+        release.set()
+
+        events = asyncio.run(consume(job_events(job)))
+
+        done = [event.scenariosDone for event in events]
+        assert done == sorted(done)
+        assert events[-1].status is JobStatus.succeeded
+        assert events[-1].scenariosDone == events[-1].scenariosTotal == job.plan.scenario_count
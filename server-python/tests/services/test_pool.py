@@ -0,0 +1,80 @@
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.pool import POOL_BUSY_WORKERS, POOL_QUEUED_TASKS, POOL_WORKERS, EmulatorPool
+
+
+class TestInlinePool:
+    def test_runs_in_calling_process(self):
+        pool = EmulatorPool(workers=0)
+        pool.start()
+
+        assert not pool.running
+        assert pool.submit(os.getpid).result() == os.getpid()
+
+    def test_propagates_exceptions(self):
+        pool = EmulatorPool(workers=0)
+
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(divmod, 1, 0).result()
+
+
+class TestProcessPool:
+    @pytest.fixture
+    def pool(self):
+        pool = EmulatorPool(workers=1, max_queue=1, initializer=None)
+        pool.start()
+        yield pool
+        pool.shutdown()
+
+    def test_runs_in_worker_process(self, pool: EmulatorPool):
+        assert pool.running
+        assert POOL_WORKERS._value.get() == 1
+        assert pool.submit(os.getpid).result() != os.getpid()
+        assert pool.submit(divmod, 7, 2).result() == (3, 1)
+
+    def test_rejects_tasks_when_queue_is_full(self, pool: EmulatorPool):
+        running = pool.submit(time.sleep, 0.5)
+        queued = pool.submit(time.sleep, 0)
+
+        assert POOL_BUSY_WORKERS._value.get() == 1
+        assert POOL_QUEUED_TASKS._value.get() == 1
+        assert not pool.has_capacity
+        with pytest.raises(HTTPException) as exc_info:
+            pool.submit(time.sleep, 0)
+        assert exc_info.value.status_code == 503
+
+        running.result()
+        queued.result()
+        assert pool.has_capacity
+        pool.shutdown()
+        assert POOL_BUSY_WORKERS._value.get() == 0
+        assert POOL_QUEUED_TASKS._value.get() == 0
+
+    def test_replaces_executor_broken_by_dead_worker(self, pool: EmulatorPool):
+        worker = pool.submit(os.getpid).result()
+        running = pool.submit(time.sleep, 5)
+        os.kill(worker, signal.SIGKILL)
+
+        with pytest.raises(BrokenProcessPool):
+            running.result(timeout=10)
+
+        assert pool.submit(os.getpid).result() not in (worker, os.getpid())
+        assert pool.has_capacity
+        assert POOL_BUSY_WORKERS._value.get() == 0
+        assert POOL_QUEUED_TASKS._value.get() == 0
+
+    def test_recycles_workers(self):
+        pool = EmulatorPool(workers=1, max_tasks_per_worker=1, initializer=None)
+        pool.start()
+        try:
+            assert pool.submit(os.getpid).result() != pool.submit(os.getpid).result()
+        finally:
+            pool.shutdown()
+
+        assert POOL_WORKERS._value.get() == 0
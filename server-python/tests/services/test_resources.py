@@ -12,17 +12,22 @@ from app.models import (
     InterventionCompareParameter,
 )
 from app.services.resources import (
+    APP_DIR,
+    build_compare_parameters,
     create_compare_parameter,
     create_intervention_compare_parameter,
     get_compare_parameters,
     get_dynamic_form_options,
     get_form_field,
+    get_resources,
+    index_form_fields,
+    load_resources,
+    load_validators,
     validate_json,
 )
 
 
-@patch("pathlib.Path.read_text")
-class TestValidateJson:
+class TestLoadValidators:
     schema: ClassVar[dict] = {
         "type": "object",
         "properties": {
@@ -32,64 +37,86 @@ class TestValidateJson:
         "required": ["name", "age"],
     }
 
-    def test_with_valid_instance(self, mock_read_text: Mock):
-        instance = {"name": "Alice", "age": 30}
-        mock_read_text.return_value = json.dumps(self.schema)
-
-        validate_json(instance, "TestSchema")
-
-        mock_read_text.assert_called_once()
-
-    def test_with_invalid_instance(self, mock_read_text: Mock):
-        instance = {"name": "Alice", "age": "thirty"}
+    @patch("pathlib.Path.read_text")
+    def test_loads_every_schema(self, mock_read_text: Mock):
         mock_read_text.return_value = json.dumps(self.schema)
 
-        try:
-            validate_json(instance, "TestSchema")
-        except Exception as e:
-            assert isinstance(e, jsonschema.ValidationError)
+        validators = load_validators()
 
-        mock_read_text.assert_called_once()
+        assert list(validators) == ["DynamicFormOptions"]
+        validators["DynamicFormOptions"].validate({"name": "Alice", "age": 30})
+        with pytest.raises(jsonschema.ValidationError):
+            validators["DynamicFormOptions"].validate({"name": "Alice", "age": "thirty"})
 
+    @patch("pathlib.Path.read_text")
     def test_with_invalid_json(self, mock_read_text: Mock):
         mock_read_text.return_value = ""
 
         with pytest.raises(json.JSONDecodeError):
-            validate_json({}, "NonExistentSchema")
+            load_validators()
 
-    def test_with_missing_schema_file(self, mock_read_text: Mock):
-        mock_read_text.side_effect = FileNotFoundError
-        with pytest.raises(FileNotFoundError):
+    @patch("pathlib.Path.read_text")
+    def test_with_invalid_schema(self, mock_read_text: Mock):
+        mock_read_text.return_value = json.dumps({"type": "not-a-type"})
+
+        with pytest.raises(jsonschema.SchemaError):
+            load_validators()
+
+
+class TestValidateJson:
+    def test_with_valid_instance(self):
+        options_path = APP_DIR / "resources" / "dynamicFormOptions.json"
+
+        validate_json(json.loads(options_path.read_text()), "DynamicFormOptions")
+
+    def test_with_invalid_instance(self):
+        with pytest.raises(jsonschema.ValidationError):
+            validate_json({"groups": "not-a-list"}, "DynamicFormOptions")
+
+    def test_with_unknown_schema(self):
+        with pytest.raises(KeyError):
             validate_json({}, "NonExistentSchema")
 
 
-@patch("pathlib.Path.read_text")
-@patch("app.services.resources.validate_json")
-class TestGetDynamicFormOptions:
-    def test_success(self, mock_validate_json: Mock, mock_read_text: Mock):
-        options = {
-            "seasons": ["seasonal", "non_seasonal"],
-            "net_types": ["py_only", "py_pbo", "py_pyrrole", "py_ppf"],
-        }
-        mock_read_text.return_value = json.dumps(options)
+class TestLoadResources:
+    def test_loads_and_indexes_resources(self):
+        resources = load_resources()
+
+        options = resources.dynamic_form_options
+        assert resources.form_fields["current_malaria_prevalence"] in options["groups"][0]["subGroups"][0]["fields"]
+        assert resources.compare_parameters == build_compare_parameters(resources.form_fields)
+        with pytest.raises(TypeError):
+            resources.form_fields["new"] = {}  # type: ignore[index]
 
-        result = get_dynamic_form_options()
+    @patch("app.services.resources.load_validators")
+    def test_invalid_options_fail_to_load(self, mock_load_validators: Mock):
+        mock_validator = Mock()
+        mock_validator.validate.side_effect = jsonschema.ValidationError("invalid")
+        mock_load_validators.return_value = {"DynamicFormOptions": mock_validator}
 
-        assert result == options
-        mock_validate_json.assert_called_once_with(options, "DynamicFormOptions")
-        mock_read_text.assert_called_once()
+        with pytest.raises(jsonschema.ValidationError):
+            load_resources()
 
-    def test_invalid_json(self, _: Mock, mock_read_text: Mock):
+    @patch("pathlib.Path.read_text")
+    def test_invalid_json(self, mock_read_text: Mock):
         mock_read_text.return_value = "invalid json"
 
         with pytest.raises(json.JSONDecodeError):
-            get_dynamic_form_options()
+            load_resources()
 
-    def test_non_existent_file(self, _: Mock, mock_read_text: Mock):
+    @patch("pathlib.Path.read_text")
+    def test_non_existent_file(self, mock_read_text: Mock):
         mock_read_text.side_effect = FileNotFoundError
 
         with pytest.raises(FileNotFoundError):
-            get_dynamic_form_options()
+            load_resources()
+
+
+class TestGetResources:
+    def test_loaded_once(self):
+        assert get_resources() is get_resources()
+        assert get_dynamic_form_options() is get_resources().dynamic_form_options
+        assert get_compare_parameters() is get_compare_parameters()
 
 
 class TestCreateCompareParameter:
@@ -112,19 +139,31 @@ class TestCreateCompareParameter:
         ]
     }
 
+    form_fields: ClassVar[dict] = index_form_fields(form_options)
+
+    def test_index_form_fields(self):
+        assert list(self.form_fields) == [
+            "current_malaria_prevalence",
+            "preference_for_biting_in_bed",
+            "no_min_max_field",
+            "itn_future",
+            "itn_cost1",
+            "itn_cost2",
+        ]
+
     def test_field_found(self):
-        field = get_form_field("current_malaria_prevalence", self.form_options)
+        field = get_form_field("current_malaria_prevalence", self.form_fields)
 
         assert field == {"id": "current_malaria_prevalence", "min": 2, "max": 70}
 
     def test_field_not_found(self):
         with pytest.raises(ValueError, match=r"Parameter 'non_existent_field' not found in form options."):
-            get_form_field("non_existent_field", self.form_options)
+            get_form_field("non_existent_field", self.form_fields)
 
     def test_create_compare_parameter(self):
         param = ("current_malaria_prevalence", "Prevalence")
 
-        compare_param = create_compare_parameter(param, self.form_options)
+        compare_param = create_compare_parameter(param, self.form_fields)
 
         assert compare_param.model_dump() == {
             "parameter_name": "current_malaria_prevalence",
@@ -136,7 +175,7 @@ class TestCreateCompareParameter:
     def test_create_compare_parameter_no_min_max(self):
         param = ("no_min_max_field", "No Min Max")
 
-        compare_param = create_compare_parameter(param, self.form_options)
+        compare_param = create_compare_parameter(param, self.form_fields)
 
         assert compare_param.model_dump() == {
             "parameter_name": "no_min_max_field",
@@ -148,7 +187,7 @@ class TestCreateCompareParameter:
     def test_create_intervention_compare_parameter(self):
         param = ("itn_future", "ITN Usage", ["itn_cost1", "itn_cost2"])
 
-        intervention_compare_param = create_intervention_compare_parameter(param, self.form_options)
+        intervention_compare_param = create_intervention_compare_parameter(param, self.form_fields)
 
         assert intervention_compare_param.model_dump() == {
             "parameter_name": "itn_future",
@@ -162,12 +201,11 @@ class TestCreateCompareParameter:
         }
 
 
-@patch("app.services.resources.get_dynamic_form_options")
 @patch("app.services.resources.create_compare_parameter")
 @patch("app.services.resources.create_intervention_compare_parameter")
-class TestGetCompareParameters:
-    def test_get_compare_parameters(self, mock_intervention_compare: Mock, mock_compare: Mock, mock_options: Mock):
-        options = {"field": "test"}
+class TestBuildCompareParameters:
+    def test_build_compare_parameters(self, mock_intervention_compare: Mock, mock_compare: Mock):
+        options = {"field": {"id": "field"}}
         baseline_parameters = [
             CompareParameter(
                 parameter_name="preference_for_biting_in_bed", label="Preference for Biting in Bed", min=0, max=100
@@ -202,13 +240,11 @@ class TestGetCompareParameters:
                 linked_costs=[InterventionCompareCost(cost_name="lsm_cost", cost_label="LSM Cost")],
             ),
         ]
-        mock_options.return_value = options
         mock_compare.side_effect = baseline_parameters
         mock_intervention_compare.side_effect = intervention_parameters
 
-        response = get_compare_parameters()
+        response = build_compare_parameters(options)
 
-        mock_options.assert_called_once()
         expected_compare_calls = [
             (("current_malaria_prevalence", "Baseline prevalence"), options),
         ]
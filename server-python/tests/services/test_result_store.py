@@ -0,0 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from app.models import EmulatorRequest
+from app.services.emulator import (
+    ScenarioResult,
+    build_scenarios,
+    decode_scenario_result,
+    encode_scenario_result,
+    result_cache,
+    run_scenarios,
+)
+from app.services.result_store import STORE_ERRORS, STORE_EVICTIONS, STORE_HITS, STORE_MISSES, ResultStore
+from tests.fakes import fake_controller_results
+
+
+def text_store(path: Path, max_size: int = 10, namespace: str = "v1") -> ResultStore[str]:
+    return ResultStore(str(path), max_size=max_size, encode=str.encode, decode=bytes.decode, namespace=namespace)
+
+
+def used_times(store: ResultStore) -> dict[str, int]:
+    return dict(store._connection().execute("SELECT key, used_at FROM results"))
+
+
+class TestResultStore:
+    @pytest.fixture
+    def path(self, tmp_path: Path) -> Path:
+        return tmp_path / "results.sqlite"
+
+    def test_round_trip(self, path: Path):
+        store = text_store(path)
+
+        store.put_many({"a": "1", "b": "2"})
+
+        assert store.get_many(["a", "b", "c"]) == {"a": "1", "b": "2"}
+
+    def test_counts_hits_and_misses(self, path: Path):
+        store = text_store(path)
+        store.put_many({"a": "1"})
+        initial = [STORE_HITS._value.get(), STORE_MISSES._value.get()]
+
+        store.get_many(["a", "b", "c"])
+
+        assert [STORE_HITS._value.get(), STORE_MISSES._value.get()] == [initial[0] + 1, initial[1] + 2]
+
+    def test_persists_across_instances(self, path: Path):
+        text_store(path).put_many({"a": "1"})
+
+        assert text_store(path).get_many(["a"]) == {"a": "1"}
+
+    def test_evicts_least_recently_used(self, path: Path):
+        store = text_store(path, max_size=2)
+        store.put_many({"a": "1"})
+        store.put_many({"b": "2"})
+        store.get_many(["a"])
+        initial_evictions = STORE_EVICTIONS._value.get()
+
+        store.put_many({"c": "3"})
+
+        assert store.get_many(["a", "b", "c"]) == {"a": "1", "c": "3"}
+        assert STORE_EVICTIONS._value.get() == initial_evictions + 1
+
+    def test_reads_defer_recording_use(self, path: Path):
+        store = text_store(path)
+        store.put_many({"a": "1", "b": "2"})
+        used_at = used_times(store)
+
+        store.get_many(["a"])
+
+        assert used_times(store) == used_at
+        store.put_many({"c": "3"})
+        assert used_times(store)["a"] > used_at["a"]
+        assert used_times(store)["b"] == used_at["b"]
+
+    @patch("app.services.result_store.TOUCH_FLUSH_INTERVAL", 0)
+    def test_reads_record_use_after_interval(self, path: Path):
+        store = text_store(path)
+        store.put_many({"a": "1"})
+        used_at = used_times(store)
+
+        store.get_many(["a"])
+
+        assert used_times(store)["a"] > used_at["a"]
+
+    @patch("app.services.result_store.SIZE_CHECK_FRACTION", 0.5)
+    def test_checks_size_periodically(self, path: Path):
+        # Every second row written
+        store = text_store(path, max_size=4)
+        for key in range(5):
+            store.put_many({str(key): str(key)})
+        assert len(store) == 4
+
+        store.put_many({"5": "5"})
+        assert len(store) == 5
+
+        store.put_many({"6": "6"})
+        assert len(store) == 4
+
+    def test_other_versions_are_dropped(self, path: Path):
+        text_store(path, namespace="v1").put_many({"a": "1"})
+
+        store = text_store(path, namespace="v2")
+
+        assert store.get_many(["a"]) == {}
+        assert len(store) == 0
+        assert text_store(path, namespace="v1").get_many(["a"]) == {}
+
+    def test_concurrent_writers(self, path: Path):
+        # Separate stores use separate connections, locking the database as separate processes would
+        stores = [text_store(path, max_size=100) for _ in range(4)]
+
+        def write(index: int) -> None:
+            for key in range(10):
+                stores[index].put_many({f"{index}/{key}": str(key)})
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(write, range(4)))
+
+        assert len(text_store(path, max_size=100)) == 40
+
+    def test_errors_are_misses(self, path: Path):
+        path.mkdir()
+        store = text_store(path)
+        initial_errors = STORE_ERRORS._value.get()
+
+        store.put_many({"a": "1"})
+
+        assert store.get_many(["a"]) == {}
+        assert STORE_ERRORS._value.get() == initial_errors + 2
+
+    def test_disabled_without_path(self):
+        assert not ResultStore("", max_size=10, encode=str.encode, decode=bytes.decode).enabled
+
+
+def test_encode_scenario_result():
+    result = ScenarioResult(prevalence=np.array([0.1, 0.2]), cases=np.array([100.0]), eir_valid=True, prev_ood=True)
+
+    decoded = decode_scenario_result(encode_scenario_result(result))
+
+    np.testing.assert_array_equal(decoded.prevalence, result.prevalence)
+    np.testing.assert_array_equal(decoded.cases, result.cases)
+    assert (decoded.eir_valid, decoded.prev_ood) == (True, True)
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestRunScenariosWithStore:
+    @pytest.fixture(autouse=True)
+    def result_store(self, tmp_path: Path):
+        store = ResultStore(
+            str(tmp_path / "results.sqlite"),
+            max_size=100,
+            encode=encode_scenario_result,
+            decode=decode_scenario_result,
+        )
+        with patch("app.services.emulator.result_store", store):
+            yield store
+
+    def test_restart_reads_stored_results(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        scenarios = build_scenarios(emulator_request)
+        first = run_scenarios(scenarios)
+        # A restarted process starts with an empty in-memory cache
+        result_cache.clear()
+
+        second = run_scenarios(scenarios)
+
+        mock_controller.assert_called_once()
+        assert second.prevalence.equals(first.prevalence)
+        assert second.cases.equals(first.cases)
+
+    def test_with_cache_disabled(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        scenarios = build_scenarios(emulator_request)
+
+        with patch.object(result_cache, "max_size", 0):
+            run_scenarios(scenarios)
+            run_scenarios(scenarios)
+
+        mock_controller.assert_called_once()
+
+    def test_only_runs_missing_scenarios(
+        self, mock_controller: Mock, emulator_request: EmulatorRequest, result_store: ResultStore
+    ):
+        run_scenarios(build_scenarios(emulator_request))
+        result_cache.clear()
+        emulator_request.irs_future = 0.5
+
+        run_scenarios(build_scenarios(emulator_request))
+
+        assert mock_controller.call_args.kwargs["irs_future"] == [0.5]
+        assert len(result_store) == 8
@@ -0,0 +1,169 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import fakeredis
+import pytest
+
+from app.models import EmulatorRequest
+from app.services.cancellation import RequestCancellation, RequestCancelled, current_cancellation
+from app.services.emulator import (
+    build_scenarios,
+    decode_scenario_result,
+    encode_scenario_result,
+    result_cache,
+    run_scenarios,
+)
+from app.services.shared_cache import SHARED_ERRORS, SHARED_HITS, SHARED_MISSES, SharedResultCache
+from tests.fakes import fake_controller_results
+
+
+def replica(server: fakeredis.FakeServer, lock_timeout: int = 5) -> SharedResultCache[str]:
+    """A shared cache as seen by one replica, with its own connection to the common server."""
+    return SharedResultCache(
+        "",
+        ttl=60,
+        lock_timeout=lock_timeout,
+        encode=str.encode,
+        decode=bytes.decode,
+        namespace="v1",
+        client=fakeredis.FakeRedis(server=server),
+    )
+
+
+def compute_values(keys: list[str]) -> dict[str, str]:
+    return {key: f"value of {key}" for key in keys}
+
+
+class TestSharedResultCache:
+    @pytest.fixture
+    def server(self) -> fakeredis.FakeServer:
+        return fakeredis.FakeServer()
+
+    def test_shared_between_replicas(self, server: fakeredis.FakeServer):
+        compute = Mock(side_effect=compute_values)
+        initial = [SHARED_HITS._value.get(), SHARED_MISSES._value.get()]
+
+        first = replica(server).get_or_compute(["a", "b"], compute)
+        second = replica(server).get_or_compute(["a", "b", "c"], compute)
+
+        assert first == {"a": "value of a", "b": "value of b"}
+        assert second == {**first, "c": "value of c"}
+        assert [call.args[0] for call in compute.call_args_list] == [["a", "b"], ["c"]]
+        assert [SHARED_HITS._value.get(), SHARED_MISSES._value.get()] == [initial[0] + 2, initial[1] + 3]
+
+    def test_results_expire(self, server: fakeredis.FakeServer):
+        cache = replica(server)
+
+        cache.get_or_compute(["a"], compute_values)
+
+        assert 0 < cache.client.ttl(f"{cache.prefix}a") <= 60
+        assert not cache.client.exists(f"{cache.prefix}a:lock")
+
+    def test_single_flight_across_replicas(self, server: fakeredis.FakeServer):
+        computing, release = threading.Event(), threading.Event()
+
+        def slow_compute(keys: list[str]) -> dict[str, str]:
+            computing.set()
+            release.wait(5)
+            return compute_values(keys)
+
+        waiting = threading.Event()
+
+        def waiting_compute_values(keys: list[str]) -> dict[str, str]:
+            # By now the second replica has found "a" locked and will wait for it after computing "b"
+            waiting.set()
+            return compute_values(keys)
+
+        waiting_compute = Mock(side_effect=waiting_compute_values)
+        results = {}
+        first = threading.Thread(
+            target=lambda: results.update(first=replica(server).get_or_compute(["a"], slow_compute))
+        )
+        first.start()
+        computing.wait(5)
+
+        second = threading.Thread(
+            target=lambda: results.update(second=replica(server).get_or_compute(["a", "b"], waiting_compute))
+        )
+        second.start()
+        waiting.wait(5)
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        # The second replica only computes what nobody else was computing, and waits for the rest
+        waiting_compute.assert_called_once_with(["b"])
+        assert results["second"] == {"a": "value of a", "b": "value of b"}
+
+    def test_rechecks_keys_stored_before_their_locks_were_taken(self, server: fakeredis.FakeServer):
+        cache, other = replica(server), replica(server)
+        lock = cache._lock
+
+        def store_then_lock(keys: list[str]) -> tuple[list[str], str]:
+            other.get_or_compute(keys, compute_values)
+            return lock(keys)
+
+        compute = Mock(side_effect=compute_values)
+        with patch.object(cache, "_lock", side_effect=store_then_lock):
+            assert cache.get_or_compute(["a"], compute) == {"a": "value of a"}
+
+        compute.assert_not_called()
+        assert not cache.client.exists(f"{cache.prefix}a:lock")
+
+    def test_takes_over_abandoned_locks(self, server: fakeredis.FakeServer):
+        cache = replica(server)
+        cache.client.set(f"{cache.prefix}a:lock", "other replica", ex=5)
+        threading.Timer(0.1, cache.client.delete, [f"{cache.prefix}a:lock"]).start()
+
+        assert cache.get_or_compute(["a"], compute_values) == {"a": "value of a"}
+
+    def test_cancelled_request_stops_waiting_for_locks(self, server: fakeredis.FakeServer):
+        cache = replica(server, lock_timeout=5)
+        cache.client.set(f"{cache.prefix}a:lock", "other replica", ex=5)
+        token = current_cancellation.set(RequestCancellation(deadline=time.monotonic() + 0.1))
+        started = time.monotonic()
+        try:
+            with pytest.raises(RequestCancelled):
+                cache.get_or_compute(["a"], compute_values)
+        finally:
+            current_cancellation.reset(token)
+
+        assert time.monotonic() - started < 1
+        assert cache.client.get(f"{cache.prefix}a:lock") == b"other replica"
+
+    def test_releases_locks_when_compute_fails(self, server: fakeredis.FakeServer):
+        cache = replica(server)
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute(["a"], Mock(side_effect=RuntimeError("boom")))
+
+        assert not cache.client.exists(f"{cache.prefix}a:lock")
+
+    def test_computes_locally_when_redis_is_down(self, server: fakeredis.FakeServer):
+        server.connected = False
+        initial_errors = SHARED_ERRORS._value.get()
+
+        assert replica(server).get_or_compute(["a"], compute_values) == {"a": "value of a"}
+        assert SHARED_ERRORS._value.get() == initial_errors + 1
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+def test_run_scenarios_shares_results_between_replicas(mock_controller: Mock, emulator_request: EmulatorRequest):
+    shared_cache = SharedResultCache(
+        "",
+        ttl=60,
+        lock_timeout=5,
+        encode=encode_scenario_result,
+        decode=decode_scenario_result,
+        client=fakeredis.FakeRedis(),
+    )
+    scenarios = build_scenarios(emulator_request)
+
+    with patch("app.services.emulator.shared_cache", shared_cache), patch.object(result_cache, "max_size", 0):
+        first = run_scenarios(scenarios)
+        second = run_scenarios(scenarios)
+
+    mock_controller.assert_called_once()
+    assert second.prevalence.equals(first.prevalence)
+    assert second.cases.equals(first.cases)
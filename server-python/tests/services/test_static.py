@@ -0,0 +1,64 @@
+from app.models import Response, Version
+from app.services.static import StaticResponse, etag_matches, get_static_responses
+
+
+class TestEtagMatches:
+    def test_exact_match(self):
+        assert etag_matches('"abc"', '"abc"')
+
+    def test_list_of_etags(self):
+        assert etag_matches('"xyz", "abc"', '"abc"')
+
+    def test_weak_etag(self):
+        assert etag_matches('W/"abc"', '"abc"')
+
+    def test_wildcard(self):
+        assert etag_matches("*", '"abc"')
+
+    def test_no_match(self):
+        assert not etag_matches('"abcd"', '"abc"')
+
+
+def version_response(server: str) -> StaticResponse:
+    return StaticResponse.from_model(Response[Version](data=Version(server=server, minte="2", estimint="3")))
+
+
+class TestStaticResponse:
+    static = version_response("1")
+
+    def test_from_model(self):
+        assert self.static.body == b'{"data":{"server":"1","minte":"2","estimint":"3"}}'
+        assert self.static.etag.startswith('"')
+        assert self.static.etag.endswith('"')
+        assert self.static.etag == version_response("1").etag
+        assert self.static.etag != version_response("2").etag
+
+    def test_respond(self):
+        response = self.static.respond()
+
+        assert response.status_code == 200
+        assert response.body == self.static.body
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["etag"] == self.static.etag
+        assert response.headers["cache-control"] == "public, max-age=86400"
+
+    def test_respond_not_modified(self):
+        response = self.static.respond(self.static.etag)
+
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == self.static.etag
+
+    def test_respond_modified(self):
+        assert self.static.respond('"stale"').status_code == 200
+
+
+class TestGetStaticResponses:
+    def test_built_once(self):
+        assert get_static_responses() is get_static_responses()
+
+    def test_distinct_etags(self):
+        responses = get_static_responses()
+        etags = {responses.version.etag, responses.options.etag, responses.compare_parameters.etag}
+
+        assert len(etags) == 3
@@ -0,0 +1,170 @@
+import json
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+from minte import MintwebResults
+
+from app.models import EmulatorRequest, ItnFutureType
+from app.services.emulator import build_scenarios, split_results
+from app.services.surrogate import (
+    GRID_FILE,
+    ErrorBound,
+    SurrogateGrid,
+    SurrogateRegistry,
+    approximate_scenario_sets,
+    approximation_headers,
+    build_surrogate_grid,
+    load_surrogates,
+    main,
+)
+from tests.fakes import fake_controller_results
+
+GRID_POINTS = {"prev": 3, "itn_future": 2, "irs_future": 2, "lsm": 2}
+# The fixed inputs of the emulator_request fixture
+GRID_REQUEST = {
+    "is_seasonal": 1.0,
+    "current_malaria_prevalence": 50.0,
+    "preference_for_biting_in_bed": 79.0,
+    "preference_for_biting": 82.0,
+    "pyrethroid_resistance": 30.0,
+    "py_only": 5.0,
+    "py_pbo": 10.0,
+    "py_pyrrole": 5.0,
+    "py_ppf": 5.0,
+    "irs_coverage": 10.0,
+    "itn_future": 40.0,
+    "itn_future_types": ["py_only"],
+    "routine_coverage": 1.0,
+    "irs_future": 15.0,
+    "lsm": 15.0,
+}
+
+
+def curved_controller_results(**scenarios) -> MintwebResults:
+    """Controller output that is quadratic in prevalence, so interpolating it has an error."""
+    results = fake_controller_results(**scenarios)
+    prevalence = results.prevalence["prevalence"].to_numpy()
+    return MintwebResults(
+        prevalence=results.prevalence.assign(prevalence=prevalence**2),
+        cases=results.cases,
+        eir_valid=results.eir_valid,
+    )
+
+
+@pytest.fixture(scope="module")
+def grid() -> SurrogateGrid:
+    request = EmulatorRequest.model_validate(GRID_REQUEST)
+    return build_surrogate_grid(request, GRID_POINTS, run=fake_controller_results, validation_samples=8)
+
+
+class TestSurrogateGrid:
+    def test_grid_shape(self, grid: SurrogateGrid):
+        # The baseline, then each net type with and without routine distribution
+        assert len(grid.variants) == 1 + 2 * len(ItnFutureType)
+        assert grid.prevalence.shape == (len(grid.variants), 3, 2, 2, 2, 4)
+        assert grid.cases.shape == (len(grid.variants), 3, 2, 2, 2, 2)
+        np.testing.assert_allclose(grid.axes["prev"], [0.02, 0.36, 0.7])
+        np.testing.assert_allclose(grid.axes["lsm"], [0, 0.9])
+
+    def test_linear_outputs_interpolate_exactly(self, grid: SurrogateGrid, emulator_request: EmulatorRequest):
+        scenarios = build_scenarios(emulator_request)
+
+        results, error_bound = SurrogateRegistry([grid]).approximate(scenarios)
+
+        expected = split_results(fake_controller_results(**scenarios))
+        for tag, result in split_results(results).items():
+            np.testing.assert_allclose(result.prevalence, expected[tag].prevalence, atol=1e-6)
+            np.testing.assert_allclose(result.cases, expected[tag].cases, rtol=1e-6)
+            assert result.eir_valid
+        assert error_bound.prevalence == pytest.approx(0, abs=1e-6)
+
+    def test_estimates_error_bound(self, emulator_request: EmulatorRequest):
+        curved = build_surrogate_grid(emulator_request, GRID_POINTS, run=curved_controller_results)
+
+        # Linear interpolation of x² between points 0.34 apart is off by at most 0.34² / 4 midway
+        assert 0 < curved.error_bound.prevalence <= 0.34**2 / 4 + 1e-6
+        assert curved.error_bound.cases_per_1000 == pytest.approx(0, abs=1e-3)
+
+    def test_other_inputs_are_not_covered(self, grid: SurrogateGrid, emulator_request: EmulatorRequest):
+        emulator_request.phi = 0.5
+
+        assert SurrogateRegistry([grid]).approximate(build_scenarios(emulator_request)) is None
+
+    def test_values_outside_grid_are_not_covered(self, grid: SurrogateGrid, emulator_request: EmulatorRequest):
+        emulator_request.prev = 0.8
+
+        assert SurrogateRegistry([grid]).approximate(build_scenarios(emulator_request)) is None
+
+    def test_save_and_load(self, grid: SurrogateGrid, tmp_path: Path):
+        grid.save(tmp_path / "grid")
+
+        loaded = SurrogateGrid.load(tmp_path / "grid")
+
+        assert isinstance(loaded.prevalence, np.memmap)
+        assert loaded.prevalence.dtype == np.float32
+        np.testing.assert_allclose(loaded.prevalence, grid.prevalence, rtol=1e-6)
+        assert loaded.context_key == grid.context_key
+        assert loaded.variants == grid.variants
+        assert loaded.error_bound == grid.error_bound
+
+    def test_load_skips_other_versions(self, grid: SurrogateGrid, tmp_path: Path):
+        grid.save(tmp_path / "current")
+        grid.save(tmp_path / "old")
+        metadata = json.loads((tmp_path / "old" / GRID_FILE).read_text())
+        (tmp_path / "old" / GRID_FILE).write_text(json.dumps({**metadata, "namespace": "minte=0.1;estimint=0.1"}))
+
+        assert len(load_surrogates(tmp_path)) == 1
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestApproximateScenarioSets:
+    def test_runs_uncovered_sets_through_emulator(
+        self, mock_controller: Mock, grid: SurrogateGrid, emulator_request: EmulatorRequest
+    ):
+        covered = build_scenarios(emulator_request)
+        uncovered = build_scenarios(emulator_request.model_copy(update={"phi": 0.5}))
+
+        with patch("app.services.surrogate.get_surrogates", return_value=SurrogateRegistry([grid])):
+            results, error_bound = approximate_scenario_sets([covered, uncovered])
+
+        assert mock_controller.call_args.kwargs["phi"] == [0.5] * 7
+        assert error_bound == grid.error_bound
+        assert [result.prevalence["scenario"].unique().tolist() for result in results] == [
+            covered["scenario_tag"],
+            uncovered["scenario_tag"],
+        ]
+
+    def test_no_error_bound_without_grids(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        with patch("app.services.surrogate.get_surrogates", return_value=SurrogateRegistry([])):
+            _, error_bound = approximate_scenario_sets([build_scenarios(emulator_request)])
+
+        mock_controller.assert_called_once()
+        assert error_bound is None
+
+
+def test_error_bounds_combine_to_largest():
+    assert ErrorBound(0.1, 2.0) | ErrorBound(0.2, 1.0) == ErrorBound(0.2, 2.0)
+
+
+def test_approximation_headers():
+    assert approximation_headers(None) == {"X-Emulation-Mode": "exact"}
+    assert approximation_headers(ErrorBound(0.0125, 3.5)) == {
+        "X-Emulation-Mode": "approximate",
+        "X-Error-Bound-Prevalence": "0.0125",
+        "X-Error-Bound-Cases-Per-1000": "3.5",
+    }
+
+
+@patch("app.services.surrogate.run_mintweb_controller", side_effect=fake_controller_results)
+def test_build_command(mock_controller: Mock, tmp_path: Path, emulator_request: EmulatorRequest):
+    request_path = tmp_path / "request.json"
+    request_path.write_text(json.dumps(GRID_REQUEST))
+
+    assert main([str(request_path), str(tmp_path / "grids" / "region"), "--points", "prev=2", "--samples", "4"]) == 0
+
+    registry = load_surrogates(tmp_path / "grids")
+    assert len(registry) == 1
+    assert registry.approximate(build_scenarios(emulator_request)) is not None
+    assert mock_controller.called
@@ -0,0 +1,84 @@
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.models import EmulatorRequest, SweepRequest
+from app.services.sweep import get_sweep_values, run_emulator_sweep
+from tests.fakes import fake_controller_results
+
+
+def sweep_request(emulator_request: EmulatorRequest, **kwargs) -> SweepRequest:
+    return SweepRequest.model_construct(request=emulator_request, **{"points": None, "values": None, **kwargs})
+
+
+class TestSweepRequest:
+    def test_requires_points_or_values(self, emulator_request: EmulatorRequest):
+        with pytest.raises(ValidationError, match="Exactly one of points or values must be provided"):
+            SweepRequest(request=emulator_request, parameterName="lsm")
+
+    def test_rejects_points_and_values(self, emulator_request: EmulatorRequest):
+        with pytest.raises(ValidationError, match="Exactly one of points or values must be provided"):
+            SweepRequest(request=emulator_request, parameterName="lsm", points=3, values=[10])
+
+    def test_rejects_too_many_points(self, emulator_request: EmulatorRequest):
+        with pytest.raises(ValidationError, match="less than or equal to 50"):
+            SweepRequest(request=emulator_request, parameterName="lsm", points=20_000_000)
+
+    def test_rejects_too_many_values(self, emulator_request: EmulatorRequest):
+        with pytest.raises(ValidationError, match="at most 50 items"):
+            SweepRequest(request=emulator_request, parameterName="lsm", values=[10] * 51)
+
+
+class TestGetSweepValues:
+    def test_points_span_compare_range(self, emulator_request: EmulatorRequest):
+        values = get_sweep_values(sweep_request(emulator_request, parameter_name="lsm", points=4))
+
+        assert values == [0.0, 30.0, 60.0, 90.0]
+
+    def test_explicit_values(self, emulator_request: EmulatorRequest):
+        values = get_sweep_values(sweep_request(emulator_request, parameter_name="itn_future", values=[10, 20]))
+
+        assert values == [10, 20]
+
+    def test_unknown_parameter(self, emulator_request: EmulatorRequest):
+        with pytest.raises(HTTPException) as exc_info:
+            get_sweep_values(sweep_request(emulator_request, parameter_name="phi", points=2))
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "'phi' is not a compare parameter"
+
+    def test_values_out_of_range(self, emulator_request: EmulatorRequest):
+        with pytest.raises(HTTPException) as exc_info:
+            get_sweep_values(sweep_request(emulator_request, parameter_name="current_malaria_prevalence", values=[1]))
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "Values for 'current_malaria_prevalence' must be between 2.0 and 70.0"
+
+
+@patch("app.services.emulator.run_mintweb_controller", side_effect=fake_controller_results)
+class TestRunEmulatorSweep:
+    def test_single_controller_call(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        request = sweep_request(emulator_request, parameter_name="current_malaria_prevalence", values=[20, 40, 60])
+
+        response = run_emulator_sweep(request)
+
+        mock_controller.assert_called_once()
+        assert response.parameterName == "current_malaria_prevalence"
+        assert [point.value for point in response.points] == [20, 40, 60]
+        baselines = [point.scenarios[0] for point in response.points]
+        assert [baseline.scenario for baseline in baselines] == ["no_intervention"] * 3
+        assert [baseline.finalPrevalence for baseline in baselines] == pytest.approx([0.23, 0.43, 0.63])
+        assert [baseline.meanPrevalence for baseline in baselines] == pytest.approx([0.215, 0.415, 0.615])
+        assert baselines[0].casesPer1000 == pytest.approx([200, 201])
+
+    def test_intervention_parameter(self, mock_controller: Mock, emulator_request: EmulatorRequest):
+        request = sweep_request(emulator_request, parameter_name="lsm", values=[0, 50])
+
+        response = run_emulator_sweep(request)
+
+        without_lsm, with_lsm = ({summary.scenario for summary in point.scenarios} for point in response.points)
+        assert "lsm_only" not in without_lsm
+        assert "lsm_only" in with_lsm
+        assert mock_controller.call_args.kwargs["lsm"].count(0.5) == 3
@@ -0,0 +1,64 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.emulator import build_scenarios, result_cache
+from app.services.pool import EmulatorPool
+from app.services.warmup import WARMUP_DURATION, WARMUP_REQUEST, Warmup
+from tests.fakes import fake_controller_results
+
+
+@patch("app.services.warmup.run_mintweb_controller", side_effect=fake_controller_results)
+class TestWarmup:
+    @pytest.fixture
+    def warmup(self):
+        return Warmup(EmulatorPool(workers=0))
+
+    def test_runs_warmup_emulation(self, mock_controller: Mock, warmup: Warmup):
+        assert not warmup.done
+
+        warmup.run()
+
+        assert warmup.done
+        mock_controller.assert_called_once_with(**build_scenarios(WARMUP_REQUEST))
+        assert WARMUP_DURATION._value.get() > 0
+        # The result cache is bypassed so later requests still run the emulator
+        assert len(result_cache) == 0
+
+    @patch("app.services.warmup.RETRY_DELAY", 0.01)
+    def test_retries_failed_warmup(self, mock_controller: Mock, warmup: Warmup):
+        mock_controller.side_effect = [RuntimeError("boom"), fake_controller_results(**build_scenarios(WARMUP_REQUEST))]
+
+        warmup.run()
+
+        assert warmup.done
+        assert not warmup.failed
+        assert mock_controller.call_count == 2
+
+    @patch("app.services.warmup.RETRY_DELAY", 0.01)
+    def test_fails_after_all_attempts(self, mock_controller: Mock):
+        mock_controller.side_effect = RuntimeError("boom")
+        warmup = Warmup(EmulatorPool(workers=0), attempts=3)
+
+        warmup.run()
+
+        assert not warmup.done
+        assert warmup.failed
+        assert mock_controller.call_count == 3
+
+    def test_stop_ends_retries(self, mock_controller: Mock):
+        mock_controller.side_effect = RuntimeError("boom")
+        warmup = Warmup(EmulatorPool(workers=0), attempts=3)
+        warmup.stop()
+
+        warmup.run()
+
+        assert not warmup.failed
+        mock_controller.assert_called_once()
+
+    def test_reset(self, _, warmup: Warmup):
+        warmup.run()
+
+        warmup.reset()
+
+        assert not warmup.done
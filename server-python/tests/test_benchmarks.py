@@ -0,0 +1,130 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.main import app
+from benchmarks.__main__ import main
+from benchmarks.fake_emulator import CASES_YEARS, PREVALENCE_STEPS, fake_mintweb_controller, fake_scenarios
+from benchmarks.load import REQUEST_MIX, ArrivalMode, Backend, LoadProfile, Sample, generate_load, report
+from benchmarks.suite import compare, fake_emulator, run_suite
+from benchmarks.surrogate import fake_surrogate_grid, surrogate_error
+from tests.fakes import fake_controller_results
+
+
+class TestFakeEmulator:
+    def test_result_size(self):
+        results = fake_mintweb_controller(**fake_scenarios(3))
+
+        assert len(results.prevalence) == 3 * PREVALENCE_STEPS
+        assert len(results.cases) == 3 * CASES_YEARS
+        assert results.prevalence["scenario"].unique().tolist() == ["scenario0", "scenario1", "scenario2"]
+
+    def test_same_columns_as_test_fake(self):
+        results = fake_mintweb_controller(**fake_scenarios(1))
+        expected = fake_controller_results(scenario_tag=["scenario0"], prev=[0.5])
+
+        assert results.prevalence.columns.tolist() == expected.prevalence.columns.tolist()
+        assert results.cases.columns.tolist() == expected.cases.columns.tolist()
+
+    def test_deterministic(self):
+        first = fake_mintweb_controller(**fake_scenarios(5))
+        second = fake_mintweb_controller(**fake_scenarios(5))
+
+        assert first.prevalence.equals(second.prevalence)
+        assert first.cases.equals(second.cases)
+
+
+def baseline(**medians: float) -> dict:
+    return {"results": {name: {"median": median} for name, median in medians.items()}}
+
+
+class TestCompare:
+    def test_flags_regressions_over_threshold(self):
+        lines, regressions = compare(baseline(a=1.0, b=1.0), baseline(a=1.05, b=1.5), threshold=0.1)
+
+        assert regressions == ["b"]
+        assert "REGRESSION" in lines[1]
+        assert "REGRESSION" not in lines[0]
+
+    def test_new_and_missing_benchmarks(self):
+        lines, regressions = compare(baseline(a=1.0), baseline(b=1.0), threshold=0.1)
+
+        assert regressions == []
+        assert any("(new)" in line for line in lines)
+        assert any("(missing)" in line for line in lines)
+
+
+def test_run_and_compare(tmp_path):
+    results = run_suite(sizes=(2,), name_filter="[2]", repeat=1, min_time=0, log=lambda _: None)
+
+    assert set(results["results"]) == {
+        "scenarios_to_dict[2]",
+        "post_process_results[2]",
+        "post_process_results_columnar[2]",
+    }
+    baseline_path = tmp_path / "baseline.json"
+    assert main(["run", "--output", str(baseline_path), "--filter", "emulator_run_asgi", "--repeat", "1"]) == 0
+    assert main(["compare", str(baseline_path), str(baseline_path)]) == 0
+
+
+def test_middleware_benchmarks():
+    results = run_suite(sizes=(), name_filter="metrics_middleware", repeat=1, min_time=0, log=lambda _: None)
+
+    assert set(results["results"]) == {
+        "metrics_middleware[none]",
+        "metrics_middleware[base_http]",
+        "metrics_middleware[asgi]",
+    }
+
+
+def test_surrogate_benchmarks():
+    results = run_suite(sizes=(), name_filter="approximate", repeat=1, min_time=0, log=lambda _: None)
+
+    assert set(results["results"]) == {"surrogate_approximate", "emulator_run_asgi[approximate]"}
+
+
+def test_surrogate_error():
+    errors = surrogate_error(fake_surrogate_grid(), samples=20, run=fake_mintweb_controller)
+
+    assert errors.keys() == {"prevalence", "cases"}
+    # The fake controller is linear in every grid input
+    assert errors["prevalence"]["max"] < 1e-6
+    assert errors["cases"]["mean"] <= errors["cases"]["p95"] <= errors["cases"]["max"] < 1e-3
+
+
+class TestLoad:
+    @pytest.mark.parametrize("mode", list(ArrivalMode))
+    def test_generates_request_mix(self, mode: ArrivalMode):
+        profile = LoadProfile(mode=mode, concurrency=2, rate=100, duration=0.5, warmup=0)
+
+        async def load() -> list[Sample]:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                return await generate_load(client, profile)
+
+        with fake_emulator():
+            samples = asyncio.run(load())
+
+        assert samples
+        assert all(sample.ok for sample in samples)
+        assert {sample.name for sample in samples} <= {request.name for request in REQUEST_MIX}
+
+    def test_report(self):
+        samples = [
+            Sample("emulator_run", start=0.5, latency=9.0, ok=True),
+            *(Sample("emulator_run", start=1 + index / 100, latency=(index + 1) / 100, ok=True) for index in range(99)),
+            Sample("options", start=2.0, latency=5.0, ok=False),
+        ]
+
+        results = report(samples, Backend.fake, LoadProfile(duration=11, warmup=1))
+
+        assert results["meta"]["mode"] == "closed"
+        # The sample during the warm-up is left out, and the failed one doesn't count towards latency
+        assert results["overall"]["requests"] == 100
+        assert results["overall"]["error_rate"] == pytest.approx(0.01)
+        assert results["overall"]["throughput"] == pytest.approx(9.9)
+        assert results["overall"]["latency"]["p50"] == pytest.approx(0.5)
+        assert results["overall"]["latency"]["max"] == pytest.approx(0.99)
+        assert results["requests"]["options"] == {"requests": 1, "errors": 1, "error_rate": 1.0, "throughput": 0.0}
+        assert results["requests"]["compare_parameters"]["requests"] == 0
@@ -1,11 +1,25 @@
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import PropertyMock, patch
 
+import jsonschema
+import msgpack
+import pyarrow as pa
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
-from app.main import ACTIVE_REQUESTS, REQUEST_COUNT, REQUEST_LATENCY, app
+from app.main import app
+from app.middleware import ACTIVE_REQUESTS, REQUEST_COUNT, REQUEST_LATENCY
 from app.models import EmulatorRequest
+from app.services.admission import AdmissionController
+from app.services.pool import EmulatorPool
+from app.services.surrogate import SurrogateRegistry, build_surrogate_grid
+from app.services.warmup import Warmup, warmup
+from tests.fakes import fake_controller_results
 
 client = TestClient(app)
 
@@ -17,6 +31,32 @@ def test_get_version():
     assert response.json() == {"data": {"server": "1.0.0", "minte": "1.3.1", "estimint": "1.2.1"}}
 
 
+def test_static_responses_are_cacheable():
+    for path in ["/version", "/options", "/compare-parameters", "/bootstrap"]:
+        response = client.get(path)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["cache-control"] == "public, max-age=86400"
+        etag = response.headers["etag"]
+
+        not_modified = client.get(path, headers={"If-None-Match": etag})
+
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+
+
+def test_bootstrap():
+    response = client.get("/bootstrap")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["data"] == {
+        "version": client.get("/version").json()["data"],
+        "options": client.get("/options").json()["data"],
+        "compareParameters": client.get("/compare-parameters").json()["data"],
+    }
+
+
 def test_health_check():
     response = client.get("/healthz")
 
@@ -24,6 +64,51 @@ def test_health_check():
     assert response.json() == {"data": {"status": "ok"}}
 
 
+def test_health_check_after_failed_warmup():
+    with patch.object(Warmup, "failed", new_callable=PropertyMock, return_value=True):
+        response = client.get("/healthz")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json() == {"detail": "Emulator warm-up failed"}
+
+
+@patch("app.services.warmup.run_mintweb_controller", side_effect=fake_controller_results)
+def test_readiness_check(_):
+    warmup.reset()
+    assert client.get("/readyz").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert client.get("/readyz").json() == {"detail": "Emulator is warming up"}
+
+    warmup.run()
+    response = client.get("/readyz")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"data": {"status": "ready"}}
+
+
+@pytest.mark.parametrize("limiter", [EmulatorPool, AdmissionController])
+def test_readiness_check_at_capacity(limiter: type):
+    with (
+        patch.object(Warmup, "done", new_callable=PropertyMock, return_value=True),
+        patch.object(limiter, "has_capacity", new_callable=PropertyMock, return_value=False),
+    ):
+        response = client.get("/readyz")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json() == {"detail": "Emulator workers are at capacity"}
+
+
+@patch("app.services.warmup.run_mintweb_controller", side_effect=fake_controller_results)
+def test_startup_warms_up(mock_controller):
+    with TestClient(app) as lifespan_client:
+        for _ in range(50):
+            if lifespan_client.get("/readyz").status_code == status.HTTP_200_OK:
+                break
+            time.sleep(0.1)
+
+        assert lifespan_client.get("/readyz").status_code == status.HTTP_200_OK
+        mock_controller.assert_called_once()
+
+
 def test_dynamic_form_options():
     options_path = Path(__file__).parent.parent / "app" / "resources" / "dynamicFormOptions.json"
     with open(options_path) as f:
@@ -47,6 +132,183 @@ def test_run_emulator(emulator_request: EmulatorRequest):
     assert "eirValid" in data
 
 
+def test_run_emulator_columnar(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    response = client.post("/emulator/run", params={"format": "columnar"}, json=req_data)
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["data"]
+    assert data["year"] == [1, 2, 3, 4]
+    assert len(data["scenarios"]) == 7
+    assert all(len(series["prevalence"]) == len(data["days"]) for series in data["scenarios"])
+    assert data["scenarios"][0]["scenario"] == "no_intervention"
+
+
+def test_run_emulator_invalid_format(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    response = client.post("/emulator/run", params={"format": "xml"}, json=req_data)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_run_emulator_msgpack(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    json_response = client.post("/emulator/run", json=req_data)
+    response = client.post("/emulator/run", json=req_data, headers={"Accept": "application/msgpack"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/msgpack"
+    assert len(response.content) < len(json_response.content)
+    assert msgpack.unpackb(response.content) == json_response.json()
+
+
+def test_run_emulator_arrow(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    json_data = client.post("/emulator/run", json=req_data).json()["data"]
+    response = client.post("/emulator/run", json=req_data, headers={"Accept": "application/vnd.apache.arrow.stream"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert json.loads(table.schema.metadata[b"eirValid"]) == json_data["eirValid"]
+    rows = table.to_pylist()
+    assert [
+        {"scenario": row["scenario"], "days": row["time"], "prevalence": row["value"]}
+        for row in rows
+        if row["metric"] == "prevalence"
+    ] == json_data["prevalence"]
+    assert [
+        {"scenario": row["scenario"], "year": row["time"], "casesPer1000": row["value"]}
+        for row in rows
+        if row["metric"] == "casesPer1000"
+    ] == json_data["cases"]
+
+
+def test_run_emulator_ndjson(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    columnar = client.post("/emulator/run", params={"format": "columnar"}, json=req_data).json()["data"]
+    response = client.post("/emulator/run", json=req_data, headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    *chunks, end = [json.loads(line) for line in response.text.splitlines()]
+    assert chunks[0]["scenario"] == "no_intervention"
+    assert [chunk.pop("days") for chunk in chunks] == [columnar["days"]] * len(chunks)
+    assert [chunk.pop("year") for chunk in chunks] == [columnar["year"]] * len(chunks)
+    assert chunks == columnar["scenarios"]
+    assert end == {"eirValid": columnar["eirValid"]}
+
+
+def test_run_emulator_at_capacity(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    release = threading.Event()
+
+    def blocking_controller(**scenarios):
+        release.wait(5)
+        return fake_controller_results(**scenarios)
+
+    with (
+        patch("app.main.emulator_admission", AdmissionController(concurrency=1, max_queue=0, max_wait=5)),
+        patch("app.services.emulator.run_mintweb_controller", side_effect=blocking_controller) as mock_controller,
+        ThreadPoolExecutor(max_workers=1) as executor,
+    ):
+        admitted = executor.submit(client.post, "/emulator/run", json=req_data)
+        for _ in range(50):
+            if mock_controller.called:
+                break
+            time.sleep(0.05)
+
+        response = client.post("/emulator/run", json=req_data)
+        release.set()
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.json() == {"detail": "Emulator is at capacity, please try again later"}
+        assert int(response.headers["Retry-After"]) >= 1
+        assert admitted.result().status_code == status.HTTP_200_OK
+        assert client.post("/emulator/run", json=req_data).status_code == status.HTTP_200_OK
+
+
+def test_run_emulator_past_deadline(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    # Not a request any other test runs, so its results aren't already cached
+    req_data["current_malaria_prevalence"] = 0.123
+
+    def slow_controller(**scenarios):
+        time.sleep(0.2)
+        return fake_controller_results(**scenarios)
+
+    with patch("app.services.emulator.run_mintweb_controller", side_effect=slow_controller):
+        response = client.post("/emulator/run", json=req_data, headers={"X-Request-Timeout": "0.05"})
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert response.json() == {"detail": "Request deadline exceeded"}
+
+
+def test_run_emulator_invalid_request_timeout(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    response = client.post("/emulator/run", json=req_data, headers={"X-Request-Timeout": "0"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "x-request-timeout" in response.json()["detail"]
+
+
+def test_run_emulator_batch(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    batch = [{"id": "valid", "request": req_data}, {"id": "invalid", "request": {**req_data, "lsm": -1}}]
+
+    response = client.post("/emulator/run-batch", json=batch)
+
+    assert response.status_code == status.HTTP_200_OK
+    valid, invalid = response.json()["data"]
+    assert valid["id"] == "valid"
+    assert valid["error"] is None
+    assert {"prevalence", "cases", "eirValid"} <= valid["data"].keys()
+    assert invalid["id"] == "invalid"
+    assert invalid["data"] is None
+    assert invalid["error"] == "Validation errors: ('lsm',): Input should be greater than or equal to 0"
+
+
+def test_run_emulator_batch_malformed_item(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    batch = [
+        {"id": "valid", "request": req_data},
+        {"id": "malformed", "request": "not an object"},
+        {"request": req_data},
+    ]
+
+    response = client.post("/emulator/run-batch", json=batch)
+
+    assert response.status_code == status.HTTP_200_OK
+    valid, malformed, no_id = response.json()["data"]
+    assert valid["error"] is None
+    assert malformed["id"] == "malformed"
+    assert malformed["error"].startswith("Validation errors: ")
+    assert no_id["id"] is None
+    assert no_id["error"] == "Validation errors: ('id',): Input should be a valid string"
+
+
+def test_run_emulator_batch_empty():
+    response = client.post("/emulator/run-batch", json=[])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 def test_validation_error(emulator_request: EmulatorRequest):
     req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
 
@@ -69,7 +331,7 @@ def test_metrics_middleware_tracks_success():
     labels = {"method": "GET", "endpoint": "/healthz"}
     initial_count = REQUEST_COUNT.labels(**labels, status=200)._value.get()
     initial_latency = REQUEST_LATENCY.labels(**labels)._sum.get()
-    initial_active = ACTIVE_REQUESTS.labels(**labels)._value.get()
+    initial_active = ACTIVE_REQUESTS.labels(method="GET")._value.get()
 
     response = client.get("/healthz")
 
@@ -81,7 +343,7 @@ def test_metrics_middleware_tracks_success():
     final_latency = REQUEST_LATENCY.labels(**labels)._sum.get()
     assert final_latency > initial_latency
 
-    final_active = ACTIVE_REQUESTS.labels(**labels)._value.get()
+    final_active = ACTIVE_REQUESTS.labels(method="GET")._value.get()
     assert final_active == initial_active
 
 
@@ -102,7 +364,7 @@ def test_metrics_middleware_tracks_exceptions():
     labels = {"method": "GET", "endpoint": "/cause-error"}
     initial_count = REQUEST_COUNT.labels(**labels, status=500)._value.get()
     initial_latency = REQUEST_LATENCY.labels(**labels)._sum.get()
-    initial_active = ACTIVE_REQUESTS.labels(**labels)._value.get()
+    initial_active = ACTIVE_REQUESTS.labels(method="GET")._value.get()
 
     @app.get("/cause-error")
     async def cause_error():
@@ -119,10 +381,40 @@ def test_metrics_middleware_tracks_exceptions():
     final_latency = REQUEST_LATENCY.labels(**labels)._sum.get()
     assert final_latency > initial_latency
 
-    final_active = ACTIVE_REQUESTS.labels(**labels)._value.get()
+    final_active = ACTIVE_REQUESTS.labels(method="GET")._value.get()
     assert final_active == initial_active
 
 
+def test_metrics_middleware_labels_by_route_template():
+    labels = {"method": "GET", "endpoint": "/jobs/{job_id}", "status": 404}
+    initial_count = REQUEST_COUNT.labels(**labels)._value.get()
+
+    client.get("/jobs/first")
+    client.get("/jobs/second")
+
+    assert REQUEST_COUNT.labels(**labels)._value.get() == initial_count + 2
+
+
+def test_metrics_middleware_labels_wrong_method_by_route_template():
+    labels = {"method": "DELETE", "endpoint": "/version", "status": 405}
+    initial_count = REQUEST_COUNT.labels(**labels)._value.get()
+
+    client.delete("/version")
+
+    assert REQUEST_COUNT.labels(**labels)._value.get() == initial_count + 1
+
+
+def test_metrics_middleware_groups_unmatched_paths():
+    labels = {"method": "GET", "endpoint": "<unmatched>", "status": 404}
+    initial_count = REQUEST_COUNT.labels(**labels)._value.get()
+
+    client.get("/unknown/1")
+    client.get("/unknown/2")
+
+    assert REQUEST_COUNT.labels(**labels)._value.get() == initial_count + 2
+    assert b'endpoint="/unknown/1"' not in client.get("/metrics/").content
+
+
 def test_compare_parameters():
     response = client.get("/compare-parameters")
 
@@ -130,3 +422,203 @@ def test_compare_parameters():
     data = response.json()["data"]
     assert len(data["baselineParameters"]) == 1
     assert len(data["interventionParameters"]) == 3
+
+
+def test_run_emulator_sweep(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    response = client.post("/emulator/sweep", json={"request": req_data, "parameterName": "itn_future", "points": 3})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()["data"]
+    assert data["parameterName"] == "itn_future"
+    assert [point["value"] for point in data["points"]] == [0, 50, 100]
+    assert {"scenario", "casesPer1000", "meanPrevalence", "finalPrevalence"} == data["points"][0]["scenarios"][0].keys()
+
+
+def test_run_emulator_sweep_too_many_points(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    sweep = {"request": req_data, "parameterName": "itn_future", "points": 20_000_000}
+
+    for response in (
+        client.post("/emulator/sweep", json=sweep),
+        client.post("/jobs", json={"kind": "sweep", "request": sweep}),
+    ):
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Input should be less than or equal to 50" in response.json()["detail"]
+
+
+def test_run_emulator_sweep_msgpack(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    sweep = {"request": req_data, "parameterName": "itn_future", "points": 3}
+
+    json_response = client.post("/emulator/sweep", json=sweep)
+    # Arrow is only offered for /emulator/run, so msgpack is the best match here
+    response = client.post(
+        "/emulator/sweep", json=sweep, headers={"Accept": "application/vnd.apache.arrow.stream, application/msgpack"}
+    )
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == json_response.json()
+
+
+def test_run_emulator_sweep_accept_preferences(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    sweep = {"request": req_data, "parameterName": "itn_future", "points": 3}
+    expected = {
+        "application/json, application/msgpack;q=0.5": "application/json",
+        "*/*, application/msgpack;q=0.1": "application/json",
+        "application/msgpack;q=x": "application/msgpack",
+    }
+
+    for accept, content_type in expected.items():
+        response = client.post("/emulator/sweep", json=sweep, headers={"Accept": accept})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == content_type
+
+
+SURROGATE_POINTS = {"prev": 2, "itn_future": 2, "irs_future": 2, "lsm": 2}
+# Inputs in percent, as the UI posts them, so they land inside the grid
+SURROGATE_REQUEST = {
+    "is_seasonal": 1.0,
+    "current_malaria_prevalence": 50.0,
+    "preference_for_biting_in_bed": 79.0,
+    "preference_for_biting": 82.0,
+    "pyrethroid_resistance": 30.0,
+    "py_only": 5.0,
+    "py_pbo": 10.0,
+    "py_pyrrole": 5.0,
+    "py_ppf": 5.0,
+    "irs_coverage": 10.0,
+    "itn_future": 40.0,
+    "itn_future_types": ["py_only", "py_pbo"],
+    "routine_coverage": 1.0,
+    "irs_future": 15.0,
+    "lsm": 15.0,
+}
+
+
+@pytest.fixture
+def surrogates():
+    grid = build_surrogate_grid(
+        EmulatorRequest.model_validate(SURROGATE_REQUEST), SURROGATE_POINTS, run=fake_controller_results
+    )
+    with patch("app.services.surrogate.get_surrogates", return_value=SurrogateRegistry([grid])):
+        yield
+
+
+@pytest.mark.usefixtures("surrogates")
+def test_run_emulator_approximate():
+    params = {"mode": "approximate", "format": "columnar"}
+
+    response = client.post("/emulator/run", params=params, json=SURROGATE_REQUEST)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Emulation-Mode"] == "approximate"
+    assert float(response.headers["X-Error-Bound-Prevalence"]) == pytest.approx(0, abs=1e-6)
+    assert len(response.json()["data"]["scenarios"]) == 7
+
+
+@pytest.mark.usefixtures("surrogates")
+def test_run_emulator_approximate_falls_back_to_exact():
+    # Outside the grid's range of current prevalence
+    req_data = {**SURROGATE_REQUEST, "current_malaria_prevalence": 80.0}
+
+    response = client.post("/emulator/run", params={"mode": "approximate"}, json=req_data)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Emulation-Mode"] == "exact"
+    assert "X-Error-Bound-Prevalence" not in response.headers
+    assert response.json() == client.post("/emulator/run", json=req_data).json()
+
+
+@pytest.mark.usefixtures("surrogates")
+def test_run_emulator_sweep_approximate():
+    sweep = {"request": SURROGATE_REQUEST, "parameterName": "itn_future", "points": 3}
+
+    response = client.post("/emulator/sweep", params={"mode": "approximate"}, json=sweep)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Emulation-Mode"] == "approximate"
+    assert [point["value"] for point in response.json()["data"]["points"]] == [0, 50, 100]
+
+
+@pytest.mark.usefixtures("surrogates")
+def test_run_emulator_batch_approximate():
+    batch = [
+        {"id": "covered", "request": SURROGATE_REQUEST},
+        # Outside the grid's range of current prevalence, so run through the emulator
+        {"id": "exact", "request": {**SURROGATE_REQUEST, "current_malaria_prevalence": 80.0}},
+        {"id": "invalid", "request": {**SURROGATE_REQUEST, "lsm": -1}},
+    ]
+
+    response = client.post("/emulator/run-batch", params={"mode": "approximate"}, json=batch)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Emulation-Mode"] == "approximate"
+    covered, exact, invalid = response.json()["data"]
+    assert {row["scenario"] for row in covered["data"]["prevalence"]} >= {"no_intervention", "irs_only"}
+    assert exact["data"] == client.post("/emulator/run", json=batch[1]["request"]).json()["data"]
+    assert invalid["error"].startswith("Validation errors: ")
+
+
+def test_startup_fails_on_invalid_resources():
+    with (
+        patch("app.main.get_resources", side_effect=jsonschema.ValidationError("invalid")),
+        pytest.raises(jsonschema.ValidationError),
+        TestClient(app),
+    ):
+        pass
+
+
+def test_sweep_job(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+    sweep = {"request": req_data, "parameterName": "itn_future", "points": 3}
+
+    with TestClient(app) as lifespan_client:
+        response = lifespan_client.post("/jobs", json={"kind": "sweep", "request": sweep})
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_id = response.json()["data"]["id"]
+        with lifespan_client.stream("GET", f"/jobs/{job_id}/events") as events:
+            assert events.headers["content-type"].startswith("text/event-stream")
+            infos = [json.loads(line.removeprefix("data: ")) for line in events.iter_lines() if line]
+
+        assert infos[-1]["status"] == "succeeded"
+        assert infos[-1]["scenariosDone"] == infos[-1]["scenariosTotal"]
+        assert lifespan_client.get(f"/jobs/{job_id}").json()["data"] == infos[-1]
+        result = lifespan_client.get(f"/jobs/{job_id}/result")
+        assert result.json() == client.post("/emulator/sweep", json=sweep).json()
+
+
+def test_run_job_result_and_cancel(emulator_request: EmulatorRequest):
+    req_data = emulator_request.model_dump(exclude={"net_type_future"}, by_alias=True)
+    req_data["itn_future_types"] = [net_type.value for net_type in emulator_request.net_type_future]
+
+    # Without the lifespan, jobs run before the request returns
+    job = client.post("/jobs", json={"kind": "run", "request": req_data, "format": "columnar"}).json()["data"]
+
+    assert job["kind"] == "run"
+    assert job["status"] == "succeeded"
+    result = client.get(f"/jobs/{job['id']}/result").json()["data"]
+    assert result["year"] == [1, 2, 3, 4]
+    # Cancelling a finished job leaves it as it was
+    assert client.delete(f"/jobs/{job['id']}").json()["data"]["status"] == "succeeded"
+
+
+def test_job_not_found():
+    assert client.get("/jobs/missing").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/jobs/missing/result").status_code == status.HTTP_404_NOT_FOUND
+    assert client.delete("/jobs/missing").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_invalid_job():
+    response = client.post("/jobs", json={"kind": "batch", "request": []})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
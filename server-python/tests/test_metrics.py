@@ -0,0 +1,146 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from prometheus_client import CollectorRegistry
+from prometheus_client.mmap_dict import MmapedDict
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.metrics import LiveMultiProcessCollector
+
+# Records a request in flight through the app's middleware metrics, then waits to be killed
+IN_FLIGHT_PROCESS = """
+from app.middleware import ACTIVE_REQUESTS, REQUEST_COUNT
+ACTIVE_REQUESTS.labels(method="GET").inc()
+REQUEST_COUNT.labels(method="GET", endpoint="/version", status=200).inc()
+print("ready", flush=True)
+input()
+"""
+
+SERVER_WORKERS = 2
+SERVER_REQUESTS = 30
+# Sent at most while waiting for the requests to reach more than one worker
+MAX_SERVER_REQUESTS = 500
+
+
+def start_in_flight_processes(multiproc_dir: Path, count: int) -> list[subprocess.Popen]:
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", IN_FLIGHT_PROCESS],
+            env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(multiproc_dir)},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(count)
+    ]
+    for process in processes:
+        assert process.stdout.readline() == "ready\n"
+    return processes
+
+
+def test_aggregates_live_gauges_and_keeps_counters_of_dead_processes(tmp_path: Path):
+    registry = CollectorRegistry()
+    LiveMultiProcessCollector(registry, str(tmp_path))
+    labels = {"method": "GET", "endpoint": "/version"}
+    processes = start_in_flight_processes(tmp_path, 2)
+
+    assert registry.get_sample_value("http_requests_in_flight", {"method": "GET"}) == 2
+    assert registry.get_sample_value("http_requests_total", {**labels, "status": "200"}) == 2
+
+    processes[0].kill()
+    processes[0].wait()
+
+    assert registry.get_sample_value("http_requests_in_flight", {"method": "GET"}) == 1
+    assert registry.get_sample_value("http_requests_total", {**labels, "status": "200"}) == 2
+
+    processes[1].kill()
+    processes[1].wait()
+
+    assert registry.get_sample_value("http_requests_in_flight", {"method": "GET"}) is None
+    assert registry.get_sample_value("http_requests_total", {**labels, "status": "200"}) == 2
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, server: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert server.poll() is None, "server exited"
+        try:
+            httpx.get(url).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    pytest.fail("server did not start")
+
+
+def scraped_value(text: str, name: str, labels: dict[str, str]) -> float | None:
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name == name and sample.labels == labels:
+                return sample.value
+    return None
+
+
+def requests_served_by_process(multiproc_dir: Path, endpoint: str) -> dict[str, float]:
+    """Requests to the endpoint each process counted, read from the per-process counter files."""
+    served = {}
+    for path in multiproc_dir.glob("counter_*.db"):
+        count = sum(
+            value
+            for key, value, _timestamp, _position in MmapedDict.read_all_values_from_file(str(path))
+            if json.loads(key)[1] == "http_requests_total" and json.loads(key)[2].get("endpoint") == endpoint
+        )
+        if count:
+            served[path.stem.removeprefix("counter_")] = count
+    return served
+
+
+def test_server_workers_report_aggregated_metrics(tmp_path: Path):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(SERVER_WORKERS)],
+        env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "MINT_EMULATOR_WORKERS": "0"},
+        cwd=Path(__file__).parent.parent,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(f"{base_url}/healthz", server)
+        # A new connection per request, so the requests spread over the workers, until more than one has served some
+        sent = 0
+        while sent < MAX_SERVER_REQUESTS:
+            httpx.get(f"{base_url}/version").raise_for_status()
+            sent += 1
+            if sent >= SERVER_REQUESTS and len(requests_served_by_process(tmp_path, "/version")) >= 2:
+                break
+
+        # Requests are counted once their response is sent, so the last one may not be counted yet
+        served = requests_served_by_process(tmp_path, "/version")
+        deadline = time.monotonic() + 5
+        while sum(served.values()) < sent and time.monotonic() < deadline:
+            time.sleep(0.05)
+            served = requests_served_by_process(tmp_path, "/version")
+        assert len(served) >= 2
+        assert sum(served.values()) == sent
+
+        # Whichever worker answers the scrape reports every worker's requests
+        for _ in range(SERVER_WORKERS * 2):
+            metrics = httpx.get(f"{base_url}/metrics/").text
+            labels = {"method": "GET", "endpoint": "/version", "status": "200"}
+            assert scraped_value(metrics, "http_requests_total", labels) == sent
+    finally:
+        server.terminate()
+        server.wait(timeout=30)